@@ -1,22 +1,29 @@
 import logging
 import time
-from typing import List
+from typing import List, Literal, Optional
 
 from dependency_injector.wiring import Provide, inject
-from fastapi import APIRouter, Depends, Request, HTTPException
+from fastapi import APIRouter, Body, Depends, Request, Response, HTTPException, Query
+from pydantic import TypeAdapter
+from fastapi.responses import StreamingResponse
 
+from app.core.cache import TableVersions
 from app.core.container import Container
+from app.shared.constants import BULK_MAX_ITEMS, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 from app.brain_agriculture.schemas.brain_agriculture import Brain_Agriculture, DadosFazenda, Produtor, Fazenda, Safra, ReturnSucess, EstatisticasFazendas
 from app.brain_agriculture.schemas.brain_agriculture import EstatisticasCulturas
 from app.brain_agriculture.schemas.brain_agriculture import EstatisticasAreas
-from app.brain_agriculture.schemas.brain_agriculture import ResumoFazendas
+from app.brain_agriculture.schemas.brain_agriculture import ResumoFazendas, Dashboard
+from app.brain_agriculture.schemas.brain_agriculture import CuboSafras, EstatisticasCacheEntidades
 from app.brain_agriculture.schemas.brain_agriculture import FazendaResumida, ProdutorResumido
 from app.brain_agriculture.schemas.brain_agriculture import ProdutorCreate, FazendaCreate, SafraCreate
 from app.brain_agriculture.schemas.brain_agriculture import DadosCompletosCreate, DadosCompletosResponse
 from app.brain_agriculture.schemas.brain_agriculture import ProdutorCompleto, FazendaCompleta
 from app.brain_agriculture.schemas.brain_agriculture import VincularFazendaProdutor, VincularProdutorFazenda
 from app.brain_agriculture.schemas.brain_agriculture import EstatisticasSafrasPorAno
+from app.brain_agriculture.schemas.brain_agriculture import ListaProdutores, ListaFazendas, ListaSafras
+from app.brain_agriculture.schemas.brain_agriculture import ResultadoLote, ResultadoImportacao
 from app.brain_agriculture.services.brain_agriculture import Brain_AgricultureService
 
 logger = logging.getLogger(__name__)
@@ -24,6 +31,76 @@ logger = logging.getLogger(__name__)
 brain_agriculture_router = r = APIRouter()
 
 
+def _definir_proximo_cursor(request: Request, response: Response, itens: list, limit: int) -> None:
+    """Define os headers Link/X-Next-Cursor quando a página veio completa"""
+    if len(itens) < limit:
+        return
+    proximo_cursor = itens[-1].id
+    proxima_url = request.url.include_query_params(after=proximo_cursor)
+    response.headers["Link"] = f'<{proxima_url}>; rel="next"'
+    response.headers["X-Next-Cursor"] = str(proximo_cursor)
+
+
+# ?ids=1,2,3 nas listagens: busca em lote pelos IDs
+IDS_PATTERN = r"^\d{1,9}(,\d{1,9})*$"
+IDS_DESCRIPTION = "Busca em lote: IDs separados por vírgula, na ordem da resposta (ignora paginação e filtros)"
+
+
+def _ler_ids(ids: str) -> List[int]:
+    """Converte '1,2,3' na lista de IDs, sem repetições e na ordem informada"""
+    lista = list(dict.fromkeys(int(registro_id) for registro_id in ids.split(",")))
+    if len(lista) > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"Informe no máximo {MAX_PAGE_SIZE} IDs")
+    return lista
+
+
+def _resposta_json(adapter: TypeAdapter, itens: list, response: Response) -> Response:
+    """
+    Serializa a lista já validada direto para bytes (serializador Rust do pydantic-core).
+    Devolver um Response pronto evita que o FastAPI revalide tudo contra o response_model;
+    os headers definidos nas dependências (ETag, Link) são repassados.
+    """
+    return Response(content=adapter.dump_json(itens), media_type="application/json", headers=response.headers)
+
+
+@inject
+async def _versoes_tabelas(
+    versoes: TableVersions = Depends(Provide[Container.table_versions]),
+) -> TableVersions:
+    return versoes
+
+
+def _etag_confere(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparação do If-None-Match (fraca, como manda a RFC 9110 para GET condicional)"""
+    if not if_none_match:
+        return False
+    for candidata in if_none_match.split(","):
+        candidata = candidata.strip()
+        if candidata == "*" or candidata.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def etag_condicional(*tabelas: str):
+    """
+    GET condicional: ETag forte a partir das versões das tabelas de que a rota depende.
+    Se o If-None-Match bater, responde 304 antes de consultar as tabelas ou serializar a resposta.
+    Sem versões (banco indisponível), responde normalmente, sem ETag.
+    """
+    async def verificar(
+        request: Request,
+        response: Response,
+        versoes: TableVersions = Depends(_versoes_tabelas),
+    ):
+        etag = await versoes.etag(f"{request.url.path}?{request.url.query}", *tabelas)
+        if etag is None:
+            return
+        if _etag_confere(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+    return Depends(verificar)
+
+
 @r.get("/fazendas/{fazenda}/dados", response_model=DadosFazenda)
 @inject
 async def get_dados_fazenda(
@@ -40,36 +117,49 @@ async def get_dados_fazenda(
 
 
 # Rotas CRUD para Produtores
-@r.get("/produtores", response_model=List[Produtor])
+@r.get("/produtores", response_model=List[Produtor], dependencies=[etag_condicional("produtor")])
 @inject
 async def get_all_produtores(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Tamanho da página"),
+    after: Optional[int] = Query(None, description="Cursor: retorna registros após este ID"),
+    order: str = Query("asc", pattern="^(asc|desc)$", description="Ordenação pelo ID"),
+    ids: Optional[str] = Query(None, pattern=IDS_PATTERN, description=IDS_DESCRIPTION),
     brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
 ):
-    """Lista todos os produtores"""
+    """Lista produtores paginados por cursor (próxima página no header Link) ou em lote pelos IDs (?ids=1,2,3)"""
+    lista_ids = _ler_ids(ids) if ids else None
     try:
-        produtores = await brain_agriculture_service.get_all_produtores()
-        return produtores
+        if lista_ids is not None:
+            produtores = await brain_agriculture_service.get_produtores_by_ids(lista_ids)
+            return _resposta_json(ListaProdutores, produtores, response)
+        produtores = await brain_agriculture_service.get_all_produtores(limit=limit, after=after, order=order)
+        _definir_proximo_cursor(request, response, produtores, limit)
+        return _resposta_json(ListaProdutores, produtores, response)
     except Exception as e:
         logger.error(f"Erro ao buscar produtores: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 
 # Rota específica para lista de produtores (deve vir antes da rota com parâmetro)
-@r.get("/produtores/lista", response_model=List[ProdutorResumido])
+@r.get("/produtores/lista", response_model=List[ProdutorResumido], dependencies=[etag_condicional("produtor")])
 @inject
 async def get_lista_produtores(
+    prefixo: Optional[str] = Query(None, min_length=1, max_length=100, description="Filtra pelo início do nome do produtor"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Quantidade máxima de itens"),
     brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
 ):
     """Lista resumida de produtores (ID e nome)"""
     try:
-        produtores = await brain_agriculture_service.get_produtores_resumidos()
+        produtores = await brain_agriculture_service.get_produtores_resumidos(prefixo=prefixo, limit=limit)
         return produtores
     except Exception as e:
         logger.error(f"Erro ao buscar lista de produtores: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 
-@r.get("/produtores/{produtor_id}", response_model=Produtor)
+@r.get("/produtores/{produtor_id}", response_model=Produtor, dependencies=[etag_condicional("produtor")])
 @inject
 async def get_produtor_by_id(
     produtor_id: int,
@@ -107,6 +197,26 @@ async def create_produtor(
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 
+@r.post("/produtores/bulk", response_model=ResultadoLote)
+@inject
+async def create_produtores_lote(
+    produtores: List[ProdutorCreate] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    upsert: bool = Query(False, description="Atualiza o nome dos produtores cujo CPF já está cadastrado"),
+    brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
+):
+    """Cria (ou, com upsert, atualiza pelo CPF) produtores em lote, com o resultado de cada item na ordem de entrada"""
+    try:
+        result = await brain_agriculture_service.create_produtores_lote(produtores, upsert=upsert)
+        if not result.success:
+            raise HTTPException(status_code=400, detail=result.message)
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao criar produtores em lote: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
+
 @r.put("/produtores/{produtor_id}", response_model=ReturnSucess)
 @inject
 async def update_produtor(
@@ -154,22 +264,69 @@ async def delete_produtor(
 
 
 # Rotas CRUD para Fazendas
-@r.get("/fazendas", response_model=List[Fazenda])
+@r.get("/fazendas", response_model=List[Fazenda], dependencies=[etag_condicional("fazenda")])
 @inject
 async def get_all_fazendas(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Tamanho da página"),
+    after: Optional[int] = Query(None, description="Cursor: retorna registros após este ID"),
+    order: str = Query("asc", pattern="^(asc|desc)$", description="Ordenação pelo ID"),
+    estado: Optional[str] = Query(None, description="Filtra pelo estado"),
+    cidade: Optional[str] = Query(None, description="Filtra pela cidade"),
+    idprodutor: Optional[int] = Query(None, description="Filtra pelo produtor"),
+    ids: Optional[str] = Query(None, pattern=IDS_PATTERN, description=IDS_DESCRIPTION),
     brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
 ):
-    """Lista todas as fazendas"""
+    """Lista fazendas paginadas por cursor (próxima página no header Link) ou em lote pelos IDs (?ids=1,2,3)"""
+    lista_ids = _ler_ids(ids) if ids else None
     try:
-        fazendas = await brain_agriculture_service.get_all_fazendas()
-        return fazendas
+        if lista_ids is not None:
+            fazendas = await brain_agriculture_service.get_fazendas_by_ids(lista_ids)
+            return _resposta_json(ListaFazendas, fazendas, response)
+        fazendas = await brain_agriculture_service.get_all_fazendas(
+            limit=limit, after=after, order=order, estado=estado, cidade=cidade, idprodutor=idprodutor
+        )
+        _definir_proximo_cursor(request, response, fazendas, limit)
+        return _resposta_json(ListaFazendas, fazendas, response)
     except Exception as e:
         logger.error(f"Erro ao buscar fazendas: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 
+# Dashboard: todas as estatísticas em uma única chamada
+@r.get("/dashboard", response_model=Dashboard, dependencies=[etag_condicional("fazenda", "safra")])
+@inject
+async def get_dashboard(
+    brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
+):
+    """
+    Retorna resumo, fazendas por estado, áreas, culturas e safras por ano
+    calculados numa única query ao banco
+    """
+    try:
+        dashboard = await brain_agriculture_service.get_dashboard()
+        return dashboard
+    except Exception as e:
+        logger.error(f"Erro ao buscar dashboard: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
+
+@r.get("/cache/entidades", response_model=EstatisticasCacheEntidades)
+@inject
+async def get_estatisticas_cache_entidades(
+    brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
+):
+    """Acertos e falhas do cache de buscas por id no worker que atendeu a requisição"""
+    try:
+        return brain_agriculture_service.get_estatisticas_cache_entidades()
+    except Exception as e:
+        logger.error(f"Erro ao buscar estatísticas do cache de entidades: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
+
 # Rotas específicas para fazendas (devem vir antes das rotas com parâmetros)
-@r.get("/fazendas/estatisticas", response_model=EstatisticasFazendas)
+@r.get("/fazendas/estatisticas", response_model=EstatisticasFazendas, dependencies=[etag_condicional("fazenda")])
 @inject
 async def get_estatisticas_fazendas(
     brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
@@ -183,7 +340,7 @@ async def get_estatisticas_fazendas(
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 
-@r.get("/fazendas/estatisticas-areas", response_model=EstatisticasAreas)
+@r.get("/fazendas/estatisticas-areas", response_model=EstatisticasAreas, dependencies=[etag_condicional("fazenda")])
 @inject
 async def get_estatisticas_areas(
     brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
@@ -197,7 +354,7 @@ async def get_estatisticas_areas(
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 
-@r.get("/fazendas/resumo", response_model=ResumoFazendas)
+@r.get("/fazendas/resumo", response_model=ResumoFazendas, dependencies=[etag_condicional("fazenda")])
 @inject
 async def get_resumo_fazendas(
     brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
@@ -211,21 +368,23 @@ async def get_resumo_fazendas(
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 
-@r.get("/fazendas/lista", response_model=List[FazendaResumida])
+@r.get("/fazendas/lista", response_model=List[FazendaResumida], dependencies=[etag_condicional("fazenda")])
 @inject
 async def get_lista_fazendas(
+    prefixo: Optional[str] = Query(None, min_length=1, max_length=100, description="Filtra pelo início do nome da fazenda"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Quantidade máxima de itens"),
     brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
 ):
     """Lista resumida de fazendas (ID e nome)"""
     try:
-        fazendas = await brain_agriculture_service.get_fazendas_resumidas()
+        fazendas = await brain_agriculture_service.get_fazendas_resumidas(prefixo=prefixo, limit=limit)
         return fazendas
     except Exception as e:
         logger.error(f"Erro ao buscar lista de fazendas: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 
-@r.get("/fazendas/{fazenda_id}", response_model=Fazenda)
+@r.get("/fazendas/{fazenda_id}", response_model=Fazenda, dependencies=[etag_condicional("fazenda")])
 @inject
 async def get_fazenda_by_id(
     fazenda_id: int,
@@ -244,16 +403,17 @@ async def get_fazenda_by_id(
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 
-@r.get("/produtores/{produtor_id}/fazendas", response_model=List[Fazenda])
+@r.get("/produtores/{produtor_id}/fazendas", response_model=List[Fazenda], dependencies=[etag_condicional("fazenda")])
 @inject
 async def get_fazendas_by_produtor(
     produtor_id: int,
+    response: Response,
     brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
 ):
     """Lista fazendas de um produtor específico"""
     try:
         fazendas = await brain_agriculture_service.get_fazendas_by_produtor(produtor_id)
-        return fazendas
+        return _resposta_json(ListaFazendas, fazendas, response)
     except Exception as e:
         logger.error(f"Erro ao buscar fazendas do produtor {produtor_id}: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
@@ -278,6 +438,25 @@ async def create_fazenda(
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 
+@r.post("/fazendas/bulk", response_model=ResultadoLote)
+@inject
+async def create_fazendas_lote(
+    fazendas: List[FazendaCreate] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
+):
+    """Cria fazendas em lote, com o resultado de cada item na ordem de entrada"""
+    try:
+        result = await brain_agriculture_service.create_fazendas_lote(fazendas)
+        if not result.success:
+            raise HTTPException(status_code=400, detail=result.message)
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao criar fazendas em lote: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
+
 @r.put("/fazendas/{fazenda_id}", response_model=ReturnSucess)
 @inject
 async def update_fazenda(
@@ -332,22 +511,68 @@ async def delete_fazenda(
 
 
 # Rotas CRUD para Safras
-@r.get("/safras", response_model=List[Safra])
+@r.get("/safras", response_model=List[Safra], dependencies=[etag_condicional("safra")])
 @inject
 async def get_all_safras(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Tamanho da página"),
+    after: Optional[int] = Query(None, description="Cursor: retorna registros após este ID"),
+    order: str = Query("asc", pattern="^(asc|desc)$", description="Ordenação pelo ID"),
+    cultura: Optional[str] = Query(None, description="Filtra pela cultura"),
+    ano: Optional[int] = Query(None, description="Filtra pelo ano"),
+    idfazenda: Optional[int] = Query(None, description="Filtra pela fazenda"),
+    ids: Optional[str] = Query(None, pattern=IDS_PATTERN, description=IDS_DESCRIPTION),
     brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
 ):
-    """Lista todas as safras"""
+    """Lista safras paginadas por cursor (próxima página no header Link) ou em lote pelos IDs (?ids=1,2,3)"""
+    lista_ids = _ler_ids(ids) if ids else None
     try:
-        safras = await brain_agriculture_service.get_all_safras()
-        return safras
+        if lista_ids is not None:
+            safras = await brain_agriculture_service.get_safras_by_ids(lista_ids)
+            return _resposta_json(ListaSafras, safras, response)
+        safras = await brain_agriculture_service.get_all_safras(
+            limit=limit, after=after, order=order, cultura=cultura, ano=ano, idfazenda=idfazenda
+        )
+        _definir_proximo_cursor(request, response, safras, limit)
+        return _resposta_json(ListaSafras, safras, response)
     except Exception as e:
         logger.error(f"Erro ao buscar safras: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 
+# Cubo de safras (deve vir antes da rota com parâmetro)
+@r.get("/safras/cubo", response_model=CuboSafras, dependencies=[etag_condicional("fazenda", "safra")])
+@inject
+async def get_cubo_safras(
+    dimensoes: List[Literal["estado", "cidade", "cultura", "ano"]] = Query(
+        ["estado", "cultura", "ano"], description="Dimensões do cubo (repita o parâmetro para várias)"
+    ),
+    estado: Optional[str] = Query(None, description="Filtra pelo estado da fazenda"),
+    cidade: Optional[str] = Query(None, description="Filtra pela cidade da fazenda"),
+    cultura: Optional[str] = Query(None, description="Filtra pela cultura"),
+    ano: Optional[int] = Query(None, description="Filtra pelo ano"),
+    brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
+):
+    """
+    Quantidade de safras e área plantada agrupadas por qualquer combinação de
+    estado, cidade, cultura e ano, com todos os subtotais (GROUP BY CUBE).
+    Cubos acima de CUBO_MAX_CELULAS células respondem 400
+    """
+    try:
+        cubo = await brain_agriculture_service.get_cubo_safras(
+            dimensoes, estado=estado, cidade=cidade, cultura=cultura, ano=ano
+        )
+        return cubo
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Erro ao buscar cubo de safras: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
+
 # Rota específica para estatísticas de culturas (deve vir antes da rota com parâmetro)
-@r.get("/safras/estatisticas-culturas", response_model=EstatisticasCulturas)
+@r.get("/safras/estatisticas-culturas", response_model=EstatisticasCulturas, dependencies=[etag_condicional("safra")])
 @inject
 async def get_estatisticas_culturas(
     brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
@@ -361,7 +586,7 @@ async def get_estatisticas_culturas(
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 
-@r.get("/safras/estatisticas-por-ano", response_model=EstatisticasSafrasPorAno)
+@r.get("/safras/estatisticas-por-ano", response_model=EstatisticasSafrasPorAno, dependencies=[etag_condicional("safra")])
 @inject
 async def get_estatisticas_safras_por_ano(
     brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
@@ -375,7 +600,7 @@ async def get_estatisticas_safras_por_ano(
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 
-@r.get("/safras/{safra_id}", response_model=Safra)
+@r.get("/safras/{safra_id}", response_model=Safra, dependencies=[etag_condicional("safra")])
 @inject
 async def get_safra_by_id(
     safra_id: int,
@@ -394,31 +619,33 @@ async def get_safra_by_id(
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 
-@r.get("/fazendas/{fazenda_id}/safras", response_model=List[Safra])
+@r.get("/fazendas/{fazenda_id}/safras", response_model=List[Safra], dependencies=[etag_condicional("safra")])
 @inject
 async def get_safras_by_fazenda(
     fazenda_id: int,
+    response: Response,
     brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
 ):
     """Lista safras de uma fazenda específica"""
     try:
         safras = await brain_agriculture_service.get_safras_by_fazenda(fazenda_id)
-        return safras
+        return _resposta_json(ListaSafras, safras, response)
     except Exception as e:
         logger.error(f"Erro ao buscar safras da fazenda {fazenda_id}: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 
-@r.get("/safras/ano/{ano}", response_model=List[Safra])
+@r.get("/safras/ano/{ano}", response_model=List[Safra], dependencies=[etag_condicional("safra")])
 @inject
 async def get_safras_by_ano(
     ano: int,
+    response: Response,
     brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
 ):
     """Lista safras por ano específico"""
     try:
         safras = await brain_agriculture_service.get_safras_by_ano(ano)
-        return safras
+        return _resposta_json(ListaSafras, safras, response)
     except Exception as e:
         logger.error(f"Erro ao buscar safras do ano {ano}: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
@@ -443,6 +670,25 @@ async def create_safra(
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 
+@r.post("/safras/bulk", response_model=ResultadoLote)
+@inject
+async def create_safras_lote(
+    safras: List[SafraCreate] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
+):
+    """Cria safras em lote, com o resultado de cada item na ordem de entrada"""
+    try:
+        result = await brain_agriculture_service.create_safras_lote(safras)
+        if not result.success:
+            raise HTTPException(status_code=400, detail=result.message)
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao criar safras em lote: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
+
 @r.put("/safras/{safra_id}", response_model=ReturnSucess)
 @inject
 async def update_safra(
@@ -567,7 +813,7 @@ async def processar_dados_completos(
 
 
 # Rota para buscar produtor completo com fazendas e safras
-@r.get("/produtores/{produtor_id}/completo", response_model=ProdutorCompleto)
+@r.get("/produtores/{produtor_id}/completo", response_model=ProdutorCompleto, dependencies=[etag_condicional("produtor", "fazenda", "safra")])
 @inject
 async def get_produtor_completo(
     produtor_id: int,
@@ -594,7 +840,7 @@ async def get_produtor_completo(
 
 
 # Rota para buscar fazenda completa com safras
-@r.get("/fazendas/{fazenda_id}/completa", response_model=FazendaCompleta)
+@r.get("/fazendas/{fazenda_id}/completa", response_model=FazendaCompleta, dependencies=[etag_condicional("fazenda", "safra")])
 @inject
 async def get_fazenda_completa(
     fazenda_id: int,
@@ -668,5 +914,106 @@ async def vincular_produtor_fazenda(
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 
+# Rotas de exportação em streaming (NDJSON ou CSV)
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
 
+def _resposta_exportacao(conteudo, nome: str, formato: str) -> StreamingResponse:
+    return StreamingResponse(
+        conteudo,
+        media_type=EXPORT_MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nome}.{formato}"'},
+    )
 
+
+@r.get("/export/produtores")
+@inject
+async def exportar_produtores(
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Formato da exportação"),
+    brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
+):
+    """Exporta todos os produtores em streaming (memória constante)"""
+    return _resposta_exportacao(brain_agriculture_service.exportar_produtores(formato), "produtores", formato)
+
+
+@r.get("/export/fazendas")
+@inject
+async def exportar_fazendas(
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Formato da exportação"),
+    brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
+):
+    """Exporta todas as fazendas em streaming (memória constante)"""
+    return _resposta_exportacao(brain_agriculture_service.exportar_fazendas(formato), "fazendas", formato)
+
+
+@r.get("/export/safras")
+@inject
+async def exportar_safras(
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Formato da exportação"),
+    brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
+):
+    """Exporta todas as safras em streaming (memória constante)"""
+    return _resposta_exportacao(brain_agriculture_service.exportar_safras(formato), "safras", formato)
+
+
+# Rotas de importação em streaming (CSV ou NDJSON no corpo da requisição, carregado via COPY)
+IMPORT_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            media_type: {"schema": {"type": "string", "format": "binary"}}
+            for media_type in EXPORT_MEDIA_TYPES.values()
+        },
+    }
+}
+
+
+# Importação interrompida: o relatório vai no corpo, pois os blocos gravados antes da falha
+# permanecem no banco (cada bloco é gravado na própria transação)
+IMPORT_RESPONSES = {
+    207: {"model": ResultadoImportacao, "description": "Arquivo interrompido após parte das linhas ser gravada"},
+    422: {"model": ResultadoImportacao, "description": "Arquivo interrompido antes de qualquer linha ser gravada"},
+}
+
+
+def _status_importacao(resultado: ResultadoImportacao) -> int:
+    """200 se o arquivo foi lido até o fim; senão 207 (parte gravada) ou 422 (nada gravado)"""
+    if resultado.success:
+        return 200
+    return 207 if resultado.inseridos else 422
+
+
+@r.post("/import/fazendas", response_model=ResultadoImportacao, openapi_extra=IMPORT_OPENAPI, responses=IMPORT_RESPONSES)
+@inject
+async def importar_fazendas(
+    request: Request,
+    response: Response,
+    formato: str = Query("csv", pattern="^(ndjson|csv)$", description="Formato do arquivo enviado no corpo"),
+    brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
+):
+    """Importa fazendas do corpo da requisição em streaming, relatando as linhas rejeitadas"""
+    try:
+        result = await brain_agriculture_service.importar_fazendas(request.stream(), formato)
+        response.status_code = _status_importacao(result)
+        return result
+    except Exception as e:
+        logger.error(f"Erro ao importar fazendas: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
+
+@r.post("/import/safras", response_model=ResultadoImportacao, openapi_extra=IMPORT_OPENAPI, responses=IMPORT_RESPONSES)
+@inject
+async def importar_safras(
+    request: Request,
+    response: Response,
+    formato: str = Query("csv", pattern="^(ndjson|csv)$", description="Formato do arquivo enviado no corpo"),
+    brain_agriculture_service: Brain_AgricultureService = Depends(Provide[Container.brain_agriculture_service]),
+):
+    """Importa safras do corpo da requisição em streaming, relatando as linhas rejeitadas"""
+    try:
+        result = await brain_agriculture_service.importar_safras(request.stream(), formato)
+        response.status_code = _status_importacao(result)
+        return result
+    except Exception as e:
+        logger.error(f"Erro ao importar safras: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
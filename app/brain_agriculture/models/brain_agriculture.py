@@ -1,25 +1,92 @@
-from typing import Optional
-from sqlmodel import SQLModel, Field
+from decimal import Decimal
+from typing import List, Optional
+from sqlalchemy import BigInteger, CheckConstraint, Column, Computed, Index, Numeric
+from sqlmodel import SQLModel, Field, Relationship
 
 
 class Produtor(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True, index=True, description="ID do produtor")
-    cpf: str = Field(index=True, description="CPF do produtor", max_length=20)
+    # Chave natural: alvo do ON CONFLICT (cpf_numerico) das inserções
+    __table_args__ = (
+        Index("uq_produtor_cpf_numerico", "cpf_numerico", unique=True),
+        CheckConstraint("length(regexp_replace(cpf, '[^0-9]', '', 'g')) = 11", name="ck_produtor_cpf_digitos"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True, description="ID do produtor")
+    cpf: str = Field(description="CPF do produtor", max_length=20)
+    # CPF como inteiro de 11 dígitos, calculado pelo banco a partir de cpf (nunca gravado pela aplicação)
+    cpf_numerico: Optional[int] = Field(
+        default=None,
+        sa_column=Column(BigInteger, Computed("NULLIF(regexp_replace(cpf, '[^0-9]', '', 'g'), '')::bigint", persisted=True)),
+        description="CPF do produtor como inteiro",
+    )
     nomeprodutor: str = Field(description="Nome do produtor", max_length=100)
 
+    # passive_deletes="all": a exclusão dos filhos é responsabilidade do banco/repositório
+    fazendas: List["Fazenda"] = Relationship(
+        back_populates="produtor",
+        sa_relationship_kwargs={"order_by": "Fazenda.id", "passive_deletes": "all"},
+    )
+
 
 class Fazenda(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True, index=True, description="ID da fazenda")
+    # Um produtor não tem duas fazendas com o mesmo nome (fazendas sem produtor não entram: NULLs são distintos)
+    __table_args__ = (
+        Index("uq_fazenda_idprodutor_nomefazenda", "idprodutor", "nomefazenda", unique=True),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True, description="ID da fazenda")
     nomefazenda: str = Field(description="Nome da fazenda", max_length=100)
-    cidade: str = Field(description="Cidade da fazenda", max_length=100)
-    estado: str = Field(description="Estado da fazenda", max_length=100)
+    cidade: str = Field(index=True, description="Cidade da fazenda", max_length=100)
+    estado: str = Field(index=True, description="Estado da fazenda", max_length=100)
     areatotalfazenda: float = Field(description="Área total da fazenda em hectare")
     areaagricutavel: float = Field(description="Área agricultável em hectare")
-    idprodutor: Optional[int] = Field(default=None, foreign_key="produtor.id", description="ID do produtor (chave estrangeira)")
+    idprodutor: Optional[int] = Field(default=None, foreign_key="produtor.id", index=True, description="ID do produtor (chave estrangeira)")
+
+    produtor: Optional[Produtor] = Relationship(back_populates="fazendas")
+    safras: List["Safra"] = Relationship(
+        back_populates="fazenda",
+        sa_relationship_kwargs={"order_by": "Safra.id", "passive_deletes": "all"},
+    )
 
 
 class Safra(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True, index=True, description="ID da safra")
-    ano: int = Field(description="Ano da safra")
-    cultura: str = Field(description="Cultura plantada", max_length=100)
-    idfazenda: int = Field(foreign_key="fazenda.id", description="ID da fazenda (chave estrangeira)")
+    id: Optional[int] = Field(default=None, primary_key=True, description="ID da safra")
+    ano: int = Field(index=True, description="Ano da safra")
+    cultura: str = Field(index=True, description="Cultura plantada", max_length=100)
+    idfazenda: int = Field(foreign_key="fazenda.id", index=True, description="ID da fazenda (chave estrangeira)")
+
+    fazenda: Optional[Fazenda] = Relationship(back_populates="safras")
+
+
+# Tabelas de agregados mantidas incrementalmente por triggers (migração 0003).
+# Somente leitura para a aplicação: cada escrita em fazenda/safra atualiza as linhas afetadas.
+class EstatisticaEstado(SQLModel, table=True):
+    __tablename__ = "estatistica_estado"
+
+    estado: str = Field(primary_key=True, max_length=100, description="Estado")
+    quantidade: int = Field(default=0, description="Quantidade de fazendas no estado")
+    area_total: Decimal = Field(default=0, sa_column=Column(Numeric, nullable=False, server_default="0"), description="Soma da área total das fazendas do estado")
+    area_agricultavel: Decimal = Field(default=0, sa_column=Column(Numeric, nullable=False, server_default="0"), description="Soma da área agricultável das fazendas do estado")
+
+
+class EstatisticaCultura(SQLModel, table=True):
+    __tablename__ = "estatistica_cultura"
+
+    cultura: str = Field(primary_key=True, max_length=100, description="Cultura")
+    quantidade: int = Field(default=0, description="Quantidade de safras da cultura")
+
+
+class EstatisticaAno(SQLModel, table=True):
+    __tablename__ = "estatistica_ano"
+
+    ano: int = Field(primary_key=True, description="Ano da safra")
+    quantidade: int = Field(default=0, description="Quantidade de safras no ano")
+
+
+# Versão de cada tabela, trocada por triggers no commit de toda escrita (migração 0007).
+# Somente leitura para a aplicação: usada nas ETags dos GETs condicionais.
+class VersaoTabela(SQLModel, table=True):
+    __tablename__ = "versao_tabela"
+
+    tabela: str = Field(primary_key=True, max_length=63, description="Nome da tabela")
+    versao: int = Field(sa_column=Column(BigInteger, nullable=False), description="Versão atual da tabela")
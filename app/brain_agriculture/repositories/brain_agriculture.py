@@ -1,35 +1,60 @@
-import os
-import time
 import logging
-from typing import List, Optional
-
-
-from sqlmodel import Session, select
-
-from app.core.repositories import BaseRepository
-from app.brain_agriculture.models.brain_agriculture import Fazenda, Produtor, Safra
+from typing import AsyncIterator, List, Optional, Tuple
+
+
+from sqlalchemy import Integer, Numeric, String, cast, exists, func, insert, literal, literal_column, null, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import joinedload, selectinload
+from sqlmodel import delete, select
+
+from app.core.repositories import AsyncBaseRepository
+from app.shared.constants import EXPORT_BATCH_SIZE
+from app.brain_agriculture.models.brain_agriculture import (
+    EstatisticaAno,
+    EstatisticaCultura,
+    EstatisticaEstado,
+    Fazenda,
+    Produtor,
+    Safra,
+)
 from app.brain_agriculture.schemas.brain_agriculture import DadosFazenda
 
 
-ENVIRONMENT = os.environ.get("ENVIRONMENT")
-SECRETS = os.environ
-
 logger = logging.getLogger(__name__)
 
 
-class Brain_AgricultureRepository(BaseRepository):
+class AsyncBrain_AgricultureRepository(AsyncBaseRepository):
+    """Versão assíncrona do repositório, baseada em AsyncSession/asyncpg e na unidade de trabalho da requisição"""
+
     def __init__(self, db):
         self.db = db
         super().__init__(db)
 
-    def get_all_fazendas(self) -> List[Fazenda]:
+    async def get_all_fazendas(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+        order: str = "asc",
+        estado: Optional[str] = None,
+        cidade: Optional[str] = None,
+        idprodutor: Optional[int] = None,
+    ) -> List[Row]:
+        """Busca fazendas (linhas de colunas, sem hidratar o ORM) com paginação por cursor e filtros opcionais"""
         if self.db is None:
             logger.warning("Banco de dados não disponível, retornando lista vazia")
             return []
         
-        with Session(self.db) as session:
-            statement = select(Fazenda)
-            results = session.exec(statement).all()
+        async with self._session() as session:
+            statement = select(*Fazenda.__table__.columns)
+            if estado is not None:
+                statement = statement.where(Fazenda.estado == estado)
+            if cidade is not None:
+                statement = statement.where(Fazenda.cidade == cidade)
+            if idprodutor is not None:
+                statement = statement.where(Fazenda.idprodutor == idprodutor)
+            statement = self._paginar(statement, Fazenda.id, limit, after, order)
+            results = (await session.exec(statement)).all()
             return results
 
     async def get_teste(self, fazenda: str) -> DadosFazenda:
@@ -39,362 +64,708 @@ class Brain_AgricultureRepository(BaseRepository):
         return DadosFazenda(fazenda=fazenda)  # Retorna um objeto com a fazenda
 
     # Métodos CRUD para Produtores
-    def get_all_produtores(self) -> List[Produtor]:
-        """Busca todos os produtores"""
+    async def get_all_produtores(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+        order: str = "asc",
+    ) -> List[Row]:
+        """Busca produtores (linhas de colunas, sem hidratar o ORM) com paginação por cursor (id)"""
+        if self.db is None:
+            logger.warning("Banco de dados não disponível, retornando lista vazia")
+            return []
+        
+        async with self._session() as session:
+            statement = self._paginar(select(*Produtor.__table__.columns), Produtor.id, limit, after, order)
+            results = (await session.exec(statement)).all()
+            return results
+
+    async def get_produtores_resumidos(
+        self,
+        prefixo: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[int, str, str]]:
+        """Busca apenas (id, cpf, nomeprodutor) dos produtores, filtrando pelo prefixo do nome"""
         if self.db is None:
             logger.warning("Banco de dados não disponível, retornando lista vazia")
             return []
         
-        with Session(self.db) as session:
-            statement = select(Produtor)
-            results = session.exec(statement).all()
+        async with self._session() as session:
+            statement = select(Produtor.id, Produtor.cpf, Produtor.nomeprodutor)
+            if prefixo:
+                statement = statement.where(Produtor.nomeprodutor.istartswith(prefixo, autoescape=True))
+            statement = statement.order_by(Produtor.id)
+            if limit is not None:
+                statement = statement.limit(limit)
+            results = (await session.exec(statement)).all()
             return results
 
-    def get_produtor_by_id(self, produtor_id: int) -> Optional[Produtor]:
+    async def get_produtores_by_ids(self, ids: List[int]) -> List[Row]:
+        """Busca produtores pelos IDs numa única query (id = ANY), na ordem dos IDs informados"""
+        if self.db is None:
+            logger.warning("Banco de dados não disponível, retornando lista vazia")
+            return []
+        
+        return await self._buscar_por_ids(Produtor, ids)
+
+    async def get_produtor_by_id(self, produtor_id: int) -> Optional[Produtor]:
         """Busca um produtor pelo ID"""
         if self.db is None:
             logger.warning("Banco de dados não disponível")
             return None
         
-        with Session(self.db) as session:
+        async with self._session() as session:
             statement = select(Produtor).where(Produtor.id == produtor_id)
-            result = session.exec(statement).first()
+            result = (await session.exec(statement)).first()
             return result
 
-    def get_produtor_by_cpf(self, cpf: str) -> Optional[Produtor]:
-        """Busca um produtor pelo CPF"""
+    async def get_produtor_by_cpf(self, cpf: int) -> Optional[Produtor]:
+        """Busca um produtor pelo CPF numérico (índice único de cpf_numerico)"""
         if self.db is None:
             logger.warning("Banco de dados não disponível")
             return None
         
-        with Session(self.db) as session:
-            statement = select(Produtor).where(Produtor.cpf == cpf)
-            result = session.exec(statement).first()
+        async with self._session() as session:
+            statement = select(Produtor).where(Produtor.cpf_numerico == cpf)
+            result = (await session.exec(statement)).first()
             return result
 
-    def create_produtor(self, produtor: Produtor) -> Produtor:
-        """Cria um novo produtor"""
+    async def get_produtor_completo(self, produtor_id: int) -> Optional[Produtor]:
+        """
+        Busca um produtor com suas fazendas e safras carregadas em duas queries:
+        produtor JOIN fazendas, e as safras de todas as fazendas via IN (selectinload)
+        """
         if self.db is None:
-            logger.error("Banco de dados não disponível")
-            raise Exception("Banco de dados não disponível")
+            logger.warning("Banco de dados não disponível")
+            return None
         
-        with Session(self.db) as session:
-            session.add(produtor)
-            session.commit()
-            session.refresh(produtor)
-            return produtor
+        async with self._session() as session:
+            statement = (
+                select(Produtor)
+                .where(Produtor.id == produtor_id)
+                .options(joinedload(Produtor.fazendas).selectinload(Fazenda.safras))
+            )
+            result = (await session.exec(statement)).unique().first()
+            return result
 
-    def update_produtor(self, produtor_id: int, produtor_data: dict) -> Optional[Produtor]:
-        """Atualiza um produtor existente"""
+    async def create_produtor(self, produtor: Produtor) -> Optional[Produtor]:
+        """
+        Cria um novo produtor com INSERT ... ON CONFLICT (cpf_numerico) DO NOTHING RETURNING.
+        Retorna None se o CPF já estiver cadastrado, sem SELECT prévio e sem janela de corrida
+        """
         if self.db is None:
             logger.error("Banco de dados não disponível")
             raise Exception("Banco de dados não disponível")
         
-        with Session(self.db) as session:
-            statement = select(Produtor).where(Produtor.id == produtor_id)
-            produtor = session.exec(statement).first()
-            
-            if not produtor:
+        async with self._session() as session:
+            statement = (
+                pg_insert(Produtor)
+                .values(cpf=produtor.cpf, nomeprodutor=produtor.nomeprodutor)
+                .on_conflict_do_nothing(index_elements=[Produtor.cpf_numerico])
+                .returning(Produtor)
+            )
+            linha = (await session.exec(statement)).first()
+            if linha is None:
                 return None
-            
-            for key, value in produtor_data.items():
-                if hasattr(produtor, key):
-                    setattr(produtor, key, value)
-            
-            session.add(produtor)
-            session.commit()
-            session.refresh(produtor)
-            return produtor
+            await self._commit(session)
+            return linha[0]
+
+    async def upsert_produtores(self, produtores: List[dict], atualizar: bool = False) -> List[Row]:
+        """
+        Grava produtores em lote pela chave natural (cpf_numerico) com INSERT multi-linha ... ON CONFLICT:
+        DO NOTHING por padrão, ou DO UPDATE do nome quando atualizar=True.
+        Retorna (id, cpf_numerico, criado) das linhas gravadas; CPFs ignorados pelo conflito ficam de fora
+        """
+        if self.db is None:
+            logger.error("Banco de dados não disponível")
+            raise Exception("Banco de dados não disponível")
+        
+        if not produtores:
+            return []
+        statement = pg_insert(Produtor)
+        if atualizar:
+            statement = statement.on_conflict_do_update(
+                index_elements=[Produtor.cpf_numerico],
+                set_={"nomeprodutor": statement.excluded.nomeprodutor},
+            )
+        else:
+            statement = statement.on_conflict_do_nothing(index_elements=[Produtor.cpf_numerico])
+        # xmax = 0 só na versão da linha recém-inserida (o DO UPDATE grava uma nova versão com xmax)
+        statement = statement.returning(Produtor.id, Produtor.cpf_numerico, literal_column("xmax = 0").label("criado"))
+        
+        async with self._session() as session:
+            try:
+                linhas = (await session.exec(statement, params=produtores)).all()
+                await self._commit(session)
+            except Exception:
+                await session.rollback()
+                raise
+            return linhas
+
+    async def update_produtor(self, produtor_id: int, produtor_data: dict) -> Optional[Produtor]:
+        """Atualiza um produtor existente (UPDATE ... RETURNING); None se não existir"""
+        if self.db is None:
+            logger.error("Banco de dados não disponível")
+            raise Exception("Banco de dados não disponível")
+        
+        linha = await self._atualizar(Produtor, produtor_id, produtor_data)
+        return linha[0] if linha else None
 
-    def delete_produtor(self, produtor_id: int) -> bool:
+    async def delete_produtor(self, produtor_id: int) -> bool:
         """Exclui um produtor"""
         if self.db is None:
             logger.error("Banco de dados não disponível")
             raise Exception("Banco de dados não disponível")
         
-        with Session(self.db) as session:
+        async with self._session() as session:
             statement = select(Produtor).where(Produtor.id == produtor_id)
-            produtor = session.exec(statement).first()
+            produtor = (await session.exec(statement)).first()
             
             if not produtor:
                 return False
             
-            session.delete(produtor)
-            session.commit()
+            await session.delete(produtor)
+            await self._commit(session)
             return True
 
+    async def delete_produtor_cascade(self, produtor_id: int) -> Optional[dict]:
+        """
+        Exclui um produtor com suas fazendas e safras usando três DELETEs em uma única transação.
+        Retorna a quantidade de registros excluídos ou None se o produtor não existir.
+        """
+        if self.db is None:
+            logger.error("Banco de dados não disponível")
+            raise Exception("Banco de dados não disponível")
+        
+        async with self._session() as session:
+            fazendas_do_produtor = select(Fazenda.id).where(Fazenda.idprodutor == produtor_id)
+            safras = await session.exec(
+                delete(Safra)
+                .where(Safra.idfazenda.in_(fazendas_do_produtor))
+                .execution_options(synchronize_session=False)
+            )
+            fazendas = await session.exec(
+                delete(Fazenda)
+                .where(Fazenda.idprodutor == produtor_id)
+                .execution_options(synchronize_session=False)
+            )
+            produtores = await session.exec(
+                delete(Produtor)
+                .where(Produtor.id == produtor_id)
+                .execution_options(synchronize_session=False)
+            )
+            
+            if produtores.rowcount == 0:
+                return None
+            
+            await self._commit(session)
+            return {"fazendas_excluidas": fazendas.rowcount, "safras_excluidas": safras.rowcount}
+
     # Métodos CRUD para Fazendas
-    def get_fazenda_by_id(self, fazenda_id: int) -> Optional[Fazenda]:
+    async def get_fazendas_resumidas(
+        self,
+        prefixo: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[int, str]]:
+        """Busca apenas (id, nomefazenda) das fazendas, filtrando pelo prefixo do nome"""
+        if self.db is None:
+            logger.warning("Banco de dados não disponível, retornando lista vazia")
+            return []
+        
+        async with self._session() as session:
+            statement = select(Fazenda.id, Fazenda.nomefazenda)
+            if prefixo:
+                statement = statement.where(Fazenda.nomefazenda.istartswith(prefixo, autoescape=True))
+            statement = statement.order_by(Fazenda.id)
+            if limit is not None:
+                statement = statement.limit(limit)
+            results = (await session.exec(statement)).all()
+            return results
+
+    async def get_fazendas_by_ids(self, ids: List[int]) -> List[Row]:
+        """Busca fazendas pelos IDs numa única query (id = ANY), na ordem dos IDs informados"""
+        if self.db is None:
+            logger.warning("Banco de dados não disponível, retornando lista vazia")
+            return []
+        
+        return await self._buscar_por_ids(Fazenda, ids)
+
+    async def get_fazenda_by_id(self, fazenda_id: int) -> Optional[Fazenda]:
         """Busca uma fazenda pelo ID"""
         if self.db is None:
             logger.warning("Banco de dados não disponível")
             return None
         
-        with Session(self.db) as session:
+        async with self._session() as session:
             statement = select(Fazenda).where(Fazenda.id == fazenda_id)
-            result = session.exec(statement).first()
+            result = (await session.exec(statement)).first()
             return result
 
-    def get_fazendas_by_produtor(self, produtor_id: int) -> List[Fazenda]:
+    async def get_fazenda_completa(self, fazenda_id: int) -> Optional[Fazenda]:
+        """Busca uma fazenda com suas safras carregadas (selectinload, duas queries)"""
+        if self.db is None:
+            logger.warning("Banco de dados não disponível")
+            return None
+        
+        async with self._session() as session:
+            statement = (
+                select(Fazenda)
+                .where(Fazenda.id == fazenda_id)
+                .options(selectinload(Fazenda.safras))
+            )
+            result = (await session.exec(statement)).first()
+            return result
+
+    async def get_fazendas_by_produtor(self, produtor_id: int) -> List[Fazenda]:
         """Busca fazendas de um produtor específico"""
         if self.db is None:
             logger.warning("Banco de dados não disponível, retornando lista vazia")
             return []
         
-        with Session(self.db) as session:
+        async with self._session() as session:
             statement = select(Fazenda).where(Fazenda.idprodutor == produtor_id)
-            results = session.exec(statement).all()
+            results = (await session.exec(statement)).all()
             return results
 
-    def get_fazenda_by_nome_and_produtor(self, nomefazenda: str, produtor_id: int) -> Optional[Fazenda]:
+    async def get_fazenda_by_nome_and_produtor(self, nomefazenda: str, produtor_id: int) -> Optional[Fazenda]:
         """Busca uma fazenda pelo nome e produtor"""
         if self.db is None:
             logger.warning("Banco de dados não disponível")
             return None
         
-        with Session(self.db) as session:
+        async with self._session() as session:
             statement = select(Fazenda).where(
                 Fazenda.nomefazenda == nomefazenda,
                 Fazenda.idprodutor == produtor_id
             )
-            result = session.exec(statement).first()
+            result = (await session.exec(statement)).first()
             return result
 
-    def create_fazenda(self, fazenda: Fazenda) -> Fazenda:
+    async def create_fazenda(self, fazenda: Fazenda) -> Fazenda:
         """Cria uma nova fazenda"""
         if self.db is None:
             logger.error("Banco de dados não disponível")
             raise Exception("Banco de dados não disponível")
         
-        with Session(self.db) as session:
+        async with self._session() as session:
             session.add(fazenda)
-            session.commit()
-            session.refresh(fazenda)
+            await self._commit(session)
+            await session.refresh(fazenda)
             return fazenda
 
-    def update_fazenda(self, fazenda_id: int, fazenda_data: dict) -> Optional[Fazenda]:
-        """Atualiza uma fazenda existente"""
+    async def get_fazendas_ids_existentes(self, fazenda_ids: List[int]) -> set:
+        """Retorna, dentre os IDs informados, os de fazendas existentes (uma única query)"""
+        if self.db is None:
+            logger.warning("Banco de dados não disponível")
+            return set()
+        
+        return await self._valores_existentes(Fazenda.id, fazenda_ids)
+
+    async def create_fazendas_lote(self, fazendas: List[dict]) -> List[int]:
+        """Cria fazendas em lote (INSERT multi-linha); retorna os IDs na ordem de entrada"""
         if self.db is None:
             logger.error("Banco de dados não disponível")
             raise Exception("Banco de dados não disponível")
         
-        with Session(self.db) as session:
-            statement = select(Fazenda).where(Fazenda.id == fazenda_id)
-            fazenda = session.exec(statement).first()
-            
-            if not fazenda:
-                return None
-            
-            for key, value in fazenda_data.items():
-                if hasattr(fazenda, key):
-                    setattr(fazenda, key, value)
-            
-            session.add(fazenda)
-            session.commit()
-            session.refresh(fazenda)
-            return fazenda
+        return await self._inserir_lote(Fazenda, fazendas)
 
-    def delete_fazenda(self, fazenda_id: int) -> bool:
+    async def importar_fazendas(self, colunas: List[str], linhas: List[tuple]) -> List[int]:
+        """Importa um bloco de fazendas via COPY (linhas: número da linha + valores das colunas)"""
+        if self.db is None:
+            logger.error("Banco de dados não disponível")
+            raise Exception("Banco de dados não disponível")
+        
+        return await self._copiar_via_staging(Fazenda, colunas, linhas)
+
+    async def update_fazenda(self, fazenda_id: int, fazenda_data: dict) -> Optional[Fazenda]:
+        """
+        Atualiza uma fazenda existente (UPDATE ... RETURNING).
+        Ao trocar o produtor, exige no mesmo WHERE que ele exista;
+        retorna None se a fazenda ou o produtor não existirem
+        """
+        if self.db is None:
+            logger.error("Banco de dados não disponível")
+            raise Exception("Banco de dados não disponível")
+        
+        condicoes = []
+        if fazenda_data.get("idprodutor") is not None:
+            condicoes.append(exists().where(Produtor.id == fazenda_data["idprodutor"]))
+        
+        linha = await self._atualizar(Fazenda, fazenda_id, fazenda_data, *condicoes)
+        return linha[0] if linha else None
+
+    async def vincular_fazenda_produtor(self, fazenda_id: int, produtor_id: int) -> Optional[Tuple[Fazenda, str]]:
+        """
+        Vincula a fazenda ao produtor num único UPDATE ... RETURNING, que devolve
+        também o nome do produtor; None se a fazenda ou o produtor não existirem
+        """
+        if self.db is None:
+            logger.error("Banco de dados não disponível")
+            raise Exception("Banco de dados não disponível")
+        
+        nomeprodutor = (
+            select(Produtor.nomeprodutor)
+            .where(Produtor.id == produtor_id)
+            .scalar_subquery()
+            .label("nomeprodutor")
+        )
+        linha = await self._atualizar(
+            Fazenda,
+            fazenda_id,
+            {"idprodutor": produtor_id},
+            exists().where(Produtor.id == produtor_id),
+            extras=(nomeprodutor,),
+        )
+        return (linha[0], linha[1]) if linha else None
+
+    async def delete_fazenda(self, fazenda_id: int) -> bool:
         """Exclui uma fazenda"""
         if self.db is None:
             logger.error("Banco de dados não disponível")
             raise Exception("Banco de dados não disponível")
         
-        with Session(self.db) as session:
+        async with self._session() as session:
             statement = select(Fazenda).where(Fazenda.id == fazenda_id)
-            fazenda = session.exec(statement).first()
+            fazenda = (await session.exec(statement)).first()
             
             if not fazenda:
                 return False
             
-            session.delete(fazenda)
-            session.commit()
+            await session.delete(fazenda)
+            await self._commit(session)
             return True
 
+    async def delete_fazenda_cascade(self, fazenda_id: int) -> Optional[dict]:
+        """
+        Exclui uma fazenda com suas safras usando dois DELETEs em uma única transação.
+        Retorna a quantidade de safras excluídas ou None se a fazenda não existir.
+        """
+        if self.db is None:
+            logger.error("Banco de dados não disponível")
+            raise Exception("Banco de dados não disponível")
+        
+        async with self._session() as session:
+            safras = await session.exec(
+                delete(Safra)
+                .where(Safra.idfazenda == fazenda_id)
+                .execution_options(synchronize_session=False)
+            )
+            fazendas = await session.exec(
+                delete(Fazenda)
+                .where(Fazenda.id == fazenda_id)
+                .execution_options(synchronize_session=False)
+            )
+            
+            if fazendas.rowcount == 0:
+                return None
+            
+            await self._commit(session)
+            return {"safras_excluidas": safras.rowcount}
+
     # Métodos CRUD para Safras
-    def get_all_safras(self) -> List[Safra]:
-        """Busca todas as safras"""
+    async def get_all_safras(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+        order: str = "asc",
+        cultura: Optional[str] = None,
+        ano: Optional[int] = None,
+        idfazenda: Optional[int] = None,
+    ) -> List[Row]:
+        """Busca safras (linhas de colunas, sem hidratar o ORM) com paginação por cursor e filtros opcionais"""
         if self.db is None:
             logger.warning("Banco de dados não disponível, retornando lista vazia")
             return []
         
-        with Session(self.db) as session:
-            statement = select(Safra)
-            results = session.exec(statement).all()
+        async with self._session() as session:
+            statement = select(*Safra.__table__.columns)
+            if cultura is not None:
+                statement = statement.where(Safra.cultura == cultura)
+            if ano is not None:
+                statement = statement.where(Safra.ano == ano)
+            if idfazenda is not None:
+                statement = statement.where(Safra.idfazenda == idfazenda)
+            statement = self._paginar(statement, Safra.id, limit, after, order)
+            results = (await session.exec(statement)).all()
             return results
 
-    def get_safra_by_id(self, safra_id: int) -> Optional[Safra]:
+    async def get_safras_by_ids(self, ids: List[int]) -> List[Row]:
+        """Busca safras pelos IDs numa única query (id = ANY), na ordem dos IDs informados"""
+        if self.db is None:
+            logger.warning("Banco de dados não disponível, retornando lista vazia")
+            return []
+        
+        return await self._buscar_por_ids(Safra, ids)
+
+    async def get_safra_by_id(self, safra_id: int) -> Optional[Safra]:
         """Busca uma safra pelo ID"""
         if self.db is None:
             logger.warning("Banco de dados não disponível")
             return None
         
-        with Session(self.db) as session:
+        async with self._session() as session:
             statement = select(Safra).where(Safra.id == safra_id)
-            result = session.exec(statement).first()
+            result = (await session.exec(statement)).first()
             return result
 
-    def get_safras_by_fazenda(self, fazenda_id: int) -> List[Safra]:
+    async def get_safras_by_fazenda(self, fazenda_id: int) -> List[Safra]:
         """Busca safras de uma fazenda específica"""
         if self.db is None:
             logger.warning("Banco de dados não disponível, retornando lista vazia")
             return []
         
-        with Session(self.db) as session:
+        async with self._session() as session:
             statement = select(Safra).where(Safra.idfazenda == fazenda_id)
-            results = session.exec(statement).all()
+            results = (await session.exec(statement)).all()
             return results
 
-    def get_safras_by_ano(self, ano: int) -> List[Safra]:
+    async def get_safras_by_ano(self, ano: int) -> List[Safra]:
         """Busca safras por ano"""
         if self.db is None:
             logger.warning("Banco de dados não disponível, retornando lista vazia")
             return []
         
-        with Session(self.db) as session:
+        async with self._session() as session:
             statement = select(Safra).where(Safra.ano == ano)
-            results = session.exec(statement).all()
+            results = (await session.exec(statement)).all()
             return results
 
-    def create_safra(self, safra: Safra) -> Safra:
+    async def create_safra(self, safra: Safra) -> Safra:
         """Cria uma nova safra"""
         if self.db is None:
             logger.error("Banco de dados não disponível")
             raise Exception("Banco de dados não disponível")
         
-        with Session(self.db) as session:
+        async with self._session() as session:
             session.add(safra)
-            session.commit()
-            session.refresh(safra)
+            await self._commit(session)
+            await session.refresh(safra)
             return safra
 
-    def update_safra(self, safra_id: int, safra_data: dict) -> Optional[Safra]:
-        """Atualiza uma safra existente"""
+    async def create_safras_lote(self, safras: List[dict]) -> List[int]:
+        """Cria safras em lote (INSERT multi-linha); retorna os IDs na ordem de entrada"""
         if self.db is None:
             logger.error("Banco de dados não disponível")
             raise Exception("Banco de dados não disponível")
         
-        with Session(self.db) as session:
-            statement = select(Safra).where(Safra.id == safra_id)
-            safra = session.exec(statement).first()
-            
-            if not safra:
-                return None
-            
-            for key, value in safra_data.items():
-                if hasattr(safra, key):
-                    setattr(safra, key, value)
-            
-            session.add(safra)
-            session.commit()
-            session.refresh(safra)
-            return safra
+        return await self._inserir_lote(Safra, safras)
 
-    def delete_safra(self, safra_id: int) -> bool:
+    async def importar_safras(self, colunas: List[str], linhas: List[tuple]) -> List[int]:
+        """
+        Importa um bloco de safras via COPY; as de fazenda inexistente ficam de fora
+        e seus números de linha são retornados
+        """
+        if self.db is None:
+            logger.error("Banco de dados não disponível")
+            raise Exception("Banco de dados não disponível")
+        
+        return await self._copiar_via_staging(
+            Safra, colunas, linhas,
+            condicao=lambda staging: exists().where(Fazenda.id == staging.c.idfazenda),
+        )
+
+    async def update_safra(self, safra_id: int, safra_data: dict) -> Optional[Safra]:
+        """
+        Atualiza uma safra existente (UPDATE ... RETURNING).
+        Ao trocar a fazenda, exige no mesmo WHERE que ela exista;
+        retorna None se a safra ou a fazenda não existirem
+        """
+        if self.db is None:
+            logger.error("Banco de dados não disponível")
+            raise Exception("Banco de dados não disponível")
+        
+        condicoes = []
+        if safra_data.get("idfazenda") is not None:
+            condicoes.append(exists().where(Fazenda.id == safra_data["idfazenda"]))
+        
+        linha = await self._atualizar(Safra, safra_id, safra_data, *condicoes)
+        return linha[0] if linha else None
+
+    async def delete_safra(self, safra_id: int) -> bool:
         """Exclui uma safra"""
         if self.db is None:
             logger.error("Banco de dados não disponível")
             raise Exception("Banco de dados não disponível")
         
-        with Session(self.db) as session:
+        async with self._session() as session:
             statement = select(Safra).where(Safra.id == safra_id)
-            safra = session.exec(statement).first()
+            safra = (await session.exec(statement)).first()
             
             if not safra:
                 return False
             
-            session.delete(safra)
-            session.commit()
+            await session.delete(safra)
+            await self._commit(session)
             return True
 
-    def get_fazendas_por_estado(self) -> List[dict]:
-        """Busca estatísticas de fazendas por estado"""
+    async def create_dados_completos(self, produtor: Produtor, fazendas: List[dict], safras: List[dict]) -> Optional[dict]:
+        """
+        Insere produtor, fazendas e safras em uma única transação, com INSERT multi-linha
+        e RETURNING id para fazendas e safras. Cada safra referencia sua fazenda pelo campo
+        'nomefazenda'. O produtor entra com ON CONFLICT (cpf_numerico) DO NOTHING: se o CPF já
+        existir retorna None sem gravar nada. Em caso de erro é feito ROLLBACK.
+        """
+        if self.db is None:
+            logger.error("Banco de dados não disponível")
+            raise Exception("Banco de dados não disponível")
+        
+        async with self._session() as session:
+            try:
+                produtor_id = (await session.exec(
+                    pg_insert(Produtor)
+                    .values(cpf=produtor.cpf, nomeprodutor=produtor.nomeprodutor)
+                    .on_conflict_do_nothing(index_elements=[Produtor.cpf_numerico])
+                    .returning(Produtor.id)
+                )).scalar()
+                if produtor_id is None:
+                    return None
+                
+                fazendas_ids_por_nome = {}
+                if fazendas:
+                    linhas = [{**fazenda, "idprodutor": produtor_id} for fazenda in fazendas]
+                    result = await session.exec(
+                        insert(Fazenda).returning(Fazenda.id, Fazenda.nomefazenda),
+                        params=linhas
+                    )
+                    fazendas_ids_por_nome = {row.nomefazenda: row.id for row in result}
+                
+                safras_ids = []
+                if safras:
+                    linhas = [
+                        {
+                            "ano": safra["ano"],
+                            "cultura": safra["cultura"],
+                            "idfazenda": fazendas_ids_por_nome[safra["nomefazenda"]],
+                        }
+                        for safra in safras
+                    ]
+                    result = await session.exec(
+                        insert(Safra).returning(Safra.id, sort_by_parameter_order=True),
+                        params=linhas
+                    )
+                    safras_ids = [row.id for row in result]
+                
+                await self._commit(session)
+            except Exception:
+                await session.rollback()
+                raise
+            
+            return {
+                "produtor_id": produtor_id,
+                "fazendas_ids_por_nome": fazendas_ids_por_nome,
+                "safras_ids": safras_ids,
+            }
+
+    # Exportação em streaming (cursor no servidor)
+    async def stream_produtores(self, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[list]:
+        """Percorre todos os produtores em lotes, sem materializar a tabela em memória"""
+        if self.db is None:
+            logger.warning("Banco de dados não disponível, exportação vazia")
+            return
+        
+        statement = select(Produtor.__table__).order_by(Produtor.id)
+        async for lote in self._stream(statement, batch_size):
+            yield lote
+
+    async def stream_fazendas(self, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[list]:
+        """Percorre todas as fazendas em lotes, sem materializar a tabela em memória"""
+        if self.db is None:
+            logger.warning("Banco de dados não disponível, exportação vazia")
+            return
+        
+        statement = select(Fazenda.__table__).order_by(Fazenda.id)
+        async for lote in self._stream(statement, batch_size):
+            yield lote
+
+    async def stream_safras(self, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[list]:
+        """Percorre todas as safras em lotes, sem materializar a tabela em memória"""
+        if self.db is None:
+            logger.warning("Banco de dados não disponível, exportação vazia")
+            return
+        
+        statement = select(Safra.__table__).order_by(Safra.id)
+        async for lote in self._stream(statement, batch_size):
+            yield lote
+
+    async def get_fazendas_por_estado(self) -> List[dict]:
+        """Busca a quantidade de fazendas por estado (tabela de agregados)"""
         if self.db is None:
             logger.warning("Banco de dados não disponível, retornando lista vazia")
             return []
         
-        with Session(self.db) as session:
-            from sqlalchemy import func
-            
-            # Usar SQLAlchemy ORM em vez de query raw
-            result = session.exec(
-                select(
-                    Fazenda.estado,
-                    func.count(Fazenda.id).label("quantidade")
-                ).group_by(Fazenda.estado).order_by(func.count(Fazenda.id).desc())
-            ).all()
+        async with self._session() as session:
+            result = (await session.exec(
+                select(EstatisticaEstado.estado, EstatisticaEstado.quantidade)
+                .order_by(EstatisticaEstado.quantidade.desc())
+            )).all()
             
             return [{"estado": row.estado, "quantidade": row.quantidade} for row in result]
 
-    def get_total_fazendas(self) -> int:
-        """Retorna o total de fazendas"""
+    async def get_total_fazendas(self) -> int:
+        """Retorna o total de fazendas (soma das poucas linhas por estado)"""
         if self.db is None:
             logger.warning("Banco de dados não disponível")
             return 0
         
-        with Session(self.db) as session:
-            from sqlalchemy import func
-            result = session.exec(select(func.count(Fazenda.id))).first()
+        async with self._session() as session:
+            result = (await session.exec(select(func.sum(EstatisticaEstado.quantidade)))).first()
             return result or 0
 
-    def get_total_culturas(self) -> int:
+    async def get_total_culturas(self) -> int:
         """Retorna o total de culturas plantadas (total de registros de safras)"""
         if self.db is None:
             logger.warning("Banco de dados não disponível")
             return 0
         
-        with Session(self.db) as session:
-            from sqlalchemy import func
-            result = session.exec(select(func.count(Safra.id))).first()
+        async with self._session() as session:
+            result = (await session.exec(select(func.sum(EstatisticaCultura.quantidade)))).first()
             return result or 0
 
-    def get_culturas_agrupadas(self) -> list:
-        """Retorna o total de cada cultura plantada (agrupado por nome da cultura)"""
+    async def get_culturas_agrupadas(self) -> list:
+        """Retorna o total de cada cultura plantada (tabela de agregados)"""
         if self.db is None:
             logger.warning("Banco de dados não disponível, retornando lista vazia")
             return []
         
-        with Session(self.db) as session:
-            from sqlalchemy import func
-            statement = select(Safra.cultura, func.count(Safra.id).label("quantidade")).group_by(Safra.cultura).order_by(func.count(Safra.id).desc())
-            result = session.exec(statement).all()
+        async with self._session() as session:
+            statement = (
+                select(EstatisticaCultura.cultura, EstatisticaCultura.quantidade)
+                .order_by(EstatisticaCultura.quantidade.desc())
+            )
+            result = (await session.exec(statement)).all()
             return [{"cultura": row.cultura, "quantidade": row.quantidade} for row in result]
 
-    def get_safras_por_ano(self) -> List[dict]:
-        """Retorna o total de safras agrupadas por ano"""
+    async def get_safras_por_ano(self) -> List[dict]:
+        """Retorna o total de safras agrupadas por ano (tabela de agregados)"""
         if self.db is None:
             logger.warning("Banco de dados não disponível, retornando lista vazia")
             return []
         
-        with Session(self.db) as session:
-            from sqlalchemy import func
-            result = session.exec(
-                select(
-                    Safra.ano,
-                    func.count(Safra.id).label("quantidade")
-                ).group_by(Safra.ano).order_by(Safra.ano.desc())
-            ).all()
+        async with self._session() as session:
+            result = (await session.exec(
+                select(EstatisticaAno.ano, EstatisticaAno.quantidade)
+                .order_by(EstatisticaAno.ano.desc())
+            )).all()
             
             return [{"ano": row.ano, "quantidade": row.quantidade} for row in result]
 
-    def get_estatisticas_areas(self) -> dict:
+    async def get_estatisticas_areas(self) -> dict:
         """Retorna estatísticas de áreas das fazendas (total, agricultável e vegetação)"""
         if self.db is None:
             logger.warning("Banco de dados não disponível")
             return {"area_total": 0, "area_agricultavel": 0, "area_vegetacao": 0}
         
-        with Session(self.db) as session:
-            from sqlalchemy import func
-            # Calcular soma das áreas totais e agricultáveis
-            result = session.exec(
+        async with self._session() as session:
+            # Soma das áreas já agregadas por estado
+            result = (await session.exec(
                 select(
-                    func.sum(Fazenda.areatotalfazenda).label("area_total"),
-                    func.sum(Fazenda.areaagricutavel).label("area_agricultavel")
+                    func.sum(EstatisticaEstado.area_total).label("area_total"),
+                    func.sum(EstatisticaEstado.area_agricultavel).label("area_agricultavel")
                 )
-            ).first()
+            )).first()
             
-            area_total = result.area_total or 0
-            area_agricultavel = result.area_agricultavel or 0
+            area_total = float(result.area_total or 0)
+            area_agricultavel = float(result.area_agricultavel or 0)
             area_vegetacao = area_total - area_agricultavel
             
             return {
@@ -403,5 +774,137 @@ class Brain_AgricultureRepository(BaseRepository):
                 "area_vegetacao": area_vegetacao
             }
 
-
- 
\ No newline at end of file
+    async def get_dashboard(self) -> dict:
+        """
+        Busca todas as estatísticas do dashboard numa única query (uma ida ao banco)
+        sobre as tabelas de agregados, unidas com UNION ALL e identificadas pela
+        coluna 'dimensao'; os totais são somados a partir das linhas por grupo
+        """
+        dashboard = {
+            "total_fazendas": 0,
+            "area_total": 0,
+            "area_agricultavel": 0,
+            "area_vegetacao": 0,
+            "fazendas_por_estado": [],
+            "total_culturas": 0,
+            "culturas": [],
+            "safras_por_ano": [],
+        }
+        if self.db is None:
+            logger.warning("Banco de dados não disponível")
+            return dashboard
+        
+        estados = select(
+            literal("estado").label("dimensao"),
+            EstatisticaEstado.estado.label("chave"),
+            cast(null(), Integer).label("ano"),
+            EstatisticaEstado.quantidade,
+            EstatisticaEstado.area_total,
+            EstatisticaEstado.area_agricultavel,
+        )
+        culturas = select(
+            literal("cultura").label("dimensao"),
+            EstatisticaCultura.cultura.label("chave"),
+            cast(null(), Integer).label("ano"),
+            EstatisticaCultura.quantidade,
+            cast(null(), Numeric).label("area_total"),
+            cast(null(), Numeric).label("area_agricultavel"),
+        )
+        anos = select(
+            literal("ano").label("dimensao"),
+            cast(null(), String).label("chave"),
+            EstatisticaAno.ano,
+            EstatisticaAno.quantidade,
+            cast(null(), Numeric).label("area_total"),
+            cast(null(), Numeric).label("area_agricultavel"),
+        )
+        
+        async with self._session() as session:
+            linhas = (await session.exec(union_all(estados, culturas, anos))).all()
+        
+        area_total = 0
+        area_agricultavel = 0
+        for linha in linhas:
+            if linha.dimensao == "estado":
+                dashboard["total_fazendas"] += linha.quantidade
+                area_total += linha.area_total or 0
+                area_agricultavel += linha.area_agricultavel or 0
+                dashboard["fazendas_por_estado"].append({"estado": linha.chave, "quantidade": linha.quantidade})
+            elif linha.dimensao == "cultura":
+                dashboard["total_culturas"] += linha.quantidade
+                dashboard["culturas"].append({"cultura": linha.chave, "quantidade": linha.quantidade})
+            elif linha.dimensao == "ano":
+                dashboard["safras_por_ano"].append({"ano": linha.ano, "quantidade": linha.quantidade})
+        
+        dashboard["area_total"] = float(area_total)
+        dashboard["area_agricultavel"] = float(area_agricultavel)
+        dashboard["area_vegetacao"] = float(area_total - area_agricultavel)
+        
+        # Mesma ordenação dos endpoints individuais
+        dashboard["fazendas_por_estado"].sort(key=lambda item: -item["quantidade"])
+        dashboard["culturas"].sort(key=lambda item: -item["quantidade"])
+        dashboard["safras_por_ano"].sort(key=lambda item: -item["ano"])
+        return dashboard
+
+    async def get_cubo_safras(
+        self,
+        dimensoes: List[str],
+        estado: Optional[str] = None,
+        cidade: Optional[str] = None,
+        cultura: Optional[str] = None,
+        ano: Optional[int] = None,
+        limite: Optional[int] = None,
+    ) -> List[dict]:
+        """
+        Cubo de safras: quantidade e área plantada (área agricultável da fazenda de cada
+        safra) com GROUP BY CUBE sobre as dimensões pedidas, numa única query.
+        Cada célula informa em 'dimensoes' por quais colunas foi agrupada ([] = total geral).
+        limite restringe a quantidade de células lidas
+        """
+        if self.db is None:
+            logger.warning("Banco de dados não disponível, retornando lista vazia")
+            return []
+        
+        colunas = {
+            "estado": Fazenda.estado,
+            "cidade": Fazenda.cidade,
+            "cultura": Safra.cultura,
+            "ano": Safra.ano,
+        }
+        agrupadas = [colunas[dimensao] for dimensao in dimensoes]
+        
+        statement = (
+            select(
+                *[colunas[dimensao].label(dimensao) for dimensao in dimensoes],
+                *[func.grouping(colunas[dimensao]).label(f"grouping_{dimensao}") for dimensao in dimensoes],
+                func.count(Safra.id).label("quantidade"),
+                func.coalesce(func.sum(Fazenda.areaagricutavel), 0).label("area_plantada"),
+            )
+            .select_from(Safra)
+            .join(Fazenda, Safra.idfazenda == Fazenda.id)
+        )
+        filtros = {"estado": estado, "cidade": cidade, "cultura": cultura, "ano": ano}
+        for nome, valor in filtros.items():
+            if valor is not None:
+                statement = statement.where(colunas[nome] == valor)
+        if agrupadas:
+            statement = statement.group_by(func.cube(*agrupadas)).order_by(*agrupadas)
+        if limite is not None:
+            statement = statement.limit(limite)
+        
+        async with self._session() as session:
+            linhas = (await session.exec(statement)).all()
+        
+        celulas = []
+        for linha in linhas:
+            celula = {dimensao: None for dimensao in colunas}
+            agrupada_por = []
+            for dimensao in dimensoes:
+                if getattr(linha, f"grouping_{dimensao}") == 0:
+                    celula[dimensao] = getattr(linha, dimensao)
+                    agrupada_por.append(dimensao)
+            celula["dimensoes"] = agrupada_por
+            celula["quantidade"] = linha.quantidade
+            celula["area_plantada"] = float(linha.area_plantada or 0)
+            celulas.append(celula)
+        return celulas
@@ -5,7 +5,7 @@ from typing import List, Optional
 from uuid import UUID
 import re
 
-from pydantic import BaseModel, Field, ConfigDict, validator
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter, validator
 
 # Schemas para criação (sem ID obrigatório)
 class ProdutorCreate(BaseModel):
@@ -83,6 +83,12 @@ class Safra(BaseModel):
     idfazenda: int = Field(example=1, description="ID da fazenda (chave estrangeira)")
 
 
+# Adapters das listagens: validam as linhas do banco uma única vez e serializam direto para bytes
+ListaProdutores = TypeAdapter(List[Produtor])
+ListaFazendas = TypeAdapter(List[Fazenda])
+ListaSafras = TypeAdapter(List[Safra])
+
+
 class DadosFazenda(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     
@@ -177,6 +183,47 @@ class ResumoFazendas(BaseModel):
     total_area: float = Field(example=1500.5, description="Total de área cadastrada em hectares")
 
 
+class Dashboard(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    """Schema com todas as estatísticas do dashboard em um único payload"""
+    resumo: ResumoFazendas = Field(description="Total de fazendas e área total cadastrada")
+    estatisticas_fazendas: EstatisticasFazendas = Field(description="Total de fazendas e fazendas por estado")
+    estatisticas_areas: EstatisticasAreas = Field(description="Áreas total, agricultável e de vegetação")
+    estatisticas_culturas: EstatisticasCulturas = Field(description="Total de safras e quantidade por cultura")
+    estatisticas_safras_por_ano: EstatisticasSafrasPorAno = Field(description="Quantidade de safras por ano")
+
+
+class EstatisticasCacheEntidades(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    """Acertos e falhas do cache de produtor/fazenda/safra por id (por worker)"""
+    hits: int = Field(example=950, description="Buscas atendidas pelo cache")
+    misses: int = Field(example=50, description="Buscas que foram ao banco")
+    taxa_acerto: float = Field(example=0.95, description="hits / (hits + misses)")
+
+
+class CelulaCubo(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    """Célula do cubo de safras; dimensões fora de 'dimensoes' são subtotais (null)"""
+    estado: Optional[str] = Field(default=None, example="SP", description="Estado da fazenda")
+    cidade: Optional[str] = Field(default=None, example="Ribeirão Preto", description="Cidade da fazenda")
+    cultura: Optional[str] = Field(default=None, example="Soja", description="Cultura plantada")
+    ano: Optional[int] = Field(default=None, example=2024, description="Ano da safra")
+    dimensoes: List[str] = Field(example=["estado", "cultura"], description="Dimensões pelas quais a célula foi agrupada ([] = total geral)")
+    quantidade: int = Field(example=12, description="Quantidade de safras")
+    area_plantada: float = Field(example=850.5, description="Soma da área agricultável das fazendas das safras, em hectares")
+
+
+class CuboSafras(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    """Cubo de safras com todos os subtotais das dimensões pedidas"""
+    dimensoes: List[str] = Field(example=["estado", "cultura", "ano"], description="Dimensões do cubo")
+    celulas: List[CelulaCubo] = Field(description="Células agregadas (inclui subtotais e total geral)")
+
+
 class FazendaResumida(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     
@@ -241,6 +288,47 @@ class DadosCompletosResponse(BaseModel):
     }, description="IDs dos registros criados")
 
 
+class ItemLote(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    """Resultado de um item de uma criação em lote"""
+    indice: int = Field(example=0, description="Posição do item no array enviado")
+    success: bool = Field(example=True, description="Indica se o item foi gravado")
+    id: Optional[int] = Field(default=None, example=10, description="ID do registro criado")
+    message: str = Field(example="Safra criada com sucesso", description="Mensagem do item")
+
+
+class ResultadoLote(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    """Schema para resposta das criações em lote (/bulk)"""
+    success: bool = Field(example=True, description="Indica se o lote foi processado")
+    message: str = Field(example="2 de 3 registros inseridos", description="Mensagem de retorno")
+    inseridos: int = Field(example=2, description="Quantidade de registros gravados")
+    rejeitados: int = Field(example=1, description="Quantidade de itens rejeitados")
+    itens: List[ItemLote] = Field(default=[], description="Resultado de cada item, na ordem de entrada")
+
+
+class LinhaRejeitada(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    """Linha do arquivo importado que não foi gravada"""
+    linha: int = Field(example=42, description="Número da linha no arquivo")
+    motivo: str = Field(example="Fazenda não encontrada", description="Motivo da rejeição")
+
+
+class ResultadoImportacao(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    """Relatório de uma importação CSV/NDJSON"""
+    success: bool = Field(example=True, description="Indica se o arquivo foi processado até o fim")
+    message: str = Field(example="9998 de 10000 linhas importadas", description="Mensagem de retorno")
+    total: int = Field(example=10000, description="Quantidade de linhas lidas")
+    inseridos: int = Field(example=9998, description="Quantidade de registros gravados")
+    rejeitados: int = Field(example=2, description="Quantidade de linhas rejeitadas")
+    erros: List[LinhaRejeitada] = Field(default=[], description="Linhas rejeitadas (limitado a IMPORT_MAX_ERROS)")
+
+
 class FazendaComSafras(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     
@@ -1,25 +1,45 @@
 import datetime as dt
+import functools
 import logging
 import time
 import uuid
-import re
-from typing import Dict, Optional, List
+from typing import AsyncIterable, AsyncIterator, Dict, Optional, List, Tuple
 
+from app.core.cache import EntityCache, LRUCacheBackend, SingleFlight, TTLCache, versoes_da_requisicao
+from app.core.config import config
+from app.core.database import get_current_unit_of_work
 from app.core.services import BaseService
-from app.brain_agriculture.repositories.brain_agriculture import Brain_AgricultureRepository
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+
+from app.shared.constants import CUBO_DIMENSOES, CUBO_MAX_CELULAS, IMPORT_CHUNK_SIZE, IMPORT_MAX_ERROS
+from app.shared.helpers.converters import csv_to_rows, ndjson_to_rows, rows_to_csv, rows_to_ndjson
+from app.shared.helpers.cpf import formatar_cpf, normalizar_cpfs, validar_cpfs
+from app.brain_agriculture.repositories.brain_agriculture import AsyncBrain_AgricultureRepository
 from app.brain_agriculture.schemas.brain_agriculture import (
     DadosFazenda,
     ReceiveBrain_AgricultureSchema,
     Produtor,
     Fazenda,
     Safra,
+    ListaProdutores,
+    ListaFazendas,
+    ListaSafras,
     ReturnSucess,
+    ItemLote,
+    ResultadoLote,
+    LinhaRejeitada,
+    ResultadoImportacao,
     EstatisticasFazendas,
     FazendaPorEstado,
     EstatisticasCulturas,
     CulturaQuantidade,
     EstatisticasAreas,
     ResumoFazendas,
+    Dashboard,
+    CelulaCubo,
+    CuboSafras,
+    EstatisticasCacheEntidades,
     FazendaResumida,
     ProdutorResumido,
     ProdutorCreate,
@@ -29,7 +49,6 @@ from app.brain_agriculture.schemas.brain_agriculture import (
     DadosCompletosResponse,
     ProdutorCompleto,
     FazendaCompleta,
-    FazendaComSafras,
     VincularFazendaProdutor,
     VincularProdutorFazenda,
     EstatisticasSafrasPorAno,
@@ -40,43 +59,195 @@ from app.brain_agriculture.models.brain_agriculture import Produtor as ProdutorM
 logger = logging.getLogger(__name__)
 
 
+def _com_versoes(chave):
+    """Acrescenta à chave as versões das tabelas da ETag da requisição, se houver"""
+    versoes = versoes_da_requisicao()
+    return (chave, versoes) if versoes else chave
+
+
+def cache_estatisticas(chave, cache="stats_cache"):
+    """
+    Serve o resultado do cache de estatísticas; na ausência, calcula e armazena.
+    Um valor vencido (dentro do stale_ttl) é servido na hora e recalculado em segundo plano.
+    chave pode ser uma função dos argumentos do método (uma entrada por combinação);
+    cache é o atributo do service com o TTLCache usado. Com ETag na requisição, as
+    versões das tabelas entram na chave, para que o corpo servido corresponda à ETag
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            chave_cache = _com_versoes(chave(*args, **kwargs) if callable(chave) else chave)
+            ttl_cache = getattr(self, cache)
+
+            async def calcular():
+                geracao = ttl_cache.geracao
+                resultado = await func(self, *args, **kwargs)
+                await ttl_cache.set(chave_cache, resultado, geracao=geracao)
+                return resultado
+
+            resultado, fresco = await ttl_cache.lookup(chave_cache)
+            if resultado is not None:
+                if not fresco:
+                    self.single_flight.do_background(chave_cache, calcular)
+                return resultado
+
+            return await self.single_flight.do(chave_cache, calcular)
+        return wrapper
+    return decorator
+
+
+def single_flight(chave):
+    """
+    Chamadas concorrentes com a mesma chave (função dos argumentos) compartilham uma única execução.
+    Com ETag na requisição, só se juntam as que leram as mesmas versões das tabelas
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            return await self.single_flight.do(
+                _com_versoes(chave(*args, **kwargs)),
+                lambda: func(self, *args, **kwargs)
+            )
+        return wrapper
+    return decorator
+
+
+def invalida_estatisticas(func):
+    """Invalida o cache de estatísticas após uma escrita (e de novo após o commit da requisição)"""
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        try:
+            return await func(self, *args, **kwargs)
+        finally:
+            await self._invalidar_estatisticas()
+    return wrapper
+
+
 class Brain_AgricultureService(BaseService):
-    def __init__(self, brain_agriculture_repository: Brain_AgricultureRepository):
+    def __init__(
+        self,
+        brain_agriculture_repository: AsyncBrain_AgricultureRepository,
+        stats_cache: Optional[TTLCache] = None,
+        single_flight: Optional[SingleFlight] = None,
+        entity_cache: Optional[EntityCache] = None,
+        cubo_cache: Optional[TTLCache] = None,
+        validar_digitos_cpf: Optional[bool] = None,
+    ):
         self.brain_agriculture_repository = brain_agriculture_repository
+        # Conferência opcional dos dígitos verificadores (CPF_VALIDAR_DIGITOS); sem ela, só 11 dígitos
+        if validar_digitos_cpf is None:
+            validar_digitos_cpf = config.CPF_VALIDAR_DIGITOS
+        self.validar_digitos_cpf = validar_digitos_cpf
+        if stats_cache is None:
+            stats_cache = TTLCache(
+                ttl=config.STATS_CACHE_TTL,
+                stale_ttl=config.STATS_CACHE_STALE_TTL,
+                backend=LRUCacheBackend(max_itens=config.STATS_CACHE_MAX_ITEMS),
+            )
+        self.stats_cache = stats_cache
+        # Cubos ficam num cache à parte, para que um cubo grande não descarte as demais estatísticas
+        if cubo_cache is None:
+            cubo_cache = TTLCache(
+                ttl=config.STATS_CACHE_TTL,
+                stale_ttl=config.STATS_CACHE_STALE_TTL,
+                backend=LRUCacheBackend(max_itens=config.CUBO_CACHE_MAX_ITEMS),
+                namespace="cubo",
+            )
+        self.cubo_cache = cubo_cache
+        self.single_flight = single_flight if single_flight is not None else SingleFlight()
+        if entity_cache is None:
+            entity_cache = EntityCache(
+                ttl=config.ENTITY_CACHE_TTL,
+                backend=LRUCacheBackend(max_itens=config.ENTITY_CACHE_MAX_ITEMS),
+            )
+        self.entity_cache = entity_cache
         super().__init__(brain_agriculture_repository)
 
+    async def _invalidar_estatisticas(self) -> None:
+        """
+        Descarta as estatísticas em cache e desliga leituras novas das consultas em
+        andamento. Dentro de uma requisição repete depois do commit, para não manter
+        valores lidos antes da transação terminar.
+        """
+        await self._descartar_leituras()
+        unit_of_work = get_current_unit_of_work()
+        if unit_of_work is not None:
+            unit_of_work.after_commit(self._descartar_leituras)
+
+    async def _descartar_leituras(self) -> None:
+        await self.stats_cache.invalidate()
+        await self.cubo_cache.invalidate()
+        self.single_flight.forget()
+
+    async def _invalidar_entidade(self, entidade: str, entidade_id: Optional[int] = None) -> None:
+        """Descarta a entidade (ou, sem id, todas do tipo) do cache, agora e de novo após o commit"""
+        await self.entity_cache.invalidate(entidade, entidade_id)
+        unit_of_work = get_current_unit_of_work()
+        if unit_of_work is not None:
+            unit_of_work.after_commit(lambda: self.entity_cache.invalidate(entidade, entidade_id))
+
+    async def _buscar_entidade(self, entidade: str, entidade_id: int, buscar, schema):
+        """
+        Busca read-through no cache de entidades; em cache fica o schema já convertido.
+        Só para leituras: verificações antes de uma escrita consultam o repositório, na
+        transação corrente, pois o cache de outro worker pode ter um registro já excluído.
+        """
+        async def carregar():
+            registro = await buscar(entidade_id)
+            return schema.from_orm(registro) if registro else None
+        return await self.entity_cache.get_or_load(entidade, entidade_id, carregar, versoes_da_requisicao())
+
+    async def _gravar_lote(
+        self,
+        total: int,
+        candidatos: List[Tuple[int, dict]],
+        rejeitados: Dict[int, str],
+        inserir,
+        mensagem_sucesso: str,
+    ) -> ResultadoLote:
+        """Grava os candidatos (índice, linha) num único INSERT e monta o resultado por item"""
+        ids = await inserir([linha for _, linha in candidatos])
+        gravados = {indice: (registro_id, mensagem_sucesso) for (indice, _), registro_id in zip(candidatos, ids)}
+        return self._resultado_lote(total, gravados, rejeitados)
+
+    def _resultado_lote(self, total: int, gravados: Dict[int, Tuple[int, str]], rejeitados: Dict[int, str]) -> ResultadoLote:
+        """Resultado por item, na ordem de entrada: gravados (índice -> id, mensagem) e rejeitados (índice -> motivo)"""
+        itens = [
+            ItemLote(indice=indice, success=True, id=gravados[indice][0], message=gravados[indice][1])
+            if indice in gravados
+            else ItemLote(indice=indice, success=False, message=rejeitados[indice])
+            for indice in range(total)
+        ]
+        return ResultadoLote(
+            success=True,
+            message=f"{len(gravados)} de {total} registros gravados",
+            inseridos=len(gravados),
+            rejeitados=total - len(gravados),
+            itens=itens,
+        )
+
     def _padronizar_cpf(self, cpf: str) -> str:
         """
         Padroniza o CPF removendo caracteres especiais e formatando como XXX.XXX.XXX-XX
         """
-        # Remove todos os caracteres não numéricos
-        cpf_limpo = re.sub(r'[^\d]', '', cpf)
-        
-        # Verifica se tem 11 dígitos
-        if len(cpf_limpo) != 11:
-            raise ValueError("CPF deve conter 11 dígitos")
+        numerico, = normalizar_cpfs([cpf])
+        valido, = self._validar_cpfs([numerico])
+        if not valido:
+            raise ValueError(self._motivo_cpf_invalido(numerico))
         
-        # Formata como XXX.XXX.XXX-XX
-        cpf_formatado = f"{cpf_limpo[:3]}.{cpf_limpo[3:6]}.{cpf_limpo[6:9]}-{cpf_limpo[9:]}"
-        
-        return cpf_formatado
+        return formatar_cpf(numerico)
 
-    def _verificar_cpf_existente(self, cpf: str, excluir_id: Optional[int] = None) -> Optional[Produtor]:
-        """
-        Verifica se já existe um produtor com o CPF fornecido
-        Se excluir_id for fornecido, ignora esse ID na verificação (para updates)
-        """
-        try:
-            cpf_padronizado = self._padronizar_cpf(cpf)
-            existing_produtor = self.brain_agriculture_repository.get_produtor_by_cpf(cpf_padronizado)
-            
-            if existing_produtor and (excluir_id is None or existing_produtor.id != excluir_id):
-                return existing_produtor
-            
-            return None
-        except ValueError as e:
-            logger.error(f"Erro ao padronizar CPF '{cpf}': {e}")
-            raise e
+    def _validar_cpfs(self, numericos: List[Optional[int]]) -> List[bool]:
+        """CPFs normalizados válidos: 11 dígitos e, com CPF_VALIDAR_DIGITOS, dígitos verificadores corretos"""
+        if self.validar_digitos_cpf:
+            return validar_cpfs(numericos)
+        return [numerico is not None for numerico in numericos]
+
+    @staticmethod
+    def _motivo_cpf_invalido(numerico: Optional[int]) -> str:
+        if numerico is None:
+            return "CPF deve conter 11 dígitos"
+        return "Dígitos verificadores do CPF não conferem"
 
     async def get_teste(self, fazenda: str) -> DadosFazenda:
         return await self.brain_agriculture_repository.get_teste(fazenda)
@@ -92,48 +263,61 @@ class Brain_AgricultureService(BaseService):
             raise e
 
     # Métodos CRUD para Produtores
-    async def get_all_produtores(self) -> List[Produtor]:
-        """Busca todos os produtores"""
+    async def get_all_produtores(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+        order: str = "asc",
+    ) -> List[Produtor]:
+        """Busca produtores paginados por cursor (id)"""
         try:
-            produtores = self.brain_agriculture_repository.get_all_produtores()
-            return [Produtor.from_orm(produtor) for produtor in produtores]
+            produtores = await self.brain_agriculture_repository.get_all_produtores(
+                limit=limit, after=after, order=order
+            )
+            return ListaProdutores.validate_python(produtores, from_attributes=True)
         except Exception as e:
             logger.error(f"Erro ao buscar produtores: {e}")
             raise e
 
+    async def get_produtores_by_ids(self, ids: List[int]) -> List[Produtor]:
+        """Busca produtores em lote pelos IDs, na ordem informada (IDs inexistentes ficam de fora)"""
+        try:
+            produtores = await self.brain_agriculture_repository.get_produtores_by_ids(ids)
+            return ListaProdutores.validate_python(produtores, from_attributes=True)
+        except Exception as e:
+            logger.error(f"Erro ao buscar produtores por IDs: {e}")
+            raise e
+
     async def get_produtor_by_id(self, produtor_id: int) -> Optional[Produtor]:
         """Busca um produtor pelo ID"""
         try:
-            produtor = self.brain_agriculture_repository.get_produtor_by_id(produtor_id)
-            if produtor:
-                return Produtor.from_orm(produtor)
-            return None
+            return await self._buscar_entidade(
+                "produtor", produtor_id, self.brain_agriculture_repository.get_produtor_by_id, Produtor
+            )
         except Exception as e:
             logger.error(f"Erro ao buscar produtor {produtor_id}: {e}")
             raise e
 
+    @invalida_estatisticas
     async def create_produtor(self, produtor_data: ProdutorCreate) -> ReturnSucess:
         """Cria um novo produtor"""
         try:
             # Padronizar CPF
             cpf_padronizado = self._padronizar_cpf(produtor_data.cpf)
             
-            # Verificar se já existe um produtor com o mesmo CPF
-            existing_produtor = self._verificar_cpf_existente(cpf_padronizado)
-            if existing_produtor:
-                return ReturnSucess(
-                    success=False,
-                    message="Já existe um produtor cadastrado com este CPF",
-                    data={}
-                )
-            
-            # Criar o produtor no banco com CPF padronizado
+            # Criar o produtor no banco com CPF padronizado (ON CONFLICT: None se o CPF já existir)
             produtor_model = ProdutorModel(
                 cpf=cpf_padronizado,
                 nomeprodutor=produtor_data.nomeprodutor
             )
             
-            created_produtor = self.brain_agriculture_repository.create_produtor(produtor_model)
+            created_produtor = await self.brain_agriculture_repository.create_produtor(produtor_model)
+            if created_produtor is None:
+                return ReturnSucess(
+                    success=False,
+                    message="Já existe um produtor cadastrado com este CPF",
+                    data={}
+                )
             
             return ReturnSucess(
                 success=True,
@@ -155,32 +339,61 @@ class Brain_AgricultureService(BaseService):
                 data={}
             )
 
-    async def update_produtor(self, produtor_id: int, produtor_data: dict) -> ReturnSucess:
-        """Atualiza um produtor existente"""
+    @invalida_estatisticas
+    async def create_produtores_lote(self, produtores: List[ProdutorCreate], upsert: bool = False) -> ResultadoLote:
+        """
+        Grava produtores em lote num INSERT multi-linha ... ON CONFLICT (cpf_numerico): CPFs já cadastrados
+        são rejeitados por item ou, com upsert, têm o nome atualizado. CPFs inválidos ou
+        repetidos no lote são rejeitados por item
+        """
         try:
-            # Verificar se o produtor existe
-            existing_produtor = self.brain_agriculture_repository.get_produtor_by_id(produtor_id)
-            if not existing_produtor:
-                return ReturnSucess(
-                    success=False,
-                    message="Produtor não encontrado",
-                    data={}
+            candidatos = []
+            rejeitados = {}
+            cpfs_no_lote = {}
+            # Normaliza e valida os CPFs do lote de uma vez; a chave natural é o CPF numérico
+            numericos = normalizar_cpfs([produtor_data.cpf for produtor_data in produtores])
+            validos = self._validar_cpfs(numericos)
+            for indice, (produtor_data, numerico, valido) in enumerate(zip(produtores, numericos, validos)):
+                if not valido:
+                    rejeitados[indice] = f"CPF inválido: {self._motivo_cpf_invalido(numerico)}"
+                    continue
+                if numerico in cpfs_no_lote:
+                    rejeitados[indice] = f"CPF repetido no lote (item {cpfs_no_lote[numerico]})"
+                    continue
+                cpfs_no_lote[numerico] = indice
+                candidatos.append({"cpf": formatar_cpf(numerico), "nomeprodutor": produtor_data.nomeprodutor})
+            
+            linhas = await self.brain_agriculture_repository.upsert_produtores(candidatos, atualizar=upsert)
+            gravados = {
+                cpfs_no_lote[linha.cpf_numerico]: (
+                    linha.id, "Produtor criado com sucesso" if linha.criado else "Produtor atualizado com sucesso"
                 )
+                for linha in linhas
+            }
+            for indice in cpfs_no_lote.values():
+                if indice not in gravados:
+                    rejeitados[indice] = "Já existe um produtor cadastrado com este CPF"
+            if any(not linha.criado for linha in linhas):
+                await self._invalidar_entidade("produtor")
             
-            # Se estiver atualizando o CPF, padronizar e verificar duplicatas
+            return self._resultado_lote(len(produtores), gravados, rejeitados)
+        except Exception as e:
+            logger.error(f"Erro ao criar produtores em lote: {e}")
+            return ResultadoLote(
+                success=False,
+                message=f"Erro ao criar produtores em lote: {str(e)}",
+                inseridos=0,
+                rejeitados=len(produtores),
+            )
+
+    @invalida_estatisticas
+    async def update_produtor(self, produtor_id: int, produtor_data: dict) -> ReturnSucess:
+        """Atualiza um produtor existente"""
+        try:
+            # Se estiver atualizando o CPF, padronizar (duplicatas são barradas pelo índice único)
             if 'cpf' in produtor_data:
                 try:
-                    cpf_padronizado = self._padronizar_cpf(produtor_data['cpf'])
-                    # Verificar se existe outro produtor com o mesmo CPF (excluindo o atual)
-                    duplicate_produtor = self._verificar_cpf_existente(cpf_padronizado, excluir_id=produtor_id)
-                    if duplicate_produtor:
-                        return ReturnSucess(
-                            success=False,
-                            message="Já existe outro produtor cadastrado com este CPF",
-                            data={}
-                        )
-                    # Atualizar o CPF com a versão padronizada
-                    produtor_data['cpf'] = cpf_padronizado
+                    produtor_data['cpf'] = self._padronizar_cpf(produtor_data['cpf'])
                 except ValueError as e:
                     return ReturnSucess(
                         success=False,
@@ -188,9 +401,11 @@ class Brain_AgricultureService(BaseService):
                         data={}
                     )
             
-            updated_produtor = self.brain_agriculture_repository.update_produtor(produtor_id, produtor_data)
+            # UPDATE ... RETURNING: nenhuma linha afetada significa produtor inexistente
+            updated_produtor = await self.brain_agriculture_repository.update_produtor(produtor_id, produtor_data)
             
             if updated_produtor:
+                await self._invalidar_entidade("produtor", produtor_id)
                 return ReturnSucess(
                     success=True,
                     message="Produtor atualizado com sucesso",
@@ -199,9 +414,16 @@ class Brain_AgricultureService(BaseService):
             else:
                 return ReturnSucess(
                     success=False,
-                    message="Erro ao atualizar produtor",
+                    message="Produtor não encontrado",
                     data={}
                 )
+        except IntegrityError as e:
+            logger.error(f"CPF duplicado ao atualizar produtor {produtor_id}: {e}")
+            return ReturnSucess(
+                success=False,
+                message="Já existe outro produtor cadastrado com este CPF",
+                data={}
+            )
         except Exception as e:
             logger.error(f"Erro ao atualizar produtor {produtor_id}: {e}")
             return ReturnSucess(
@@ -210,11 +432,12 @@ class Brain_AgricultureService(BaseService):
                 data={}
             )
 
+    @invalida_estatisticas
     async def delete_produtor(self, produtor_id: int) -> ReturnSucess:
         """Exclui um produtor e todas as suas fazendas e safras em cascata"""
         try:
             # Verificar se o produtor existe
-            existing_produtor = self.brain_agriculture_repository.get_produtor_by_id(produtor_id)
+            existing_produtor = await self.brain_agriculture_repository.get_produtor_by_id(produtor_id)
             if not existing_produtor:
                 return ReturnSucess(
                     success=False,
@@ -222,29 +445,17 @@ class Brain_AgricultureService(BaseService):
                     data={}
                 )
             
-            # 1. Buscar todas as fazendas do produtor
-            fazendas = self.brain_agriculture_repository.get_fazendas_by_produtor(produtor_id)
-            
-            # 2. Para cada fazenda, excluir todas as safras
-            safras_excluidas = 0
-            for fazenda in fazendas:
-                safras = self.brain_agriculture_repository.get_safras_by_fazenda(fazenda.id)
-                for safra in safras:
-                    self.brain_agriculture_repository.delete_safra(safra.id)
-                    safras_excluidas += 1
-                logger.info(f"Excluídas {len(safras)} safras da fazenda {fazenda.id}")
+            # Excluir safras, fazendas e o produtor com DELETEs em lote na mesma transação
+            excluidos = await self.brain_agriculture_repository.delete_produtor_cascade(produtor_id)
             
-            # 3. Excluir todas as fazendas do produtor
-            fazendas_excluidas = 0
-            for fazenda in fazendas:
-                self.brain_agriculture_repository.delete_fazenda(fazenda.id)
-                fazendas_excluidas += 1
-                logger.info(f"Excluída fazenda {fazenda.id}")
-            
-            # 4. Excluir o produtor
-            success = self.brain_agriculture_repository.delete_produtor(produtor_id)
-            
-            if success:
+            if excluidos is not None:
+                # As fazendas e safras do produtor saíram junto, em cascata
+                await self._invalidar_entidade("produtor", produtor_id)
+                await self._invalidar_entidade("fazenda")
+                await self._invalidar_entidade("safra")
+                fazendas_excluidas = excluidos["fazendas_excluidas"]
+                safras_excluidas = excluidos["safras_excluidas"]
+                logger.info(f"Produtor {produtor_id} excluído com {fazendas_excluidas} fazendas e {safras_excluidas} safras")
                 return ReturnSucess(
                     success=True,
                     message=f"Produtor excluído com sucesso. Foram excluídas {fazendas_excluidas} fazendas e {safras_excluidas} safras",
@@ -269,22 +480,40 @@ class Brain_AgricultureService(BaseService):
             )
 
     # Métodos CRUD para Fazendas
-    async def get_all_fazendas(self) -> List[Fazenda]:
-        """Busca todas as fazendas"""
+    async def get_all_fazendas(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+        order: str = "asc",
+        estado: Optional[str] = None,
+        cidade: Optional[str] = None,
+        idprodutor: Optional[int] = None,
+    ) -> List[Fazenda]:
+        """Busca fazendas paginadas por cursor (id) com filtros opcionais"""
         try:
-            fazendas = self.brain_agriculture_repository.get_all_fazendas()
-            return [Fazenda.from_orm(fazenda) for fazenda in fazendas]
+            fazendas = await self.brain_agriculture_repository.get_all_fazendas(
+                limit=limit, after=after, order=order, estado=estado, cidade=cidade, idprodutor=idprodutor
+            )
+            return ListaFazendas.validate_python(fazendas, from_attributes=True)
         except Exception as e:
             logger.error(f"Erro ao buscar fazendas: {e}")
             raise e
 
+    async def get_fazendas_by_ids(self, ids: List[int]) -> List[Fazenda]:
+        """Busca fazendas em lote pelos IDs, na ordem informada (IDs inexistentes ficam de fora)"""
+        try:
+            fazendas = await self.brain_agriculture_repository.get_fazendas_by_ids(ids)
+            return ListaFazendas.validate_python(fazendas, from_attributes=True)
+        except Exception as e:
+            logger.error(f"Erro ao buscar fazendas por IDs: {e}")
+            raise e
+
     async def get_fazenda_by_id(self, fazenda_id: int) -> Optional[Fazenda]:
         """Busca uma fazenda pelo ID"""
         try:
-            fazenda = self.brain_agriculture_repository.get_fazenda_by_id(fazenda_id)
-            if fazenda:
-                return Fazenda.from_orm(fazenda)
-            return None
+            return await self._buscar_entidade(
+                "fazenda", fazenda_id, self.brain_agriculture_repository.get_fazenda_by_id, Fazenda
+            )
         except Exception as e:
             logger.error(f"Erro ao buscar fazenda {fazenda_id}: {e}")
             raise e
@@ -292,12 +521,13 @@ class Brain_AgricultureService(BaseService):
     async def get_fazendas_by_produtor(self, produtor_id: int) -> List[Fazenda]:
         """Busca fazendas de um produtor específico"""
         try:
-            fazendas = self.brain_agriculture_repository.get_fazendas_by_produtor(produtor_id)
-            return [Fazenda.from_orm(fazenda) for fazenda in fazendas]
+            fazendas = await self.brain_agriculture_repository.get_fazendas_by_produtor(produtor_id)
+            return ListaFazendas.validate_python(fazendas, from_attributes=True)
         except Exception as e:
             logger.error(f"Erro ao buscar fazendas do produtor {produtor_id}: {e}")
             raise e
 
+    @invalida_estatisticas
     async def create_fazenda(self, fazenda_data: FazendaCreate) -> ReturnSucess:
         """Cria uma nova fazenda"""
         try:
@@ -314,7 +544,7 @@ class Brain_AgricultureService(BaseService):
                 idprodutor=None  # Será definido quando a fazenda for vinculada a um produtor
             )
             
-            created_fazenda = self.brain_agriculture_repository.create_fazenda(fazenda_model)
+            created_fazenda = await self.brain_agriculture_repository.create_fazenda(fazenda_model)
             
             return ReturnSucess(
                 success=True,
@@ -329,42 +559,59 @@ class Brain_AgricultureService(BaseService):
                 data={}
             )
 
+    @invalida_estatisticas
+    async def create_fazendas_lote(self, fazendas: List[FazendaCreate]) -> ResultadoLote:
+        """Cria fazendas em lote, sem produtor vinculado, num INSERT multi-linha"""
+        try:
+            candidatos = [
+                (indice, {**fazenda_data.model_dump(), "idprodutor": None})
+                for indice, fazenda_data in enumerate(fazendas)
+            ]
+            return await self._gravar_lote(
+                len(fazendas), candidatos, {},
+                self.brain_agriculture_repository.create_fazendas_lote, "Fazenda criada com sucesso"
+            )
+        except Exception as e:
+            logger.error(f"Erro ao criar fazendas em lote: {e}")
+            return ResultadoLote(
+                success=False,
+                message=f"Erro ao criar fazendas em lote: {str(e)}",
+                inseridos=0,
+                rejeitados=len(fazendas),
+            )
+
+    @invalida_estatisticas
     async def update_fazenda(self, fazenda_id: int, fazenda_data: dict) -> ReturnSucess:
         """Atualiza uma fazenda existente"""
         try:
-            # Verificar se a fazenda existe
-            existing_fazenda = self.brain_agriculture_repository.get_fazenda_by_id(fazenda_id)
-            if not existing_fazenda:
-                return ReturnSucess(
-                    success=False,
-                    message="Fazenda não encontrada",
-                    data={}
-                )
-            
-            # Se estiver atualizando o produtor, verificar se existe
-            if 'idprodutor' in fazenda_data and fazenda_data['idprodutor'] is not None:
-                produtor = self.brain_agriculture_repository.get_produtor_by_id(fazenda_data['idprodutor'])
-                if not produtor:
-                    return ReturnSucess(
-                        success=False,
-                        message="Produtor não encontrado",
-                        data={}
-                    )
-            
-            updated_fazenda = self.brain_agriculture_repository.update_fazenda(fazenda_id, fazenda_data)
+            # UPDATE ... RETURNING com a existência do produtor no mesmo WHERE
+            updated_fazenda = await self.brain_agriculture_repository.update_fazenda(fazenda_id, fazenda_data)
             
             if updated_fazenda:
+                await self._invalidar_entidade("fazenda", fazenda_id)
                 return ReturnSucess(
                     success=True,
                     message="Fazenda atualizada com sucesso",
                     data={"id": updated_fazenda.id, "nome": updated_fazenda.nomefazenda, "cidade": updated_fazenda.cidade}
                 )
+            
+            # Nenhuma linha afetada: descobrir qual registro não existe
+            if not await self.brain_agriculture_repository.get_fazenda_by_id(fazenda_id):
+                message = "Fazenda não encontrada"
             else:
-                return ReturnSucess(
-                    success=False,
-                    message="Erro ao atualizar fazenda",
-                    data={}
-                )
+                message = "Produtor não encontrado"
+            return ReturnSucess(
+                success=False,
+                message=message,
+                data={}
+            )
+        except IntegrityError as e:
+            logger.error(f"Nome de fazenda duplicado para o produtor ao atualizar fazenda {fazenda_id}: {e}")
+            return ReturnSucess(
+                success=False,
+                message="O produtor já possui uma fazenda com este nome",
+                data={}
+            )
         except Exception as e:
             logger.error(f"Erro ao atualizar fazenda {fazenda_id}: {e}")
             return ReturnSucess(
@@ -373,11 +620,12 @@ class Brain_AgricultureService(BaseService):
                 data={}
             )
 
+    @invalida_estatisticas
     async def delete_fazenda(self, fazenda_id: int) -> ReturnSucess:
         """Exclui uma fazenda e todas as suas safras em cascata"""
         try:
             # Verificar se a fazenda existe
-            existing_fazenda = self.brain_agriculture_repository.get_fazenda_by_id(fazenda_id)
+            existing_fazenda = await self.brain_agriculture_repository.get_fazenda_by_id(fazenda_id)
             if not existing_fazenda:
                 return ReturnSucess(
                     success=False,
@@ -385,20 +633,14 @@ class Brain_AgricultureService(BaseService):
                     data={}
                 )
             
-            # 1. Buscar todas as safras da fazenda
-            safras = self.brain_agriculture_repository.get_safras_by_fazenda(fazenda_id)
-            
-            # 2. Excluir todas as safras da fazenda
-            safras_excluidas = 0
-            for safra in safras:
-                self.brain_agriculture_repository.delete_safra(safra.id)
-                safras_excluidas += 1
-                logger.info(f"Excluída safra {safra.id} da fazenda {fazenda_id}")
-            
-            # 3. Excluir a fazenda
-            success = self.brain_agriculture_repository.delete_fazenda(fazenda_id)
+            # Excluir as safras e a fazenda com DELETEs em lote na mesma transação
+            excluidos = await self.brain_agriculture_repository.delete_fazenda_cascade(fazenda_id)
             
-            if success:
+            if excluidos is not None:
+                await self._invalidar_entidade("fazenda", fazenda_id)
+                await self._invalidar_entidade("safra")
+                safras_excluidas = excluidos["safras_excluidas"]
+                logger.info(f"Fazenda {fazenda_id} excluída com {safras_excluidas} safras")
                 return ReturnSucess(
                     success=True,
                     message=f"Fazenda excluída com sucesso. Foram excluídas {safras_excluidas} safras",
@@ -422,22 +664,40 @@ class Brain_AgricultureService(BaseService):
             )
 
     # Métodos CRUD para Safras
-    async def get_all_safras(self) -> List[Safra]:
-        """Busca todas as safras"""
+    async def get_all_safras(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+        order: str = "asc",
+        cultura: Optional[str] = None,
+        ano: Optional[int] = None,
+        idfazenda: Optional[int] = None,
+    ) -> List[Safra]:
+        """Busca safras paginadas por cursor (id) com filtros opcionais"""
         try:
-            safras = self.brain_agriculture_repository.get_all_safras()
-            return [Safra.from_orm(safra) for safra in safras]
+            safras = await self.brain_agriculture_repository.get_all_safras(
+                limit=limit, after=after, order=order, cultura=cultura, ano=ano, idfazenda=idfazenda
+            )
+            return ListaSafras.validate_python(safras, from_attributes=True)
         except Exception as e:
             logger.error(f"Erro ao buscar safras: {e}")
             raise e
 
+    async def get_safras_by_ids(self, ids: List[int]) -> List[Safra]:
+        """Busca safras em lote pelos IDs, na ordem informada (IDs inexistentes ficam de fora)"""
+        try:
+            safras = await self.brain_agriculture_repository.get_safras_by_ids(ids)
+            return ListaSafras.validate_python(safras, from_attributes=True)
+        except Exception as e:
+            logger.error(f"Erro ao buscar safras por IDs: {e}")
+            raise e
+
     async def get_safra_by_id(self, safra_id: int) -> Optional[Safra]:
         """Busca uma safra pelo ID"""
         try:
-            safra = self.brain_agriculture_repository.get_safra_by_id(safra_id)
-            if safra:
-                return Safra.from_orm(safra)
-            return None
+            return await self._buscar_entidade(
+                "safra", safra_id, self.brain_agriculture_repository.get_safra_by_id, Safra
+            )
         except Exception as e:
             logger.error(f"Erro ao buscar safra {safra_id}: {e}")
             raise e
@@ -445,8 +705,8 @@ class Brain_AgricultureService(BaseService):
     async def get_safras_by_fazenda(self, fazenda_id: int) -> List[Safra]:
         """Busca safras de uma fazenda específica"""
         try:
-            safras = self.brain_agriculture_repository.get_safras_by_fazenda(fazenda_id)
-            return [Safra.from_orm(safra) for safra in safras]
+            safras = await self.brain_agriculture_repository.get_safras_by_fazenda(fazenda_id)
+            return ListaSafras.validate_python(safras, from_attributes=True)
         except Exception as e:
             logger.error(f"Erro ao buscar safras da fazenda {fazenda_id}: {e}")
             raise e
@@ -454,17 +714,18 @@ class Brain_AgricultureService(BaseService):
     async def get_safras_by_ano(self, ano: int) -> List[Safra]:
         """Busca safras por ano"""
         try:
-            safras = self.brain_agriculture_repository.get_safras_by_ano(ano)
-            return [Safra.from_orm(safra) for safra in safras]
+            safras = await self.brain_agriculture_repository.get_safras_by_ano(ano)
+            return ListaSafras.validate_python(safras, from_attributes=True)
         except Exception as e:
             logger.error(f"Erro ao buscar safras do ano {ano}: {e}")
             raise e
 
+    @invalida_estatisticas
     async def create_safra(self, safra_data: SafraCreate) -> ReturnSucess:
         """Cria uma nova safra"""
         try:
             # Verificar se a fazenda existe
-            fazenda = self.brain_agriculture_repository.get_fazenda_by_id(safra_data.idfazenda)
+            fazenda = await self.brain_agriculture_repository.get_fazenda_by_id(safra_data.idfazenda)
             if not fazenda:
                 return ReturnSucess(
                     success=False,
@@ -479,7 +740,7 @@ class Brain_AgricultureService(BaseService):
                 idfazenda=safra_data.idfazenda
             )
             
-            created_safra = self.brain_agriculture_repository.create_safra(safra_model)
+            created_safra = await self.brain_agriculture_repository.create_safra(safra_model)
             
             return ReturnSucess(
                 success=True,
@@ -494,42 +755,62 @@ class Brain_AgricultureService(BaseService):
                 data={}
             )
 
+    @invalida_estatisticas
+    async def create_safras_lote(self, safras: List[SafraCreate]) -> ResultadoLote:
+        """
+        Cria safras em lote: as fazendas referenciadas são verificadas numa única query
+        (WHERE id IN (...)) e as safras válidas gravadas num INSERT multi-linha
+        """
+        try:
+            fazendas_existentes = await self.brain_agriculture_repository.get_fazendas_ids_existentes(
+                list({safra_data.idfazenda for safra_data in safras})
+            )
+            candidatos = []
+            rejeitados = {}
+            for indice, safra_data in enumerate(safras):
+                if safra_data.idfazenda not in fazendas_existentes:
+                    rejeitados[indice] = "Fazenda não encontrada"
+                    continue
+                candidatos.append((indice, safra_data.model_dump()))
+            
+            return await self._gravar_lote(
+                len(safras), candidatos, rejeitados,
+                self.brain_agriculture_repository.create_safras_lote, "Safra criada com sucesso"
+            )
+        except Exception as e:
+            logger.error(f"Erro ao criar safras em lote: {e}")
+            return ResultadoLote(
+                success=False,
+                message=f"Erro ao criar safras em lote: {str(e)}",
+                inseridos=0,
+                rejeitados=len(safras),
+            )
+
+    @invalida_estatisticas
     async def update_safra(self, safra_id: int, safra_data: dict) -> ReturnSucess:
         """Atualiza uma safra existente"""
         try:
-            # Verificar se a safra existe
-            existing_safra = self.brain_agriculture_repository.get_safra_by_id(safra_id)
-            if not existing_safra:
-                return ReturnSucess(
-                    success=False,
-                    message="Safra não encontrada",
-                    data={}
-                )
-            
-            # Se estiver atualizando a fazenda, verificar se existe
-            if 'idfazenda' in safra_data:
-                fazenda = self.brain_agriculture_repository.get_fazenda_by_id(safra_data['idfazenda'])
-                if not fazenda:
-                    return ReturnSucess(
-                        success=False,
-                        message="Fazenda não encontrada",
-                        data={}
-                    )
-            
-            updated_safra = self.brain_agriculture_repository.update_safra(safra_id, safra_data)
+            # UPDATE ... RETURNING com a existência da fazenda no mesmo WHERE
+            updated_safra = await self.brain_agriculture_repository.update_safra(safra_id, safra_data)
             
             if updated_safra:
+                await self._invalidar_entidade("safra", safra_id)
                 return ReturnSucess(
                     success=True,
                     message="Safra atualizada com sucesso",
                     data={"id": updated_safra.id, "ano": updated_safra.ano, "cultura": updated_safra.cultura}
                 )
+            
+            # Nenhuma linha afetada: descobrir qual registro não existe
+            if not await self.brain_agriculture_repository.get_safra_by_id(safra_id):
+                message = "Safra não encontrada"
             else:
-                return ReturnSucess(
-                    success=False,
-                    message="Erro ao atualizar safra",
-                    data={}
-                )
+                message = "Fazenda não encontrada"
+            return ReturnSucess(
+                success=False,
+                message=message,
+                data={}
+            )
         except Exception as e:
             logger.error(f"Erro ao atualizar safra {safra_id}: {e}")
             return ReturnSucess(
@@ -538,11 +819,12 @@ class Brain_AgricultureService(BaseService):
                 data={}
             )
 
+    @invalida_estatisticas
     async def delete_safra(self, safra_id: int) -> ReturnSucess:
         """Exclui uma safra"""
         try:
             # Verificar se a safra existe
-            existing_safra = self.brain_agriculture_repository.get_safra_by_id(safra_id)
+            existing_safra = await self.brain_agriculture_repository.get_safra_by_id(safra_id)
             if not existing_safra:
                 return ReturnSucess(
                     success=False,
@@ -550,9 +832,10 @@ class Brain_AgricultureService(BaseService):
                     data={}
                 )
             
-            success = self.brain_agriculture_repository.delete_safra(safra_id)
+            success = await self.brain_agriculture_repository.delete_safra(safra_id)
             
             if success:
+                await self._invalidar_entidade("safra", safra_id)
                 return ReturnSucess(
                     success=True,
                     message="Safra excluída com sucesso",
@@ -572,14 +855,15 @@ class Brain_AgricultureService(BaseService):
                 data={}
             )
 
+    @cache_estatisticas("estatisticas_fazendas")
     async def get_estatisticas_fazendas(self) -> EstatisticasFazendas:
         """Busca estatísticas de fazendas por estado e total"""
         try:
             # Buscar fazendas por estado
-            fazendas_por_estado_data = self.brain_agriculture_repository.get_fazendas_por_estado()
+            fazendas_por_estado_data = await self.brain_agriculture_repository.get_fazendas_por_estado()
             
             # Buscar total de fazendas
-            total_fazendas = self.brain_agriculture_repository.get_total_fazendas()
+            total_fazendas = await self.brain_agriculture_repository.get_total_fazendas()
             
             # Converter para schemas
             fazendas_por_estado = [
@@ -595,11 +879,12 @@ class Brain_AgricultureService(BaseService):
             logger.error(f"Erro ao buscar estatísticas de fazendas: {e}")
             raise e
 
+    @cache_estatisticas("estatisticas_culturas")
     async def get_estatisticas_culturas(self) -> EstatisticasCulturas:
         """Busca estatísticas de culturas plantadas (total e por cultura)"""
         try:
-            total_culturas = self.brain_agriculture_repository.get_total_culturas()
-            culturas_agrupadas = self.brain_agriculture_repository.get_culturas_agrupadas()
+            total_culturas = await self.brain_agriculture_repository.get_total_culturas()
+            culturas_agrupadas = await self.brain_agriculture_repository.get_culturas_agrupadas()
             culturas = [CulturaQuantidade(**item) for item in culturas_agrupadas]
             return EstatisticasCulturas(
                 total_culturas=total_culturas,
@@ -609,30 +894,33 @@ class Brain_AgricultureService(BaseService):
             logger.error(f"Erro ao buscar estatísticas de culturas: {e}")
             raise e
 
+    @cache_estatisticas("estatisticas_safras_por_ano")
     async def get_estatisticas_safras_por_ano(self) -> EstatisticasSafrasPorAno:
         """Busca estatísticas de safras agrupadas por ano"""
         try:
-            safras_por_ano_data = self.brain_agriculture_repository.get_safras_por_ano()
+            safras_por_ano_data = await self.brain_agriculture_repository.get_safras_por_ano()
             safras_por_ano = [SafraPorAno(**item) for item in safras_por_ano_data]
             return EstatisticasSafrasPorAno(safras_por_ano=safras_por_ano)
         except Exception as e:
             logger.error(f"Erro ao buscar estatísticas de safras por ano: {e}")
             raise e
 
+    @cache_estatisticas("estatisticas_areas")
     async def get_estatisticas_areas(self) -> EstatisticasAreas:
         """Busca estatísticas de áreas das fazendas (total, agricultável e vegetação)"""
         try:
-            areas_data = self.brain_agriculture_repository.get_estatisticas_areas()
+            areas_data = await self.brain_agriculture_repository.get_estatisticas_areas()
             return EstatisticasAreas(**areas_data)
         except Exception as e:
             logger.error(f"Erro ao buscar estatísticas de áreas: {e}")
             raise e
 
+    @cache_estatisticas("resumo_fazendas")
     async def get_resumo_fazendas(self) -> ResumoFazendas:
         """Busca resumo simplificado: total de fazendas e área total cadastrada"""
         try:
-            total_fazendas = self.brain_agriculture_repository.get_total_fazendas()
-            areas_data = self.brain_agriculture_repository.get_estatisticas_areas()
+            total_fazendas = await self.brain_agriculture_repository.get_total_fazendas()
+            areas_data = await self.brain_agriculture_repository.get_estatisticas_areas()
             total_area = areas_data["area_total"]
             
             return ResumoFazendas(
@@ -643,183 +931,313 @@ class Brain_AgricultureService(BaseService):
             logger.error(f"Erro ao buscar resumo de fazendas: {e}")
             raise e
 
-    async def get_fazendas_resumidas(self) -> List[FazendaResumida]:
+    @cache_estatisticas("dashboard")
+    async def get_dashboard(self) -> Dashboard:
+        """Busca todas as estatísticas do dashboard com uma única query"""
+        try:
+            dados = await self.brain_agriculture_repository.get_dashboard()
+            return Dashboard(
+                resumo=ResumoFazendas(
+                    total_fazendas=dados["total_fazendas"],
+                    total_area=dados["area_total"]
+                ),
+                estatisticas_fazendas=EstatisticasFazendas(
+                    total_fazendas=dados["total_fazendas"],
+                    fazendas_por_estado=[FazendaPorEstado(**item) for item in dados["fazendas_por_estado"]]
+                ),
+                estatisticas_areas=EstatisticasAreas(
+                    area_total=dados["area_total"],
+                    area_agricultavel=dados["area_agricultavel"],
+                    area_vegetacao=dados["area_vegetacao"]
+                ),
+                estatisticas_culturas=EstatisticasCulturas(
+                    total_culturas=dados["total_culturas"],
+                    culturas=[CulturaQuantidade(**item) for item in dados["culturas"]]
+                ),
+                estatisticas_safras_por_ano=EstatisticasSafrasPorAno(
+                    safras_por_ano=[SafraPorAno(**item) for item in dados["safras_por_ano"]]
+                )
+            )
+        except Exception as e:
+            logger.error(f"Erro ao buscar dashboard: {e}")
+            raise e
+
+    def get_estatisticas_cache_entidades(self) -> EstatisticasCacheEntidades:
+        """Acertos e falhas do cache de entidades neste worker"""
+        return EstatisticasCacheEntidades(
+            hits=self.entity_cache.hits,
+            misses=self.entity_cache.misses,
+            taxa_acerto=self.entity_cache.taxa_acerto
+        )
+
+    @staticmethod
+    def _normalizar_dimensoes(dimensoes: List[str]) -> List[str]:
+        """Remove repetições e coloca as dimensões do cubo na ordem canônica"""
+        return [dimensao for dimensao in CUBO_DIMENSOES if dimensao in dimensoes]
+
+    @cache_estatisticas(
+        lambda dimensoes, estado=None, cidade=None, cultura=None, ano=None: (
+            "cubo",
+            tuple(Brain_AgricultureService._normalizar_dimensoes(dimensoes)),
+            estado,
+            cidade,
+            cultura,
+            ano,
+        ),
+        cache="cubo_cache",
+    )
+    async def get_cubo_safras(
+        self,
+        dimensoes: List[str],
+        estado: Optional[str] = None,
+        cidade: Optional[str] = None,
+        cultura: Optional[str] = None,
+        ano: Optional[int] = None,
+    ) -> CuboSafras:
+        """
+        Busca o cubo de safras (estado × cidade × cultura × ano) com subtotais.
+        Cubos com mais de CUBO_MAX_CELULAS células são recusados com ValueError
+        """
+        try:
+            dimensoes = self._normalizar_dimensoes(dimensoes)
+            celulas = await self.brain_agriculture_repository.get_cubo_safras(
+                dimensoes, estado=estado, cidade=cidade, cultura=cultura, ano=ano,
+                limite=CUBO_MAX_CELULAS + 1
+            )
+            if len(celulas) > CUBO_MAX_CELULAS:
+                raise ValueError(
+                    f"O cubo passa de {CUBO_MAX_CELULAS} células; "
+                    "use menos dimensões ou filtre por estado, cidade, cultura ou ano"
+                )
+            return CuboSafras(
+                dimensoes=dimensoes,
+                celulas=[CelulaCubo(**celula) for celula in celulas]
+            )
+        except Exception as e:
+            logger.error(f"Erro ao buscar cubo de safras: {e}")
+            raise e
+
+    async def get_fazendas_resumidas(
+        self,
+        prefixo: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[FazendaResumida]:
         """Busca lista resumida de fazendas (ID e nome)"""
         try:
-            fazendas = self.brain_agriculture_repository.get_all_fazendas()
+            fazendas = await self.brain_agriculture_repository.get_fazendas_resumidas(
+                prefixo=prefixo, limit=limit
+            )
             return [
-                FazendaResumida(id=fazenda.id, nomefazenda=fazenda.nomefazenda)
-                for fazenda in fazendas
+                FazendaResumida(id=id, nomefazenda=nomefazenda)
+                for id, nomefazenda in fazendas
             ]
         except Exception as e:
             logger.error(f"Erro ao buscar fazendas resumidas: {e}")
             raise e
 
-    async def get_produtores_resumidos(self) -> List[ProdutorResumido]:
+    async def get_produtores_resumidos(
+        self,
+        prefixo: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[ProdutorResumido]:
         """Busca lista resumida de produtores (ID, CPF e nome)"""
         try:
-            produtores = self.brain_agriculture_repository.get_all_produtores()
+            produtores = await self.brain_agriculture_repository.get_produtores_resumidos(
+                prefixo=prefixo, limit=limit
+            )
             return [
-                ProdutorResumido(id=produtor.id, cpf=produtor.cpf, nomeprodutor=produtor.nomeprodutor)
-                for produtor in produtores
+                ProdutorResumido(id=id, cpf=cpf, nomeprodutor=nomeprodutor)
+                for id, cpf, nomeprodutor in produtores
             ]
         except Exception as e:
             logger.error(f"Erro ao buscar produtores resumidos: {e}")
             raise e
 
+    # Exportação em streaming (NDJSON/CSV)
+    async def exportar_produtores(self, formato: str = "ndjson") -> AsyncIterator[str]:
+        """Exporta todos os produtores em NDJSON ou CSV, lote a lote"""
+        lotes = self.brain_agriculture_repository.stream_produtores()
+        async for chunk in self._exportar(lotes, ProdutorModel, formato):
+            yield chunk
+
+    async def exportar_fazendas(self, formato: str = "ndjson") -> AsyncIterator[str]:
+        """Exporta todas as fazendas em NDJSON ou CSV, lote a lote"""
+        lotes = self.brain_agriculture_repository.stream_fazendas()
+        async for chunk in self._exportar(lotes, FazendaModel, formato):
+            yield chunk
+
+    async def exportar_safras(self, formato: str = "ndjson") -> AsyncIterator[str]:
+        """Exporta todas as safras em NDJSON ou CSV, lote a lote"""
+        lotes = self.brain_agriculture_repository.stream_safras()
+        async for chunk in self._exportar(lotes, SafraModel, formato):
+            yield chunk
+
+    async def _exportar(self, lotes, model, formato: str) -> AsyncIterator[str]:
+        """Serializa os lotes do cursor no formato pedido, um pedaço da resposta por lote"""
+        colunas = list(model.__table__.columns.keys())
+        if formato == "csv":
+            yield rows_to_csv([], colunas, header=True)
+        try:
+            async for lote in lotes:
+                if formato == "csv":
+                    yield rows_to_csv(lote, colunas)
+                else:
+                    yield rows_to_ndjson(lote)
+        except Exception as e:
+            logger.error(f"Erro ao exportar {model.__tablename__}: {e}")
+            raise e
+
+    # Importação em streaming (CSV/NDJSON -> COPY)
+    @invalida_estatisticas
+    async def importar_fazendas(self, chunks: AsyncIterable[bytes], formato: str = "csv") -> ResultadoImportacao:
+        """Importa fazendas (sem produtor vinculado) de um CSV/NDJSON em streaming"""
+        return await self._importar(
+            chunks, formato, FazendaCreate, self.brain_agriculture_repository.importar_fazendas, "fazendas"
+        )
+
+    @invalida_estatisticas
+    async def importar_safras(self, chunks: AsyncIterable[bytes], formato: str = "csv") -> ResultadoImportacao:
+        """Importa safras de um CSV/NDJSON em streaming; safras de fazenda inexistente são rejeitadas"""
+        return await self._importar(
+            chunks, formato, SafraCreate, self.brain_agriculture_repository.importar_safras, "safras",
+            motivo_descartada="Fazenda não encontrada"
+        )
+
+    async def _importar(
+        self,
+        chunks: AsyncIterable[bytes],
+        formato: str,
+        schema,
+        importar,
+        entidade: str,
+        motivo_descartada: str = "Registro descartado",
+    ) -> ResultadoImportacao:
+        """
+        Lê o arquivo em streaming, valida cada linha com o schema de criação e grava blocos de
+        IMPORT_CHUNK_SIZE linhas via COPY, cada um na própria transação. Linhas inválidas e blocos
+        que falharem no banco são relatados sem interromper a carga. Se a leitura do arquivo
+        falhar, retorna success=False com os blocos já gravados contados em inseridos.
+        """
+        colunas = list(schema.model_fields)
+        total = inseridos = 0
+        erros = []
+        rejeitados = 0
+        bloco = []
+
+        def rejeitar(linha: int, motivo: str) -> None:
+            nonlocal rejeitados
+            rejeitados += 1
+            if len(erros) < IMPORT_MAX_ERROS:
+                erros.append(LinhaRejeitada(linha=linha, motivo=motivo))
+
+        async def gravar() -> None:
+            nonlocal inseridos, bloco
+            try:
+                descartadas = await importar(colunas, bloco)
+            except Exception as e:
+                logger.error(f"Erro ao importar bloco de {entidade} (linhas {bloco[0][0]}-{bloco[-1][0]}): {e}")
+                for numero, *_ in bloco:
+                    rejeitar(numero, f"Erro ao gravar o bloco: {str(e)}")
+            else:
+                for numero in descartadas:
+                    rejeitar(numero, motivo_descartada)
+                inseridos += len(bloco) - len(descartadas)
+            bloco = []
+
+        registros = csv_to_rows(chunks) if formato == "csv" else ndjson_to_rows(chunks)
+        try:
+            async for numero, dados in registros:
+                total += 1
+                if dados is None:
+                    rejeitar(numero, "Linha não é um objeto JSON válido")
+                    continue
+                try:
+                    registro = schema.model_validate(dados)
+                except ValidationError as e:
+                    rejeitar(numero, "; ".join(
+                        f"{'.'.join(str(campo) for campo in erro['loc'])}: {erro['msg']}" for erro in e.errors()
+                    ))
+                    continue
+                bloco.append((numero, *(getattr(registro, coluna) for coluna in colunas)))
+                if len(bloco) >= IMPORT_CHUNK_SIZE:
+                    await gravar()
+            if bloco:
+                await gravar()
+        except Exception as e:
+            logger.error(f"Erro ao ler arquivo de {entidade} para importação: {e}")
+            return ResultadoImportacao(
+                success=False,
+                message=(
+                    f"Erro ao ler o arquivo na linha {total + 1}: {str(e)}; "
+                    f"{inseridos} linhas lidas antes do erro permanecem importadas"
+                ),
+                total=total,
+                inseridos=inseridos,
+                rejeitados=rejeitados,
+                erros=erros,
+            )
+
+        erros.sort(key=lambda erro: erro.linha)
+        return ResultadoImportacao(
+            success=True,
+            message=f"{inseridos} de {total} linhas importadas",
+            total=total,
+            inseridos=inseridos,
+            rejeitados=rejeitados,
+            erros=erros,
+        )
+
+    @invalida_estatisticas
     async def processar_dados_completos(self, dados: DadosCompletosCreate) -> DadosCompletosResponse:
-        """Processa dados completos de produtor, fazendas e safras de forma hierárquica com rollback"""
-        created_produtor = None
-        created_fazendas = []
-        created_safras = []
-        
+        """Processa dados completos de produtor, fazendas e safras em uma única transação"""
         try:
-            # O produtor é obrigatório, então sempre processamos primeiro
-            produtor_id = None
-            
-            # 1. Salvar produtor (obrigatório)
             logger.info("Processando dados do produtor")
             
             # Padronizar CPF
             cpf_padronizado = self._padronizar_cpf(dados.produtor.cpf)
             
-            # Verificar se já existe um produtor com o mesmo CPF
-            existing_produtor = self.brain_agriculture_repository.get_produtor_by_cpf(cpf_padronizado)
-            if existing_produtor:
-                return DadosCompletosResponse(
-                    success=False,
-                    message="Já existe um produtor cadastrado com este CPF",
-                    data={}
-                )
-            
-            # Criar novo produtor com CPF padronizado
-            produtor_model = ProdutorModel(
-                cpf=cpf_padronizado,
-                nomeprodutor=dados.produtor.nomeprodutor
-            )
-            created_produtor = self.brain_agriculture_repository.create_produtor(produtor_model)
-            produtor_id = created_produtor.id
-            logger.info(f"Produtor criado com ID: {produtor_id}")
+            # Fazendas com o mesmo nome no payload são a mesma fazenda (vale a primeira ocorrência)
+            fazendas = {}
+            for fazenda_data in dados.fazendas or []:
+                if fazenda_data.nomefazenda not in fazendas:
+                    fazendas[fazenda_data.nomefazenda] = fazenda_data.model_dump()
             
-            fazendas_ids = []
-            safras_ids = []
-            
-            # 2. Processar fazendas (se fornecidas)
-            if dados.fazendas:
-                logger.info(f"Processando {len(dados.fazendas)} fazendas")
-                
-                for fazenda_data in dados.fazendas:
-                    try:
-                        # Verificar se a fazenda já existe para este produtor
-                        existing_fazenda = self.brain_agriculture_repository.get_fazenda_by_nome_and_produtor(
-                            fazenda_data.nomefazenda, produtor_id
-                        )
-                        
-                        if existing_fazenda:
-                            fazendas_ids.append(existing_fazenda.id)
-                            logger.info(f"Fazenda '{fazenda_data.nomefazenda}' já existe com ID: {existing_fazenda.id}")
-                        else:
-                            # Criar nova fazenda vinculada ao produtor
-                            fazenda_model = FazendaModel(
-                                nomefazenda=fazenda_data.nomefazenda,
-                                cidade=fazenda_data.cidade,
-                                estado=fazenda_data.estado,
-                                areatotalfazenda=fazenda_data.areatotalfazenda,
-                                areaagricutavel=fazenda_data.areaagricutavel,
-                                idprodutor=produtor_id
-                            )
-                            created_fazenda = self.brain_agriculture_repository.create_fazenda(fazenda_model)
-                            created_fazendas.append(created_fazenda)
-                            fazendas_ids.append(created_fazenda.id)
-                            logger.info(f"Fazenda '{fazenda_data.nomefazenda}' criada com ID: {created_fazenda.id}")
-                    except Exception as e:
-                        logger.error(f"Erro ao criar fazenda '{fazenda_data.nomefazenda}': {e}")
-                        # Fazer rollback de todas as fazendas criadas
-                        await self._rollback_fazendas(created_fazendas)
-                        if created_produtor:
-                            await self._rollback_produtor(created_produtor)
-                        return DadosCompletosResponse(
-                            success=False,
-                            message=f"Erro ao criar fazenda '{fazenda_data.nomefazenda}': {str(e)}",
-                            data={}
-                        )
-            
-            # 3. Processar safras (se fornecidas)
-            if dados.safras:
-                logger.info(f"Processando {len(dados.safras)} safras")
-                
-                # A validação já garante que fazendas existem, mas vamos verificar por segurança
-                if not fazendas_ids:
-                    await self._rollback_fazendas(created_fazendas)
-                    if created_produtor:
-                        await self._rollback_produtor(created_produtor)
+            # Validar o vínculo safra -> fazenda antes de gravar qualquer coisa
+            safras = []
+            for safra_data in dados.safras or []:
+                if safra_data.nomefazenda not in fazendas:
                     return DadosCompletosResponse(
                         success=False,
-                        message="Erro interno: safras fornecidas mas nenhuma fazenda foi encontrada/criada",
+                        message=f"Fazenda '{safra_data.nomefazenda}' não encontrada para a safra {safra_data.ano}-{safra_data.cultura}",
                         data={}
                     )
-                
-                # Criar um mapeamento de nome da fazenda para ID
-                fazenda_nome_to_id = {}
-                for fazenda_data in dados.fazendas:
-                    # Verificar se a fazenda já existe para este produtor
-                    existing_fazenda = self.brain_agriculture_repository.get_fazenda_by_nome_and_produtor(
-                        fazenda_data.nomefazenda, produtor_id
-                    )
-                    if existing_fazenda:
-                        fazenda_nome_to_id[fazenda_data.nomefazenda] = existing_fazenda.id
-                    else:
-                        # Buscar a fazenda criada na lista de fazendas criadas
-                        for created_fazenda in created_fazendas:
-                            if created_fazenda.nomefazenda == fazenda_data.nomefazenda:
-                                fazenda_nome_to_id[fazenda_data.nomefazenda] = created_fazenda.id
-                                break
-                
-                for safra_data in dados.safras:
-                    try:
-                        # Buscar o ID da fazenda pelo nome
-                        if safra_data.nomefazenda not in fazenda_nome_to_id:
-                            await self._rollback_safras(created_safras)
-                            await self._rollback_fazendas(created_fazendas)
-                            if created_produtor:
-                                await self._rollback_produtor(created_produtor)
-                            return DadosCompletosResponse(
-                                success=False,
-                                message=f"Fazenda '{safra_data.nomefazenda}' não encontrada para a safra {safra_data.ano}-{safra_data.cultura}",
-                                data={}
-                            )
-                        
-                        fazenda_id = fazenda_nome_to_id[safra_data.nomefazenda]
-                        
-                        # Criar safra vinculada à fazenda
-                        safra_model = SafraModel(
-                            ano=safra_data.ano,
-                            cultura=safra_data.cultura,
-                            idfazenda=fazenda_id
-                        )
-                        created_safra = self.brain_agriculture_repository.create_safra(safra_model)
-                        created_safras.append(created_safra)
-                        safras_ids.append(created_safra.id)
-                        logger.info(f"Safra {safra_data.ano}-{safra_data.cultura} criada com ID: {created_safra.id} para fazenda '{safra_data.nomefazenda}' (ID: {fazenda_id})")
-                    except Exception as e:
-                        logger.error(f"Erro ao criar safra {safra_data.ano}-{safra_data.cultura}: {e}")
-                        # Fazer rollback de todas as safras criadas
-                        await self._rollback_safras(created_safras)
-                        await self._rollback_fazendas(created_fazendas)
-                        if created_produtor:
-                            await self._rollback_produtor(created_produtor)
-                        return DadosCompletosResponse(
-                            success=False,
-                            message=f"Erro ao criar safra {safra_data.ano}-{safra_data.cultura}: {str(e)}",
-                            data={}
-                        )
+                safras.append(safra_data.model_dump())
+            
+            logger.info(f"Inserindo produtor com {len(fazendas)} fazendas e {len(safras)} safras")
+            produtor_model = ProdutorModel(
+                cpf=cpf_padronizado,
+                nomeprodutor=dados.produtor.nomeprodutor
+            )
+            criados = await self.brain_agriculture_repository.create_dados_completos(
+                produtor_model, list(fazendas.values()), safras
+            )
+            # ON CONFLICT (cpf_numerico) DO NOTHING: None quando o CPF já está cadastrado
+            if criados is None:
+                return DadosCompletosResponse(
+                    success=False,
+                    message="Já existe um produtor cadastrado com este CPF",
+                    data={}
+                )
+            logger.info(f"Produtor criado com ID: {criados['produtor_id']}")
             
             # Preparar resposta
-            response_data = {"produtor_id": produtor_id}
-            if fazendas_ids:
-                response_data["fazendas_ids"] = fazendas_ids
-            if safras_ids:
-                response_data["safras_ids"] = safras_ids
+            response_data = {"produtor_id": criados["produtor_id"]}
+            if dados.fazendas:
+                response_data["fazendas_ids"] = [
+                    criados["fazendas_ids_por_nome"][fazenda_data.nomefazenda] for fazenda_data in dados.fazendas
+                ]
+            if criados["safras_ids"]:
+                response_data["safras_ids"] = criados["safras_ids"]
             
             return DadosCompletosResponse(
                 success=True,
@@ -829,11 +1247,6 @@ class Brain_AgricultureService(BaseService):
             
         except ValueError as e:
             logger.error(f"Erro de validação do CPF: {e}")
-            # Fazer rollback de tudo que foi criado
-            await self._rollback_safras(created_safras)
-            await self._rollback_fazendas(created_fazendas)
-            if created_produtor:
-                await self._rollback_produtor(created_produtor)
             return DadosCompletosResponse(
                 success=False,
                 message=f"CPF inválido: {str(e)}",
@@ -841,167 +1254,79 @@ class Brain_AgricultureService(BaseService):
             )
         except Exception as e:
             logger.error(f"Erro inesperado ao processar dados completos: {e}")
-            # Fazer rollback de tudo que foi criado
-            await self._rollback_safras(created_safras)
-            await self._rollback_fazendas(created_fazendas)
-            if created_produtor:
-                await self._rollback_produtor(created_produtor)
             return DadosCompletosResponse(
                 success=False,
                 message=f"Erro interno ao processar dados: {str(e)}",
                 data={}
             )
 
-    async def _rollback_produtor(self, produtor):
-        """Faz rollback de um produtor criado"""
-        try:
-            if produtor and produtor.id:
-                logger.info(f"Fazendo rollback do produtor {produtor.id}")
-                self.brain_agriculture_repository.delete_produtor(produtor.id)
-        except Exception as e:
-            logger.error(f"Erro ao fazer rollback do produtor {produtor.id if produtor else 'None'}: {e}")
-
-    async def _rollback_fazendas(self, fazendas):
-        """Faz rollback das fazendas criadas"""
-        try:
-            for fazenda in fazendas:
-                if fazenda and fazenda.id:
-                    logger.info(f"Fazendo rollback da fazenda {fazenda.id}")
-                    self.brain_agriculture_repository.delete_fazenda(fazenda.id)
-        except Exception as e:
-            logger.error(f"Erro ao fazer rollback das fazendas: {e}")
-
-    async def _rollback_safras(self, safras):
-        """Faz rollback das safras criadas"""
-        try:
-            for safra in safras:
-                if safra and safra.id:
-                    logger.info(f"Fazendo rollback da safra {safra.id}")
-                    self.brain_agriculture_repository.delete_safra(safra.id)
-        except Exception as e:
-            logger.error(f"Erro ao fazer rollback das safras: {e}")
-
+    @single_flight(lambda produtor_id: ("produtor_completo", produtor_id))
     async def get_produtor_completo(self, produtor_id: int) -> Optional[ProdutorCompleto]:
         """Busca um produtor completo com suas fazendas e safras"""
         try:
-            # Buscar o produtor
-            produtor = self.brain_agriculture_repository.get_produtor_by_id(produtor_id)
+            produtor = await self.brain_agriculture_repository.get_produtor_completo(produtor_id)
             if not produtor:
                 return None
             
-            # Buscar fazendas do produtor
-            fazendas = self.brain_agriculture_repository.get_fazendas_by_produtor(produtor_id)
-            
-            # Para cada fazenda, buscar suas safras
-            fazendas_com_safras = []
-            for fazenda in fazendas:
-                safras = self.brain_agriculture_repository.get_safras_by_fazenda(fazenda.id)
-                
-                # Converter safras para schema
-                safras_schema = [Safra.from_orm(safra) for safra in safras]
-                
-                # Criar fazenda com safras
-                fazenda_com_safras = FazendaComSafras(
-                    id=fazenda.id,
-                    nomefazenda=fazenda.nomefazenda,
-                    cidade=fazenda.cidade,
-                    estado=fazenda.estado,
-                    areatotalfazenda=fazenda.areatotalfazenda,
-                    areaagricutavel=fazenda.areaagricutavel,
-                    idprodutor=fazenda.idprodutor,
-                    safras=safras_schema
-                )
-                fazendas_com_safras.append(fazenda_com_safras)
-            
-            # Criar produtor completo
-            produtor_completo = ProdutorCompleto(
-                id=produtor.id,
-                cpf=produtor.cpf,
-                nomeprodutor=produtor.nomeprodutor,
-                fazendas=fazendas_com_safras
-            )
-            
-            return produtor_completo
+            return ProdutorCompleto.model_validate(produtor)
             
         except Exception as e:
             logger.error(f"Erro ao buscar produtor completo {produtor_id}: {e}")
             raise e
 
+    @single_flight(lambda fazenda_id: ("fazenda_completa", fazenda_id))
     async def get_fazenda_completa(self, fazenda_id: int) -> Optional[FazendaCompleta]:
         """Busca uma fazenda completa com suas safras"""
         try:
-            # Buscar a fazenda
-            fazenda = self.brain_agriculture_repository.get_fazenda_by_id(fazenda_id)
+            fazenda = await self.brain_agriculture_repository.get_fazenda_completa(fazenda_id)
             if not fazenda:
                 return None
             
-            # Buscar safras da fazenda
-            safras = self.brain_agriculture_repository.get_safras_by_fazenda(fazenda_id)
-            
-            # Converter safras para schema
-            safras_schema = [Safra.from_orm(safra) for safra in safras]
-            
-            # Criar fazenda completa
-            fazenda_completa = FazendaCompleta(
-                id=fazenda.id,
-                nomefazenda=fazenda.nomefazenda,
-                cidade=fazenda.cidade,
-                estado=fazenda.estado,
-                areatotalfazenda=fazenda.areatotalfazenda,
-                areaagricutavel=fazenda.areaagricutavel,
-                idprodutor=fazenda.idprodutor,
-                safras=safras_schema
-            )
-            
-            return fazenda_completa
+            return FazendaCompleta.model_validate(fazenda)
             
         except Exception as e:
             logger.error(f"Erro ao buscar fazenda completa {fazenda_id}: {e}")
             raise e
 
+    @invalida_estatisticas
     async def vincular_fazenda_produtor(self, dados: VincularFazendaProdutor) -> ReturnSucess:
         """Vincula uma fazenda a um produtor"""
         try:
-            # Verificar se a fazenda existe
-            fazenda = self.brain_agriculture_repository.get_fazenda_by_id(dados.fazenda_id)
-            if not fazenda:
-                return ReturnSucess(
-                    success=False,
-                    message=f"Fazenda com ID {dados.fazenda_id} não encontrada",
-                    data={}
-                )
+            # Um único UPDATE ... RETURNING vincula e devolve o nome do produtor
+            vinculo = await self.brain_agriculture_repository.vincular_fazenda_produtor(dados.fazenda_id, dados.produtor_id)
             
-            # Verificar se o produtor existe
-            produtor = self.brain_agriculture_repository.get_produtor_by_id(dados.produtor_id)
-            if not produtor:
-                return ReturnSucess(
-                    success=False,
-                    message=f"Produtor com ID {dados.produtor_id} não encontrado",
-                    data={}
-                )
-            
-            # Atualizar a fazenda com o novo produtor
-            update_data = {"idprodutor": dados.produtor_id}
-            updated_fazenda = self.brain_agriculture_repository.update_fazenda(dados.fazenda_id, update_data)
-            
-            if updated_fazenda:
+            if vinculo:
+                updated_fazenda, nomeprodutor = vinculo
+                await self._invalidar_entidade("fazenda", dados.fazenda_id)
                 return ReturnSucess(
                     success=True,
-                    message=f"Fazenda '{updated_fazenda.nomefazenda}' vinculada com sucesso ao produtor '{produtor.nomeprodutor}'",
+                    message=f"Fazenda '{updated_fazenda.nomefazenda}' vinculada com sucesso ao produtor '{nomeprodutor}'",
                     data={
                         "fazenda_id": updated_fazenda.id,
                         "fazenda_nome": updated_fazenda.nomefazenda,
-                        "produtor_id": produtor.id,
-                        "produtor_nome": produtor.nomeprodutor
+                        "produtor_id": dados.produtor_id,
+                        "produtor_nome": nomeprodutor
                     }
                 )
+            
+            # Nenhuma linha afetada: descobrir qual registro não existe
+            if not await self.brain_agriculture_repository.get_fazenda_by_id(dados.fazenda_id):
+                message = f"Fazenda com ID {dados.fazenda_id} não encontrada"
             else:
-                return ReturnSucess(
-                    success=False,
-                    message="Erro ao vincular fazenda ao produtor",
-                    data={}
-                )
+                message = f"Produtor com ID {dados.produtor_id} não encontrado"
+            return ReturnSucess(
+                success=False,
+                message=message,
+                data={}
+            )
                 
+        except IntegrityError as e:
+            logger.error(f"Produtor {dados.produtor_id} já possui fazenda com o nome da fazenda {dados.fazenda_id}: {e}")
+            return ReturnSucess(
+                success=False,
+                message="O produtor já possui uma fazenda com este nome",
+                data={}
+            )
         except Exception as e:
             logger.error(f"Erro ao vincular fazenda {dados.fazenda_id} ao produtor {dados.produtor_id}: {e}")
             return ReturnSucess(
@@ -1010,49 +1335,45 @@ class Brain_AgricultureService(BaseService):
                 data={}
             )
 
+    @invalida_estatisticas
     async def vincular_produtor_fazenda(self, dados: VincularProdutorFazenda) -> ReturnSucess:
         """Vincula um produtor a uma fazenda (mesma funcionalidade da anterior, mas com ordem diferente)"""
         try:
-            # Verificar se o produtor existe
-            produtor = self.brain_agriculture_repository.get_produtor_by_id(dados.produtor_id)
-            if not produtor:
-                return ReturnSucess(
-                    success=False,
-                    message=f"Produtor com ID {dados.produtor_id} não encontrado",
-                    data={}
-                )
-            
-            # Verificar se a fazenda existe
-            fazenda = self.brain_agriculture_repository.get_fazenda_by_id(dados.fazenda_id)
-            if not fazenda:
-                return ReturnSucess(
-                    success=False,
-                    message=f"Fazenda com ID {dados.fazenda_id} não encontrada",
-                    data={}
-                )
-            
-            # Atualizar a fazenda com o novo produtor
-            update_data = {"idprodutor": dados.produtor_id}
-            updated_fazenda = self.brain_agriculture_repository.update_fazenda(dados.fazenda_id, update_data)
+            # Um único UPDATE ... RETURNING vincula e devolve o nome do produtor
+            vinculo = await self.brain_agriculture_repository.vincular_fazenda_produtor(dados.fazenda_id, dados.produtor_id)
             
-            if updated_fazenda:
+            if vinculo:
+                updated_fazenda, nomeprodutor = vinculo
+                await self._invalidar_entidade("fazenda", dados.fazenda_id)
                 return ReturnSucess(
                     success=True,
-                    message=f"Produtor '{produtor.nomeprodutor}' vinculado com sucesso à fazenda '{updated_fazenda.nomefazenda}'",
+                    message=f"Produtor '{nomeprodutor}' vinculado com sucesso à fazenda '{updated_fazenda.nomefazenda}'",
                     data={
-                        "produtor_id": produtor.id,
-                        "produtor_nome": produtor.nomeprodutor,
+                        "produtor_id": dados.produtor_id,
+                        "produtor_nome": nomeprodutor,
                         "fazenda_id": updated_fazenda.id,
                         "fazenda_nome": updated_fazenda.nomefazenda
                     }
                 )
+            
+            # Nenhuma linha afetada: descobrir qual registro não existe
+            if not await self.brain_agriculture_repository.get_produtor_by_id(dados.produtor_id):
+                message = f"Produtor com ID {dados.produtor_id} não encontrado"
             else:
-                return ReturnSucess(
-                    success=False,
-                    message="Erro ao vincular produtor à fazenda",
-                    data={}
-                )
+                message = f"Fazenda com ID {dados.fazenda_id} não encontrada"
+            return ReturnSucess(
+                success=False,
+                message=message,
+                data={}
+            )
                 
+        except IntegrityError as e:
+            logger.error(f"Produtor {dados.produtor_id} já possui fazenda com o nome da fazenda {dados.fazenda_id}: {e}")
+            return ReturnSucess(
+                success=False,
+                message="O produtor já possui uma fazenda com este nome",
+                data={}
+            )
         except Exception as e:
             logger.error(f"Erro ao vincular produtor {dados.produtor_id} à fazenda {dados.fazenda_id}: {e}")
             return ReturnSucess(
@@ -0,0 +1,541 @@
+import asyncio
+import contextvars
+import hashlib
+import logging
+import pickle
+import re
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+import redis.asyncio as redis
+from sqlalchemy import column, select, table
+
+from app.shared.constants import (
+    CACHE_INVALIDATION_CHANNEL,
+    CACHE_KEY_PREFIX,
+    CACHE_MAX_ITEMS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Tabela mantida pelos triggers da migração 0007 (model VersaoTabela)
+_VERSAO_TABELA = table("versao_tabela", column("tabela"), column("versao"))
+
+_versoes_da_requisicao: contextvars.ContextVar[Tuple[Tuple[str, str], ...]] = (
+    contextvars.ContextVar("versoes_da_requisicao", default=())
+)
+
+
+def versoes_da_requisicao() -> Tuple[Tuple[str, str], ...]:
+    """
+    Pares (tabela, versão) em que se baseou a ETag da requisição corrente, ou vazio.
+    Entram nas chaves dos caches: um corpo servido do cache foi carregado depois de
+    lidas essas versões, e nunca é mais antigo que a ETag enviada junto com ele.
+    """
+    return _versoes_da_requisicao.get()
+
+
+class CacheBackend:
+    """
+    Armazenamento dos caches da aplicação. Implementações: LRUCacheBackend (memória
+    do processo) e RedisCacheBackend (compartilhado entre os workers).
+    """
+
+    def __init__(self) -> None:
+        self._ouvintes: List[Callable[[str], None]] = []
+
+    def on_invalidate(self, ouvinte: Callable[[str], None]) -> None:
+        """Registra uma função chamada com a chave ou prefixo invalidado por outro worker"""
+        self._ouvintes.append(ouvinte)
+
+    def _notificar(self, prefixo: str) -> None:
+        for ouvinte in self._ouvintes:
+            ouvinte(prefixo)
+
+    async def get(self, chave: str) -> Any:
+        raise NotImplementedError()
+
+    async def set(self, chave: str, valor: Any, ttl: float) -> None:
+        raise NotImplementedError()
+
+    async def delete(self, chave: str) -> None:
+        raise NotImplementedError()
+
+    async def delete_prefix(self, prefixo: str) -> None:
+        raise NotImplementedError()
+
+    async def close(self) -> None:
+        pass
+
+
+class LRUCacheBackend(CacheBackend):
+    """Backend em memória do processo, limitado a max_itens (descarta o menos usado)"""
+
+    def __init__(self, max_itens: int = CACHE_MAX_ITEMS) -> None:
+        super().__init__()
+        self.max_itens = max_itens
+        self._itens: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    async def get(self, chave: str) -> Any:
+        item = self._itens.get(chave)
+        if item is None:
+            return None
+        expira_em, valor = item
+        if expira_em <= time.monotonic():
+            del self._itens[chave]
+            return None
+        self._itens.move_to_end(chave)
+        return valor
+
+    async def set(self, chave: str, valor: Any, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        self._itens[chave] = (time.monotonic() + ttl, valor)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+
+    async def delete(self, chave: str) -> None:
+        self._itens.pop(chave, None)
+
+    async def delete_prefix(self, prefixo: str) -> None:
+        for chave in [chave for chave in self._itens if chave.startswith(prefixo)]:
+            del self._itens[chave]
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Backend compartilhado entre os workers num servidor Redis (ou compatível com o
+    protocolo). Valores são serializados com pickle. Cada invalidação é publicada no
+    canal pub/sub para que os outros workers descartem o estado local derivado dela.
+    Falhas de comunicação são registradas e tratadas como ausência no cache.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        prefixo: str = CACHE_KEY_PREFIX,
+        canal: str = CACHE_INVALIDATION_CHANNEL,
+    ) -> None:
+        super().__init__()
+        self.prefixo = prefixo
+        self.canal = canal
+        self._cliente = redis.from_url(url)
+        self._origem = uuid.uuid4().hex
+        self._inscrito = asyncio.Event()
+        self._tarefa_ouvinte: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Verifica a conexão e passa a ouvir as invalidações dos outros workers"""
+        await self._cliente.ping()
+        self._tarefa_ouvinte = asyncio.create_task(self._ouvir())
+        await self._inscrito.wait()
+
+    async def _ouvir(self) -> None:
+        while True:
+            pubsub = self._cliente.pubsub()
+            try:
+                await pubsub.subscribe(self.canal)
+                if self._inscrito.is_set():
+                    # Reconectado: invalidações podem ter sido perdidas enquanto estava fora
+                    self._notificar("")
+                self._inscrito.set()
+                async for mensagem in pubsub.listen():
+                    if mensagem["type"] != "message":
+                        continue
+                    origem, _, prefixo = mensagem["data"].decode().partition("|")
+                    if origem != self._origem:
+                        self._notificar(prefixo)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro ao ouvir invalidações do cache no Redis: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    async def _publicar(self, prefixo: str) -> None:
+        await self._cliente.publish(self.canal, f"{self._origem}|{prefixo}")
+
+    async def get(self, chave: str) -> Any:
+        try:
+            dados = await self._cliente.get(self.prefixo + chave)
+        except Exception as e:
+            logger.error(f"Erro ao ler do cache no Redis: {e}")
+            return None
+        return pickle.loads(dados) if dados is not None else None
+
+    async def set(self, chave: str, valor: Any, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        try:
+            await self._cliente.set(
+                self.prefixo + chave, pickle.dumps(valor), px=int(ttl * 1000)
+            )
+        except Exception as e:
+            logger.error(f"Erro ao gravar no cache no Redis: {e}")
+
+    async def delete(self, chave: str) -> None:
+        try:
+            await self._cliente.delete(self.prefixo + chave)
+            await self._publicar(chave)
+        except Exception as e:
+            logger.error(f"Erro ao invalidar o cache no Redis: {e}")
+
+    async def delete_prefix(self, prefixo: str) -> None:
+        padrao = re.sub(r"([*?\[\]\\])", r"\\\1", self.prefixo + prefixo) + "*"
+        try:
+            chaves = [chave async for chave in self._cliente.scan_iter(match=padrao)]
+            if chaves:
+                await self._cliente.delete(*chaves)
+            await self._publicar(prefixo)
+        except Exception as e:
+            logger.error(f"Erro ao invalidar o cache no Redis: {e}")
+
+    async def close(self) -> None:
+        if self._tarefa_ouvinte is not None:
+            self._tarefa_ouvinte.cancel()
+            try:
+                await self._tarefa_ouvinte
+            except asyncio.CancelledError:
+                pass
+        await self._cliente.aclose()
+
+
+async def get_redis_backend(config):
+    """
+    Backend Redis compartilhado pelos caches quando CACHE_BACKEND="redis". None no
+    modo "lru" ou se o Redis não responder (cada cache usa então o próprio LRU)
+    """
+    if config.CACHE_BACKEND != "redis":
+        yield None
+        return
+
+    backend = RedisCacheBackend(config.REDIS_URL)
+    try:
+        logger.info("Conectando ao Redis para o cache compartilhado...")
+        await backend.start()
+    except Exception as e:
+        logger.error(f"Erro ao conectar com o Redis: {e}")
+        logger.warning("Caches funcionando na memória do processo (LRU)")
+        await backend.close()
+        yield None
+        return
+
+    yield backend
+    logger.info("Fechando conexão com o Redis...")
+    await backend.close()
+
+
+def get_cache_backend(
+    compartilhado: Optional[CacheBackend], max_itens: int = CACHE_MAX_ITEMS
+) -> CacheBackend:
+    """
+    Backend de um cache: o compartilhado (Redis), se houver, ou um LRU só dele,
+    limitado a max_itens, para que um cache não descarte as entradas dos outros
+    """
+    if compartilhado is not None:
+        return compartilhado
+    return LRUCacheBackend(max_itens=max_itens)
+
+
+class TTLCache:
+    """
+    Cache com expiração por tempo (TTL) sobre um CacheBackend, com as chaves
+    agrupadas num namespace. Com ttl <= 0 nada é armazenado (cache desativado).
+
+    Com stale_ttl > 0, uma entrada vencida continua disponível por mais stale_ttl
+    segundos via lookup() (marcada como não fresca), para stale-while-revalidate.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        stale_ttl: float = 0,
+        backend: Optional[CacheBackend] = None,
+        namespace: str = "estatisticas",
+    ) -> None:
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.backend = backend if backend is not None else LRUCacheBackend()
+        self.namespace = f"{namespace}:"
+        self._geracao = 0
+        self.backend.on_invalidate(self._invalidado_por_outro_worker)
+
+    @property
+    def geracao(self) -> int:
+        """Muda a cada invalidação; valores calculados em outra geração são descartados"""
+        return self._geracao
+
+    def _chave(self, chave: Hashable) -> str:
+        return f"{self.namespace}{chave!r}"
+
+    def _invalidado_por_outro_worker(self, prefixo: str) -> None:
+        if prefixo.startswith(self.namespace) or self.namespace.startswith(prefixo):
+            self._geracao += 1
+
+    async def lookup(
+        self, chave: Hashable, default: Optional[Any] = None
+    ) -> Tuple[Any, bool]:
+        """Retorna (valor, fresco); fresco é False para valores vencidos ainda servíveis"""
+        item = await self.backend.get(self._chave(chave))
+        if item is None:
+            return default, False
+        fresco_ate, valor = item
+        return valor, fresco_ate > time.time()
+
+    async def get(self, chave: Hashable, default: Optional[Any] = None) -> Any:
+        valor, fresco = await self.lookup(chave)
+        return valor if fresco else default
+
+    async def set(
+        self, chave: Hashable, valor: Any, geracao: Optional[int] = None
+    ) -> None:
+        if self.ttl <= 0:
+            return
+        if geracao is not None and geracao != self._geracao:
+            return
+        # Horário absoluto: o frescor é comparado por todos os workers que compartilham o backend
+        await self.backend.set(
+            self._chave(chave),
+            (time.time() + self.ttl, valor),
+            self.ttl + max(self.stale_ttl, 0),
+        )
+
+    async def invalidate(self) -> None:
+        """Descarta todas as entradas do namespace"""
+        self._geracao += 1
+        await self.backend.delete_prefix(self.namespace)
+
+
+class EntityCache:
+    """
+    Cache read-through de entidades por (entidade, id) sobre um CacheBackend, com
+    contadores de acertos e falhas. Ausências não são armazenadas, para que um id
+    criado depois da consulta não fique escondido pelo cache.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        backend: Optional[CacheBackend] = None,
+        namespace: str = "entidades",
+    ) -> None:
+        self.ttl = ttl
+        self.backend = backend if backend is not None else LRUCacheBackend()
+        self.namespace = f"{namespace}:"
+        self.hits = 0
+        self.misses = 0
+        self._geracao = 0
+        self.backend.on_invalidate(self._invalidado_por_outro_worker)
+
+    def _chave(self, entidade: str, entidade_id: Optional[int] = None) -> str:
+        return (
+            f"{self.namespace}{entidade}:{'' if entidade_id is None else entidade_id}"
+        )
+
+    def _invalidado_por_outro_worker(self, prefixo: str) -> None:
+        if prefixo.startswith(self.namespace) or self.namespace.startswith(prefixo):
+            self._geracao += 1
+
+    async def get_or_load(
+        self,
+        entidade: str,
+        entidade_id: int,
+        carregar: Callable[[], Awaitable[Any]],
+        versoes: Tuple[Tuple[str, str], ...] = (),
+    ) -> Any:
+        """
+        Retorna a entidade do cache; na ausência, carrega com carregar() e armazena.
+        Com versoes, a entrada é só das requisições que leram essas versões das tabelas.
+        """
+        chave = self._chave(entidade, entidade_id)
+        if versoes:
+            chave = f"{chave}@{versoes!r}"
+        valor = await self.backend.get(chave)
+        if valor is not None:
+            self.hits += 1
+            return valor
+
+        self.misses += 1
+        geracao = self._geracao
+        valor = await carregar()
+        # Uma invalidação durante a carga pode ter tornado o valor lido obsoleto
+        if valor is not None and self.ttl > 0 and geracao == self._geracao:
+            await self.backend.set(chave, valor, self.ttl)
+        return valor
+
+    async def invalidate(
+        self, entidade: str, entidade_id: Optional[int] = None
+    ) -> None:
+        """Descarta uma entidade pelo id ou, sem id, todas as entidades do tipo"""
+        self._geracao += 1
+        if entidade_id is None:
+            await self.backend.delete_prefix(self._chave(entidade))
+        else:
+            await self.backend.delete(self._chave(entidade, entidade_id))
+
+    @property
+    def taxa_acerto(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class TableVersions:
+    """
+    Versão de cada tabela, usada nas ETags das respostas. Lida de versao_tabela,
+    que triggers no banco (migração 0007) trocam no commit de toda escrita: todos
+    os workers enxergam a mesma versão. Como o corpo pode vir do cache de um só
+    worker, as versões lidas ficam em versoes_da_requisicao() e entram nas chaves
+    dos caches; assim uma ETag nova nunca acompanha um corpo carregado antes dela.
+    Sem banco, ou se a leitura falhar, não há versão e a rota responde sem ETag.
+    """
+
+    def __init__(self, db) -> None:
+        self.db = db
+
+    async def get(self, *tabelas: str) -> Optional[List[str]]:
+        if self.db is None:
+            return None
+        try:
+            async with self.db.connect() as conexao:
+                resultado = await conexao.execute(
+                    select(_VERSAO_TABELA.c.tabela, _VERSAO_TABELA.c.versao).where(
+                        _VERSAO_TABELA.c.tabela.in_(tabelas)
+                    )
+                )
+                versoes = dict(resultado.all())
+        except Exception as e:
+            logger.error(f"Erro ao ler as versões das tabelas: {e}")
+            return None
+        return [str(versoes.get(tabela, 0)) for tabela in tabelas]
+
+    async def etag(self, recurso: str, *tabelas: str) -> Optional[str]:
+        """ETag forte do recurso (URL com query) a partir das versões das tabelas de que depende"""
+        versoes = await self.get(*tabelas)
+        if versoes is None:
+            return None
+        _versoes_da_requisicao.set(tuple(zip(tabelas, versoes)))
+        base = "|".join(
+            [
+                recurso,
+                *(f"{tabela}={versao}" for tabela, versao in zip(tabelas, versoes)),
+            ]
+        )
+        return f'"{hashlib.sha1(base.encode()).hexdigest()}"'
+
+
+class SingleFlight:
+    """
+    Agrupa chamadas concorrentes idênticas (mesma chave) numa única execução:
+    a primeira executa, as demais aguardam e recebem o mesmo resultado ou erro.
+    """
+
+    def __init__(self) -> None:
+        self._em_andamento: Dict[Hashable, asyncio.Future] = {}
+        self._tarefas: Set[asyncio.Task] = set()
+
+    async def do(self, chave: Hashable, funcao: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        A execução roda numa tarefa própria, num contexto vazio (com sua própria
+        sessão), e não na unidade de trabalho de quem chegou primeiro: o cancelamento
+        ou a falha da requisição que a disparou não atinge as demais.
+        """
+        futuro = self._em_andamento.get(chave)
+        while True:
+            if futuro is None:
+                futuro = self._iniciar(chave, funcao)
+            await asyncio.wait([futuro])
+            if not futuro.cancelled():
+                return futuro.result()
+            # Execução cancelada (ex.: no encerramento): a próxima chamada recomeça
+            futuro = self._em_andamento.get(chave)
+
+    def do_background(
+        self, chave: Hashable, funcao: Callable[[], Awaitable[Any]]
+    ) -> None:
+        """
+        Agenda a execução em segundo plano, se ainda não houver uma para a chave.
+        Roda num contexto vazio, fora da unidade de trabalho da requisição que a disparou.
+        """
+        if chave in self._em_andamento:
+            return
+        self._iniciar(chave, funcao)
+
+    def _iniciar(
+        self, chave: Hashable, funcao: Callable[[], Awaitable[Any]]
+    ) -> asyncio.Future:
+        # Registrada já aqui, para que chamadas até a tarefa começar se juntem a ela
+        futuro = self._registrar(chave)
+        tarefa = asyncio.create_task(
+            self._executar_em_segundo_plano(chave, futuro, funcao),
+            context=contextvars.Context(),
+        )
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(
+            lambda tarefa: self._finalizar_tarefa(tarefa, chave, futuro)
+        )
+        return futuro
+
+    def _registrar(self, chave: Hashable) -> asyncio.Future:
+        futuro = asyncio.get_running_loop().create_future()
+        self._em_andamento[chave] = futuro
+        return futuro
+
+    async def _executar(
+        self,
+        chave: Hashable,
+        futuro: asyncio.Future,
+        funcao: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        try:
+            resultado = await funcao()
+        except asyncio.CancelledError:
+            futuro.cancel()
+            raise
+        except Exception as e:
+            futuro.set_exception(e)
+            futuro.exception()  # evita aviso de exceção não lida quando ninguém aguardava
+            raise
+        else:
+            futuro.set_result(resultado)
+            return resultado
+        finally:
+            if self._em_andamento.get(chave) is futuro:
+                del self._em_andamento[chave]
+
+    async def _executar_em_segundo_plano(
+        self,
+        chave: Hashable,
+        futuro: asyncio.Future,
+        funcao: Callable[[], Awaitable[Any]],
+    ) -> None:
+        try:
+            await self._executar(chave, futuro, funcao)
+        except Exception as e:
+            logger.error(f"Erro na execução compartilhada de {chave}: {e}")
+
+    def _finalizar_tarefa(
+        self, tarefa: asyncio.Task, chave: Hashable, futuro: asyncio.Future
+    ) -> None:
+        self._tarefas.discard(tarefa)
+        # Tarefa cancelada antes de começar: libera quem estava aguardando
+        if not futuro.done():
+            futuro.cancel()
+        if self._em_andamento.get(chave) is futuro:
+            del self._em_andamento[chave]
+
+    def forget(self) -> None:
+        """Chamadas seguintes não se juntam às execuções em andamento"""
+        self._em_andamento.clear()
+
+    def __contains__(self, chave: Hashable) -> bool:
+        return chave in self._em_andamento
+
+    def __len__(self) -> int:
+        return len(self._em_andamento)
@@ -1,6 +1,18 @@
 import logging
 import os
 
+from app.shared.constants import (
+    CACHE_BACKEND,
+    CPF_VALIDAR_DIGITOS,
+    CUBO_CACHE_MAX_ITEMS,
+    ENTITY_CACHE_MAX_ITEMS,
+    ENTITY_CACHE_TTL,
+    REDIS_URL,
+    STATS_CACHE_MAX_ITEMS,
+    STATS_CACHE_STALE_TTL,
+    STATS_CACHE_TTL,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,6 +49,15 @@ class Config(metaclass=ConfigSingletonMeta):
         self.ENCRYPTION_KEY = vars.get("ENCRYPTION_KEY")
         self.AGRICULTURE_QUEUE = f"report_{self.ENVIRONMENT}"
         self.PORT = int(vars.get("PORT", 8000))
+        self.STATS_CACHE_TTL = float(vars.get("STATS_CACHE_TTL", STATS_CACHE_TTL))
+        self.STATS_CACHE_STALE_TTL = float(vars.get("STATS_CACHE_STALE_TTL", STATS_CACHE_STALE_TTL))
+        self.ENTITY_CACHE_TTL = float(vars.get("ENTITY_CACHE_TTL", ENTITY_CACHE_TTL))
+        self.CACHE_BACKEND = vars.get("CACHE_BACKEND", CACHE_BACKEND).lower()
+        self.STATS_CACHE_MAX_ITEMS = int(vars.get("STATS_CACHE_MAX_ITEMS", STATS_CACHE_MAX_ITEMS))
+        self.ENTITY_CACHE_MAX_ITEMS = int(vars.get("ENTITY_CACHE_MAX_ITEMS", ENTITY_CACHE_MAX_ITEMS))
+        self.CUBO_CACHE_MAX_ITEMS = int(vars.get("CUBO_CACHE_MAX_ITEMS", CUBO_CACHE_MAX_ITEMS))
+        self.REDIS_URL = vars.get("REDIS_URL", REDIS_URL)
+        self.CPF_VALIDAR_DIGITOS = str(vars.get("CPF_VALIDAR_DIGITOS", CPF_VALIDAR_DIGITOS)).lower() in ("1", "true", "sim")
 
 
 class ConfigFromEnviron(Config):
@@ -2,27 +2,76 @@ from dependency_injector import containers, providers
 
 
 
+from app.core.cache import EntityCache, SingleFlight, TableVersions, TTLCache, get_cache_backend, get_redis_backend
 from app.core.config import config
-from app.core.database import get_db
-from app.brain_agriculture.repositories.brain_agriculture import Brain_AgricultureRepository
+from app.core.database import UnitOfWork, get_async_db
+from app.brain_agriculture.repositories.brain_agriculture import AsyncBrain_AgricultureRepository
 from app.brain_agriculture.services.brain_agriculture import Brain_AgricultureService
 
 
 class Container(containers.DeclarativeContainer):
     wiring_config = containers.WiringConfiguration(modules=["app.brain_agriculture.api.v1.routes"])
 
-    # Configuração do banco de dados
-    db = providers.Resource(get_db, config=config)
+    # Configuração do banco de dados (engine assíncrono asyncpg)
+    db = providers.Resource(get_async_db, config=config)
+
+    # Unidade de trabalho com escopo de requisição (aberta pelo db_session_middleware)
+    unit_of_work = providers.Factory(UnitOfWork, db=db)
+
+    # Redis compartilhado entre os workers (None no modo LRU); sem ele, cada cache
+    # tem o próprio LRU com limite de itens, e um não descarta as entradas do outro
+    redis_backend = providers.Resource(get_redis_backend, config=config)
+
+    # Versões das tabelas (ETags), lidas do banco (trocadas por triggers a cada escrita)
+    table_versions = providers.Singleton(TableVersions, db=db)
 
     # Repositório
     brain_agriculture_repository = providers.Factory(
-        Brain_AgricultureRepository, 
+        AsyncBrain_AgricultureRepository, 
         db=db
     )
 
+    # Cache das estatísticas do dashboard, compartilhado entre requisições
+    stats_cache = providers.Singleton(
+        TTLCache,
+        ttl=config.STATS_CACHE_TTL,
+        stale_ttl=config.STATS_CACHE_STALE_TTL,
+        backend=providers.Singleton(
+            get_cache_backend, compartilhado=redis_backend, max_itens=config.STATS_CACHE_MAX_ITEMS
+        )
+    )
+
+    # Cache do cubo de safras, com limite de itens próprio, para que os cubos
+    # (potencialmente grandes) não descartem as demais estatísticas
+    cubo_cache = providers.Singleton(
+        TTLCache,
+        ttl=config.STATS_CACHE_TTL,
+        stale_ttl=config.STATS_CACHE_STALE_TTL,
+        backend=providers.Singleton(
+            get_cache_backend, compartilhado=redis_backend, max_itens=config.CUBO_CACHE_MAX_ITEMS
+        ),
+        namespace="cubo"
+    )
+
+    # Cache das buscas de produtor/fazenda/safra por id
+    entity_cache = providers.Singleton(
+        EntityCache,
+        ttl=config.ENTITY_CACHE_TTL,
+        backend=providers.Singleton(
+            get_cache_backend, compartilhado=redis_backend, max_itens=config.ENTITY_CACHE_MAX_ITEMS
+        )
+    )
+
+    # Leituras idênticas concorrentes compartilham uma única consulta ao banco
+    single_flight = providers.Singleton(SingleFlight)
+
     # Service
     brain_agriculture_service = providers.Factory(
         Brain_AgricultureService, 
-        brain_agriculture_repository=brain_agriculture_repository
+        brain_agriculture_repository=brain_agriculture_repository,
+        stats_cache=stats_cache,
+        single_flight=single_flight,
+        entity_cache=entity_cache,
+        cubo_cache=cubo_cache
     )
 
@@ -1,35 +1,37 @@
+import inspect
 import logging
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import QueuePool
+from contextvars import ContextVar
+from typing import Any, Callable, List, Optional
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core.config import Config
 
 logger = logging.getLogger()
 
-def get_db(config: Config):
+async def get_async_db(config: Config):
     try:
-        logger.info("Iniciando conexão com o banco de dados...")
-        
+        logger.info("Iniciando conexão assíncrona com o banco de dados...")
+
         # Configuração SSL baseada no ambiente
         ssl_mode = 'require' if config.ENVIRONMENT != 'test' else 'disable'
         logger.info(f"Modo SSL configurado: {ssl_mode}")
-        
-        # Criar URL de conexão PostgreSQL usando psycopg2
-        database_url = f"postgresql://{config.AGRICULTURE_DB_USER}:{config.AGRICULTURE_DB_PASSWORD}@{config.AGRICULTURE_DB_HOST}:{config.AGRICULTURE_DB_PORT}/{config.AGRICULTURE_DB_DATABASE}"
-        logger.info(f"URL de conexão: postgresql://{config.AGRICULTURE_DB_USER}:***@{config.AGRICULTURE_DB_HOST}:{config.AGRICULTURE_DB_PORT}/{config.AGRICULTURE_DB_DATABASE}")
-        
-        # Configurar parâmetros SSL
+
+        # Criar URL de conexão PostgreSQL usando asyncpg
+        database_url = f"postgresql+asyncpg://{config.AGRICULTURE_DB_USER}:{config.AGRICULTURE_DB_PASSWORD}@{config.AGRICULTURE_DB_HOST}:{config.AGRICULTURE_DB_PORT}/{config.AGRICULTURE_DB_DATABASE}"
+        logger.info(f"URL de conexão: postgresql+asyncpg://{config.AGRICULTURE_DB_USER}:***@{config.AGRICULTURE_DB_HOST}:{config.AGRICULTURE_DB_PORT}/{config.AGRICULTURE_DB_DATABASE}")
+
+        # Configurar parâmetros SSL (asyncpg usa o parâmetro 'ssl')
         connect_args = {}
         if ssl_mode == 'require':
-            connect_args['sslmode'] = 'require'
-        
-        logger.info("Criando engine do SQLAlchemy...")
-        
-        # Criar engine do SQLAlchemy
-        engine = create_engine(
+            connect_args['ssl'] = 'require'
+
+        logger.info("Criando engine assíncrono do SQLAlchemy...")
+
+        # Criar engine assíncrono do SQLAlchemy (pool AsyncAdaptedQueuePool)
+        engine = create_async_engine(
             database_url,
-            poolclass=QueuePool,
             pool_size=5,
             max_overflow=10,
             pool_pre_ping=True,
@@ -37,16 +39,84 @@ def get_db(config: Config):
             connect_args=connect_args,
             echo=False  # Set to True for SQL debugging
         )
-        
-        logger.info("Engine do SQLAlchemy criado com sucesso")
-        
-        # Criar session factory
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-        
-        yield engine
-        logger.info("Fechando conexão com o banco de dados...")
-        engine.dispose()
+
+        logger.info("Engine assíncrono do SQLAlchemy criado com sucesso")
     except Exception as e:
         logger.error(f"Erro ao conectar com o banco de dados: {e}")
         logger.warning("Aplicação funcionando sem banco de dados")
         yield None
+        return
+
+    yield engine
+    logger.info("Fechando conexão com o banco de dados...")
+    await engine.dispose()
+
+
+# Unidade de trabalho ativa na requisição corrente (definida pelo middleware)
+_current_unit_of_work: ContextVar[Optional["UnitOfWork"]] = ContextVar("current_unit_of_work", default=None)
+
+
+def get_current_unit_of_work() -> Optional["UnitOfWork"]:
+    return _current_unit_of_work.get()
+
+
+class UnitOfWork:
+    """
+    Unidade de trabalho com escopo de requisição.
+
+    Compartilha uma única AsyncSession (e portanto uma única conexão do pool e uma
+    única transação) entre todas as chamadas de repositório feitas durante a
+    requisição. A sessão é aberta sob demanda e o commit é feito uma única vez ao
+    final; em caso de erro é feito rollback.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._session: Optional[AsyncSession] = None
+        self._token = None
+        self._rollback_only = False
+        self._after_commit: List[Callable[[], Any]] = []
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = AsyncSession(self.db, expire_on_commit=False)
+        return self._session
+
+    def mark_rollback_only(self) -> None:
+        """Garante que a transação será desfeita ao final da unidade de trabalho"""
+        self._rollback_only = True
+
+    def after_commit(self, callback: Callable[[], Any]) -> None:
+        """Agenda uma função (síncrona ou assíncrona) para rodar depois que a transação for confirmada"""
+        self._after_commit.append(callback)
+
+    async def commit(self) -> None:
+        if self._session is not None and self._session.in_transaction():
+            await self._session.commit()
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            resultado = callback()
+            if inspect.isawaitable(resultado):
+                await resultado
+
+    async def rollback(self) -> None:
+        self._after_commit = []
+        if self._session is not None and self._session.in_transaction():
+            await self._session.rollback()
+
+    async def __aenter__(self) -> "UnitOfWork":
+        self._token = _current_unit_of_work.set(self)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        try:
+            if exc_type is None and not self._rollback_only:
+                await self.commit()
+            else:
+                await self.rollback()
+        finally:
+            if self._session is not None:
+                await self._session.close()
+                self._session = None
+            _current_unit_of_work.reset(self._token)
@@ -1,4 +1,167 @@
+from contextlib import asynccontextmanager
+from typing import Iterable, List, Optional
+
+from sqlalchemy import ARRAY, Column, Integer, MetaData, Table, any_, bindparam, insert, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.database import get_current_unit_of_work
+
+
 class BaseRepository:
     def __init__(self, db) -> None:
         self.db = db
-  
+
+
+class AsyncBaseRepository(BaseRepository):
+    @asynccontextmanager
+    async def _session(self):
+        """
+        Usa a sessão da unidade de trabalho da requisição quando existir;
+        fora de uma requisição (scripts, tasks) abre uma sessão própria.
+        """
+        unit_of_work = get_current_unit_of_work()
+        if unit_of_work is not None:
+            yield unit_of_work.session
+        else:
+            async with AsyncSession(self.db, expire_on_commit=False) as session:
+                yield session
+
+    def _paginar(self, statement, id_column, limit: Optional[int] = None, after: Optional[int] = None, order: str = "asc"):
+        """Aplica paginação por keyset (cursor no id) e ordenação a um select"""
+        if order == "desc":
+            if after is not None:
+                statement = statement.where(id_column < after)
+            statement = statement.order_by(id_column.desc())
+        else:
+            if after is not None:
+                statement = statement.where(id_column > after)
+            statement = statement.order_by(id_column)
+        if limit is not None:
+            statement = statement.limit(limit)
+        return statement
+
+    async def _stream(self, statement, batch_size: int):
+        """
+        Executa o select com cursor no servidor (yield_per) em uma conexão própria,
+        entregando as linhas em lotes de batch_size com memória constante.
+        Não usa a unidade de trabalho: o streaming continua depois do fim da requisição.
+        """
+        async with self.db.connect() as connection:
+            result = await connection.stream(statement.execution_options(yield_per=batch_size))
+            async for partition in result.mappings().partitions(batch_size):
+                yield partition
+
+    async def _atualizar(self, model, registro_id: int, dados: dict, *condicoes, extras=()):
+        """
+        Atualiza um registro com um único UPDATE ... WHERE id = :id RETURNING *.
+        Condições extras (ex.: EXISTS da chave estrangeira) entram no mesmo WHERE.
+        Retorna a linha (registro, *extras) ou None quando nenhuma linha foi afetada.
+        """
+        valores = {
+            chave: valor for chave, valor in dados.items()
+            if chave in model.__table__.columns and chave != "id"
+        }
+        async with self._session() as session:
+            if not valores:
+                statement = select(model, *extras).where(model.id == registro_id, *condicoes)
+            else:
+                statement = (
+                    update(model)
+                    .where(model.id == registro_id, *condicoes)
+                    .values(**valores)
+                    .returning(model, *extras)
+                    .execution_options(synchronize_session="fetch")
+                )
+            linha = (await session.exec(statement)).first()
+            if linha is None:
+                return None
+            if valores:
+                await self._commit(session)
+            return linha
+
+    async def _buscar_por_ids(self, model, ids: List[int]) -> list:
+        """
+        Busca as linhas (colunas, sem hidratar o ORM) dos ids numa única query WHERE id = ANY(:ids)
+        e as devolve na ordem dos ids informados; ids inexistentes ficam de fora
+        """
+        if not ids:
+            return []
+        async with self._session() as session:
+            statement = select(*model.__table__.columns).where(
+                model.id == any_(bindparam("ids", list(ids), type_=ARRAY(Integer)))
+            )
+            linhas = (await session.exec(statement)).all()
+        por_id = {linha.id: linha for linha in linhas}
+        return [por_id[registro_id] for registro_id in ids if registro_id in por_id]
+
+    async def _valores_existentes(self, coluna, valores: Iterable) -> set:
+        """Dos valores informados, retorna os que existem na coluna numa única query (WHERE coluna IN (...))"""
+        valores = set(valores)
+        if not valores:
+            return set()
+        async with self._session() as session:
+            resultado = await session.exec(select(coluna).where(coluna.in_(valores)))
+            return set(resultado.scalars().all())
+
+    async def _inserir_lote(self, model, linhas: List[dict]) -> List[int]:
+        """
+        Insere as linhas com INSERT multi-linha (VALUES agrupados pelo insertmanyvalues do SQLAlchemy)
+        e RETURNING id na ordem das linhas. Em caso de erro nada do lote fica gravado.
+        """
+        if not linhas:
+            return []
+        async with self._session() as session:
+            try:
+                resultado = await session.exec(
+                    insert(model).returning(model.id, sort_by_parameter_order=True),
+                    params=linhas
+                )
+                ids = [linha.id for linha in resultado]
+                await self._commit(session)
+            except Exception:
+                await session.rollback()
+                raise
+            return ids
+
+    async def _copiar_via_staging(self, model, colunas: List[str], linhas: List[tuple], condicao=None) -> List[int]:
+        """
+        Carrega as linhas (número da linha, *valores das colunas) com COPY numa tabela temporária
+        e as insere na tabela do model com INSERT ... SELECT, numa transação própria (fora da
+        unidade de trabalho). A condição recebe a tabela temporária e filtra as linhas aceitas
+        (ex.: EXISTS da chave estrangeira). Retorna os números das linhas descartadas por ela.
+        """
+        tabela = model.__table__
+        staging = Table(
+            f"importacao_{tabela.name}",
+            MetaData(),
+            Column("linha", Integer),
+            *(Column(coluna, tabela.c[coluna].type) for coluna in colunas),
+            prefixes=["TEMPORARY"],
+            postgresql_on_commit="DROP",
+        )
+        filtro = condicao(staging) if condicao is not None else None
+
+        async with self.db.begin() as conexao:
+            await conexao.run_sync(staging.create)
+            bruta = await conexao.get_raw_connection()
+            await bruta.driver_connection.copy_records_to_table(
+                staging.name, records=linhas, columns=["linha", *colunas]
+            )
+
+            descartadas = []
+            origem = select(*(staging.c[coluna] for coluna in colunas)).order_by(staging.c.linha)
+            if filtro is not None:
+                descartadas = list(
+                    (await conexao.execute(select(staging.c.linha).where(~filtro).order_by(staging.c.linha))).scalars()
+                )
+                origem = origem.where(filtro)
+            await conexao.execute(insert(tabela).from_select(colunas, origem))
+
+        return descartadas
+
+    async def _commit(self, session: AsyncSession) -> None:
+        """Dentro de uma unidade de trabalho apenas envia as alterações (flush); o commit é feito ao final da requisição"""
+        if get_current_unit_of_work() is not None:
+            await session.flush()
+        else:
+            await session.commit()
@@ -1,11 +1,16 @@
+import logging
+import os
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from starlette.requests import Request
-import os
 
 from app.core.container import Container
 from app.brain_agriculture.api.v1.routes import brain_agriculture_router
 
+logger = logging.getLogger(__name__)
+
 
 def create_app():
     app = FastAPI(
@@ -18,7 +23,22 @@ def create_app():
 
     @app.middleware("http")
     async def db_session_middleware(request: Request, call_next):
-        response = await call_next(request)
+        if not hasattr(app, 'container'):
+            return await call_next(request)
+
+        # Uma sessão e uma transação por requisição, compartilhadas pelos repositórios
+        unit_of_work = await app.container.unit_of_work()
+        async with unit_of_work:
+            response = await call_next(request)
+            if response.status_code >= 400:
+                unit_of_work.mark_rollback_only()
+            else:
+                try:
+                    await unit_of_work.commit()
+                except Exception as e:
+                    logger.error(f"Erro ao confirmar transação da requisição: {e}")
+                    unit_of_work.mark_rollback_only()
+                    response = JSONResponse(status_code=500, content={"detail": "Erro interno do servidor"})
         return response
 
     @app.on_event("startup")
@@ -29,12 +49,12 @@ def create_app():
         
         container = Container()
         app.container = container
-        container.init_resources()
+        await container.init_resources()
 
     @app.on_event("shutdown")
     async def shutdown():
         if hasattr(app, 'container'):
-            app.container.shutdown_resources()
+            await app.container.shutdown_resources()
 
     app.include_router(brain_agriculture_router, prefix="/api/v1", tags=["Brain_Agriculture"])
 
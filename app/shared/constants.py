@@ -0,0 +1,45 @@
+# Paginação (keyset) dos endpoints de listagem
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Quantidade máxima de itens aceita pelos endpoints de criação em lote (/bulk)
+BULK_MAX_ITEMS = 10000
+
+# Importação em streaming (CSV/NDJSON): linhas carregadas por COPY a cada bloco
+# e quantidade máxima de linhas rejeitadas detalhadas no relatório
+IMPORT_CHUNK_SIZE = 5000
+IMPORT_MAX_ERROS = 1000
+
+# Exportação em streaming (linhas buscadas por lote no cursor do servidor)
+EXPORT_BATCH_SIZE = 1000
+
+# Cache das estatísticas do dashboard (segundos; 0 desativa)
+STATS_CACHE_TTL = 60
+# Por quanto tempo após o TTL um valor vencido ainda é servido enquanto é recalculado em segundo plano
+STATS_CACHE_STALE_TTL = 300
+
+# Cache das buscas de produtor/fazenda/safra por id (segundos; 0 desativa)
+ENTITY_CACHE_TTL = 300
+
+# Backend dos caches: "lru" (memória de cada worker) ou "redis" (compartilhado entre workers)
+CACHE_BACKEND = "lru"
+# No backend "lru" cada cache tem sua própria memória, limitada a esta quantidade de itens
+CACHE_MAX_ITEMS = 1024
+STATS_CACHE_MAX_ITEMS = 256
+ENTITY_CACHE_MAX_ITEMS = 1024
+REDIS_URL = "redis://localhost:6379/0"
+CACHE_KEY_PREFIX = "brain_agriculture:cache:"
+# Canal pub/sub em que os workers publicam as invalidações
+CACHE_INVALIDATION_CHANNEL = "brain_agriculture:cache:invalidacao"
+
+# Dimensões aceitas pelo cubo de safras (/safras/cubo), na ordem canônica
+CUBO_DIMENSOES = ("estado", "cidade", "cultura", "ano")
+# Máximo de células devolvidas pelo cubo; consultas maiores são recusadas (400)
+CUBO_MAX_CELULAS = 10000
+# Cubos mantidos no cache próprio do cubo (uma entrada por combinação de dimensões e filtros)
+CUBO_CACHE_MAX_ITEMS = 64
+
+# Conferência dos dígitos verificadores do CPF no cadastro de produtores. Desligada por
+# padrão: sem ela só se exige 11 dígitos, como antes; ligue quando os clientes estiverem
+# prontos e os CPFs já gravados conferirem (a migração 0005 lista os que não conferem)
+CPF_VALIDAR_DIGITOS = False
@@ -1,3 +1,10 @@
+import codecs
+import csv
+import io
+import json
+from typing import AsyncIterable, AsyncIterator, Optional, Tuple
+
+
 def convert_json_with_bytes(data):
     if isinstance(data, bytes):
         return data.decode()
@@ -10,4 +17,70 @@ def convert_json_with_bytes(data):
     return data
 
 
+def rows_to_ndjson(rows) -> str:
+    """Serializa uma lista de linhas (mapeamentos) como NDJSON, uma linha JSON por registro"""
+    return "".join(json.dumps(dict(row), ensure_ascii=False) + "\n" for row in rows)
+
+
+def rows_to_csv(rows, columns, header: bool = False) -> str:
+    """Serializa uma lista de linhas (mapeamentos) como CSV, opcionalmente com cabeçalho"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    for row in rows:
+        writer.writerow([row[column] for column in columns])
+    return buffer.getvalue()
+
+
+async def iter_lines(chunks: AsyncIterable[bytes], encoding: str = "utf-8") -> AsyncIterator[str]:
+    """Decodifica um fluxo de bytes em pedaços e entrega as linhas completas (sem o terminador)"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pendente = ""
+    async for chunk in chunks:
+        pendente += decoder.decode(chunk)
+        *linhas, pendente = pendente.split("\n")
+        for linha in linhas:
+            yield linha.rstrip("\r")
+    pendente += decoder.decode(b"", final=True)
+    if pendente.rstrip("\r"):
+        yield pendente.rstrip("\r")
+
+
+async def csv_to_rows(chunks: AsyncIterable[bytes], encoding: str = "utf-8-sig") -> AsyncIterator[Tuple[int, dict]]:
+    """
+    Lê um CSV em streaming (primeira linha é o cabeçalho) e entrega (número da linha, registro).
+    Campos entre aspas com quebra de linha são juntados até as aspas fecharem.
+    """
+    cabecalho = None
+    registro = ""
+    numero = inicio = 0
+    async for linha in iter_lines(chunks, encoding):
+        numero += 1
+        if not registro:
+            inicio = numero
+        registro = f"{registro}\n{linha}" if registro else linha
+        if registro.count('"') % 2:
+            continue
+        valores = next(csv.reader([registro])) if registro else []
+        registro = ""
+        if cabecalho is None:
+            cabecalho = [coluna.strip() for coluna in valores]
+        elif valores:
+            yield inicio, dict(zip(cabecalho, valores))
+    if registro:
+        yield inicio, dict(zip(cabecalho or [], next(csv.reader([registro]))))
+
 
+async def ndjson_to_rows(chunks: AsyncIterable[bytes], encoding: str = "utf-8") -> AsyncIterator[Tuple[int, Optional[dict]]]:
+    """Lê NDJSON em streaming e entrega (número da linha, objeto); linhas que não são um objeto JSON vêm como None"""
+    numero = 0
+    async for linha in iter_lines(chunks, encoding):
+        numero += 1
+        if not linha.strip():
+            continue
+        try:
+            valor = json.loads(linha)
+        except ValueError:
+            valor = None
+        yield numero, valor if isinstance(valor, dict) else None
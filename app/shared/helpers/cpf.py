@@ -0,0 +1,43 @@
+from operator import mul
+from typing import Iterable, List, Optional
+
+# Bytes que não são dígitos ASCII: removidos de uma vez pelo bytes.translate
+_NAO_DIGITOS = bytes(b for b in range(256) if not 0x30 <= b <= 0x39)
+
+# Pesos dos dígitos verificadores; a soma é feita sobre os códigos ASCII, então
+# o deslocamento de ord("0") vezes a soma dos pesos é descontado de uma vez
+_PESOS_DV1 = tuple(range(10, 1, -1))
+_PESOS_DV2 = tuple(range(11, 1, -1))
+_DESLOCAMENTO_DV1 = 0x30 * sum(_PESOS_DV1)
+_DESLOCAMENTO_DV2 = 0x30 * sum(_PESOS_DV2)
+
+
+def normalizar_cpfs(cpfs: Iterable[str]) -> List[Optional[int]]:
+    """
+    Converte CPFs (com ou sem máscara) no inteiro de 11 dígitos guardado em produtor.cpf_numerico.
+    Processa o lote inteiro sem regex por item; None para os que não têm 11 dígitos
+    """
+    digitos = [
+        cpf.encode("ascii", "ignore").translate(None, _NAO_DIGITOS) for cpf in cpfs
+    ]
+    return [int(numero) if len(numero) == 11 else None for numero in digitos]
+
+
+def validar_cpfs(cpfs: Iterable[Optional[int]]) -> List[bool]:
+    """Confere os dígitos verificadores de CPFs já normalizados; sequências de um só dígito são inválidas"""
+    return [cpf is not None and _digitos_verificadores_conferem(cpf) for cpf in cpfs]
+
+
+def formatar_cpf(cpf: int) -> str:
+    """Formata o CPF numérico como XXX.XXX.XXX-XX"""
+    digitos = f"{cpf:011d}"
+    return f"{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}"
+
+
+def _digitos_verificadores_conferem(cpf: int) -> bool:
+    digitos = b"%011d" % cpf
+    if len(digitos) != 11 or digitos.count(digitos[0]) == 11:
+        return False
+    dv1 = (sum(map(mul, digitos[:9], _PESOS_DV1)) - _DESLOCAMENTO_DV1) * 10 % 11 % 10
+    dv2 = (sum(map(mul, digitos[:10], _PESOS_DV2)) - _DESLOCAMENTO_DV2) * 10 % 11 % 10
+    return digitos[9] - 0x30 == dv1 and digitos[10] - 0x30 == dv2
@@ -12,8 +12,8 @@ PORT=${PORT:-8000}
 echo "Verificando tabelas existentes no banco de dados..."
 python scripts/check_tables.py
 
-echo "Verificando se é necessário criar tabelas..."
-python scripts/setup_db.py
+echo "Aplicando migrações do banco de dados..."
+alembic upgrade head
 
 echo "verificando porta $PORT"
 
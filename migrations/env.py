@@ -0,0 +1,64 @@
+import logging
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+from sqlmodel import SQLModel
+
+from app.brain_agriculture.models import (  # noqa: F401 - registra as tabelas no metadata
+    brain_agriculture,
+)
+from app.core.config import config as app_config
+
+alembic_config = context.config
+
+if alembic_config.config_file_name is not None:
+    fileConfig(alembic_config.config_file_name)
+
+logger = logging.getLogger("alembic.env")
+
+target_metadata = SQLModel.metadata
+
+
+def get_database_url() -> str:
+    """Monta a URL do banco (psycopg2) a partir da configuração da aplicação"""
+    return (
+        f"postgresql://{app_config.AGRICULTURE_DB_USER}:{app_config.AGRICULTURE_DB_PASSWORD}"
+        f"@{app_config.AGRICULTURE_DB_HOST}:{app_config.AGRICULTURE_DB_PORT}/{app_config.AGRICULTURE_DB_DATABASE}"
+    )
+
+
+def run_migrations_offline() -> None:
+    """Gera o SQL das migrações sem conectar ao banco (alembic upgrade --sql)"""
+    context.configure(
+        url=get_database_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Aplica as migrações conectado ao banco"""
+    connect_args = {}
+    if app_config.ENVIRONMENT != "test":
+        connect_args["sslmode"] = "require"
+
+    engine = create_engine(get_database_url(), connect_args=connect_args)
+
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+    engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,69 @@
+"""Schema inicial: produtor, fazenda e safra
+
+Bancos criados antes pelo scripts/setup_db.py já possuem as tabelas;
+nesse caso a criação é pulada e a migração apenas passa a controlar o schema.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _tabela_existe(nome: str) -> bool:
+    # Em modo offline (--sql) não há conexão para inspecionar: gera o DDL completo
+    if op.get_context().as_sql:
+        return False
+    return sa.inspect(op.get_bind()).has_table(nome)
+
+
+def upgrade() -> None:
+    if not _tabela_existe("produtor"):
+        op.create_table(
+            "produtor",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("cpf", sa.String(length=20), nullable=False),
+            sa.Column("nomeprodutor", sa.String(length=100), nullable=False),
+            sa.UniqueConstraint("cpf", name="produtor_cpf_key"),
+        )
+
+    if not _tabela_existe("fazenda"):
+        op.create_table(
+            "fazenda",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("nomefazenda", sa.String(length=100), nullable=False),
+            sa.Column("cidade", sa.String(length=100), nullable=False),
+            sa.Column("estado", sa.String(length=100), nullable=False),
+            sa.Column("areatotalfazenda", sa.Float(), nullable=False),
+            sa.Column("areaagricutavel", sa.Float(), nullable=False),
+            sa.Column(
+                "idprodutor", sa.Integer(), sa.ForeignKey("produtor.id"), nullable=True
+            ),
+        )
+
+    if not _tabela_existe("safra"):
+        op.create_table(
+            "safra",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("ano", sa.Integer(), nullable=False),
+            sa.Column("cultura", sa.String(length=100), nullable=False),
+            sa.Column(
+                "idfazenda", sa.Integer(), sa.ForeignKey("fazenda.id"), nullable=True
+            ),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("safra")
+    op.drop_table("fazenda")
+    op.drop_table("produtor")
@@ -0,0 +1,58 @@
+"""Índices para os predicados usados pelo repositório
+
+Criados com CREATE INDEX CONCURRENTLY (fora de transação) para não bloquear
+escritas em produção. IF NOT EXISTS cobre bancos que já receberam os índices
+de filtro pelo antigo scripts/setup_db.py.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:01
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (nome, tabela, colunas)
+INDICES = [
+    # Cascatas, completo e filtros por relacionamento
+    ("ix_fazenda_idprodutor", "fazenda", ["idprodutor"]),
+    ("ix_safra_idfazenda", "safra", ["idfazenda"]),
+    # Filtros das listagens e estatísticas do dashboard
+    ("ix_fazenda_estado", "fazenda", ["estado"]),
+    ("ix_fazenda_cidade", "fazenda", ["cidade"]),
+    ("ix_safra_ano", "safra", ["ano"]),
+    ("ix_safra_cultura", "safra", ["cultura"]),
+    # get_fazenda_by_nome_and_produtor
+    ("ix_fazenda_nomefazenda_idprodutor", "fazenda", ["nomefazenda", "idprodutor"]),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for nome, tabela, colunas in INDICES:
+            op.create_index(
+                nome,
+                tabela,
+                colunas,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for nome, tabela, _ in reversed(INDICES):
+            op.drop_index(
+                nome,
+                table_name=tabela,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
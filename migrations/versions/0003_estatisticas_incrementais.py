@@ -0,0 +1,243 @@
+"""Tabelas de agregados mantidas incrementalmente por triggers
+
+estatistica_estado (quantidade e somas de área por estado), estatistica_cultura
+e estatistica_ano guardam as estatísticas do dashboard. Triggers por comando
+(FOR EACH STATEMENT com tabelas de transição) aplicam o delta de cada INSERT,
+UPDATE ou DELETE em fazenda/safra na mesma transação, inclusive para escritas em
+lote (DELETE em cascata, INSERT multi-linha, COPY). Grupos que chegam a zero são
+removidos, reproduzindo o resultado de um GROUP BY sobre as tabelas base.
+Um TRUNCATE (direto ou em CASCADE a partir de produtor) apaga os agregados da tabela.
+
+Escritas concorrentes no mesmo estado/cultura/ano esperam umas pelas outras na
+linha do agregado até o commit. Para que escritas em lote que mexem em vários
+grupos não entrem em deadlock, cada agregado é atualizado num único upsert com as
+linhas ordenadas pela chave, e grupos cujo delta é zero não são tocados.
+
+As áreas são NUMERIC para que somar e subtrair o mesmo valor se anule exatamente.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:02
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Linhas da tabela de transição com sinal: +1 para as novas, -1 para as antigas
+# (no UPDATE, as duas). Montada por TG_OP porque só existem as tabelas declaradas no trigger.
+LINHAS_ALTERADAS = """
+    CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT 1 AS sinal, * FROM novas'
+        WHEN 'DELETE' THEN 'SELECT -1 AS sinal, * FROM antigas'
+        ELSE 'SELECT -1 AS sinal, * FROM antigas UNION ALL SELECT 1, * FROM novas'
+    END
+"""
+
+# Cada agregado é atualizado num único upsert, com as linhas na ordem da chave:
+# todas as transações bloqueiam as linhas de estatistica_* na mesma ordem (sem
+# deadlock entre escritas em lote concorrentes) e grupos com delta zero (ex.: troca
+# do nome da fazenda) nem chegam a ser bloqueados.
+FUNCAO_FAZENDA = f"""
+CREATE OR REPLACE FUNCTION atualizar_estatistica_estado() RETURNS trigger AS $$
+DECLARE
+    zerados text[];
+BEGIN
+    -- TRUNCATE não tem tabelas de transição: a tabela ficou vazia, e os agregados também
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM estatistica_estado;
+        RETURN NULL;
+    END IF;
+
+    EXECUTE format($sql$
+        WITH gravadas AS (
+            INSERT INTO estatistica_estado AS e (estado, quantidade, area_total, area_agricultavel)
+            SELECT estado, sum(sinal), sum(sinal * areatotalfazenda::numeric),
+                   sum(sinal * areaagricutavel::numeric)
+            FROM (%s) AS linhas
+            GROUP BY estado
+            HAVING sum(sinal) <> 0
+                OR sum(sinal * areatotalfazenda::numeric) <> 0
+                OR sum(sinal * areaagricutavel::numeric) <> 0
+            ORDER BY estado
+            ON CONFLICT (estado) DO UPDATE SET
+                quantidade = e.quantidade + EXCLUDED.quantidade,
+                area_total = e.area_total + EXCLUDED.area_total,
+                area_agricultavel = e.area_agricultavel + EXCLUDED.area_agricultavel
+            RETURNING estado, quantidade
+        )
+        SELECT array_agg(estado) FROM gravadas WHERE quantidade <= 0
+    $sql$, {LINHAS_ALTERADAS}) INTO zerados;
+
+    -- Grupos que chegaram a zero (linhas já bloqueadas por esta transação)
+    DELETE FROM estatistica_estado WHERE estado = ANY(zerados) AND quantidade <= 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+FUNCAO_SAFRA = f"""
+CREATE OR REPLACE FUNCTION atualizar_estatisticas_safra() RETURNS trigger AS $$
+DECLARE
+    linhas text := {LINHAS_ALTERADAS};
+    culturas_zeradas text[];
+    anos_zerados integer[];
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM estatistica_cultura;
+        DELETE FROM estatistica_ano;
+        RETURN NULL;
+    END IF;
+
+    -- Sempre cultura antes de ano, cada um na ordem da chave
+    EXECUTE format($sql$
+        WITH gravadas AS (
+            INSERT INTO estatistica_cultura AS c (cultura, quantidade)
+            SELECT cultura, sum(sinal) FROM (%s) AS linhas
+            GROUP BY cultura HAVING sum(sinal) <> 0
+            ORDER BY cultura
+            ON CONFLICT (cultura) DO UPDATE SET quantidade = c.quantidade + EXCLUDED.quantidade
+            RETURNING cultura, quantidade
+        )
+        SELECT array_agg(cultura) FROM gravadas WHERE quantidade <= 0
+    $sql$, linhas) INTO culturas_zeradas;
+
+    EXECUTE format($sql$
+        WITH gravadas AS (
+            INSERT INTO estatistica_ano AS a (ano, quantidade)
+            SELECT ano, sum(sinal) FROM (%s) AS linhas
+            GROUP BY ano HAVING sum(sinal) <> 0
+            ORDER BY ano
+            ON CONFLICT (ano) DO UPDATE SET quantidade = a.quantidade + EXCLUDED.quantidade
+            RETURNING ano, quantidade
+        )
+        SELECT array_agg(ano) FROM gravadas WHERE quantidade <= 0
+    $sql$, linhas) INTO anos_zerados;
+
+    DELETE FROM estatistica_cultura WHERE cultura = ANY(culturas_zeradas) AND quantidade <= 0;
+    DELETE FROM estatistica_ano WHERE ano = ANY(anos_zerados) AND quantidade <= 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Tabelas de transição só podem ser usadas por triggers de um único evento.
+# TRUNCATE (inclusive o CASCADE a partir de produtor ou fazenda) zera os agregados
+TRIGGERS = [
+    (
+        "fazenda",
+        "atualizar_estatistica_estado",
+        "INSERT",
+        "REFERENCING NEW TABLE AS novas",
+    ),
+    (
+        "fazenda",
+        "atualizar_estatistica_estado",
+        "UPDATE",
+        "REFERENCING OLD TABLE AS antigas NEW TABLE AS novas",
+    ),
+    (
+        "fazenda",
+        "atualizar_estatistica_estado",
+        "DELETE",
+        "REFERENCING OLD TABLE AS antigas",
+    ),
+    ("fazenda", "atualizar_estatistica_estado", "TRUNCATE", ""),
+    (
+        "safra",
+        "atualizar_estatisticas_safra",
+        "INSERT",
+        "REFERENCING NEW TABLE AS novas",
+    ),
+    (
+        "safra",
+        "atualizar_estatisticas_safra",
+        "UPDATE",
+        "REFERENCING OLD TABLE AS antigas NEW TABLE AS novas",
+    ),
+    (
+        "safra",
+        "atualizar_estatisticas_safra",
+        "DELETE",
+        "REFERENCING OLD TABLE AS antigas",
+    ),
+    ("safra", "atualizar_estatisticas_safra", "TRUNCATE", ""),
+]
+
+
+def _nome_trigger(tabela: str, evento: str) -> str:
+    return f"tg_{tabela}_estatisticas_{evento.lower()}"
+
+
+def upgrade() -> None:
+    op.create_table(
+        "estatistica_estado",
+        sa.Column("estado", sa.String(length=100), primary_key=True),
+        sa.Column("quantidade", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("area_total", sa.Numeric(), nullable=False, server_default="0"),
+        sa.Column(
+            "area_agricultavel", sa.Numeric(), nullable=False, server_default="0"
+        ),
+    )
+    op.create_table(
+        "estatistica_cultura",
+        sa.Column("cultura", sa.String(length=100), primary_key=True),
+        sa.Column("quantidade", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_table(
+        "estatistica_ano",
+        sa.Column("ano", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("quantidade", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+    op.execute(FUNCAO_FAZENDA)
+    op.execute(FUNCAO_SAFRA)
+
+    # Bloqueia escritas até os triggers existirem e a carga inicial terminar
+    op.execute("LOCK TABLE fazenda, safra IN SHARE ROW EXCLUSIVE MODE")
+
+    for tabela, funcao, evento, referencias in TRIGGERS:
+        op.execute(
+            f"CREATE TRIGGER {_nome_trigger(tabela, evento)} AFTER {evento} ON {tabela} "
+            f"{referencias} FOR EACH STATEMENT EXECUTE FUNCTION {funcao}()"
+        )
+
+    op.execute(
+        """
+        INSERT INTO estatistica_estado (estado, quantidade, area_total, area_agricultavel)
+        SELECT estado, count(*), sum(areatotalfazenda::numeric), sum(areaagricutavel::numeric)
+        FROM fazenda GROUP BY estado
+    """
+    )
+    op.execute(
+        """
+        INSERT INTO estatistica_cultura (cultura, quantidade)
+        SELECT cultura, count(*) FROM safra GROUP BY cultura
+    """
+    )
+    op.execute(
+        """
+        INSERT INTO estatistica_ano (ano, quantidade)
+        SELECT ano, count(*) FROM safra GROUP BY ano
+    """
+    )
+
+
+def downgrade() -> None:
+    for tabela, _, evento, _ in TRIGGERS:
+        op.execute(
+            f"DROP TRIGGER IF EXISTS {_nome_trigger(tabela, evento)} ON {tabela}"
+        )
+    op.execute("DROP FUNCTION IF EXISTS atualizar_estatisticas_safra()")
+    op.execute("DROP FUNCTION IF EXISTS atualizar_estatistica_estado()")
+    op.drop_table("estatistica_ano")
+    op.drop_table("estatistica_cultura")
+    op.drop_table("estatistica_estado")
@@ -0,0 +1,96 @@
+"""Chaves naturais únicas: produtor.cpf e (fazenda.idprodutor, fazenda.nomefazenda)
+
+São os alvos dos INSERT ... ON CONFLICT do repositório, que substituem o SELECT
+prévio de duplicidade. Os índices únicos são criados com CONCURRENTLY (fora de
+transação); IF NOT EXISTS cobre bancos criados pela 0001, que já têm a constraint
+produtor_cpf_key. O índice único de fazenda começa por idprodutor e substitui o
+antigo ix_fazenda_nomefazenda_idprodutor.
+
+Duplicatas existentes impedem a criação dos índices: a migração as lista e para,
+para que sejam resolvidas manualmente.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:03
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (nome, tabela, colunas)
+INDICES_UNICOS = [
+    ("produtor_cpf_key", "produtor", ["cpf"]),
+    ("uq_fazenda_idprodutor_nomefazenda", "fazenda", ["idprodutor", "nomefazenda"]),
+]
+
+
+def _verificar_duplicatas(tabela: str, colunas: list) -> None:
+    # Em modo offline (--sql) não há conexão para consultar
+    if op.get_context().as_sql:
+        return
+    lista = ", ".join(colunas)
+    duplicatas = (
+        op.get_bind()
+        .execute(
+            sa.text(
+                f"SELECT {lista}, count(*) FROM {tabela} "
+                f"WHERE {' AND '.join(f'{coluna} IS NOT NULL' for coluna in colunas)} "
+                f"GROUP BY {lista} HAVING count(*) > 1 LIMIT 20"
+            )
+        )
+        .all()
+    )
+    if duplicatas:
+        raise RuntimeError(
+            f"Registros duplicados em {tabela} ({lista}) impedem o índice único: "
+            + "; ".join(str(tuple(linha)) for linha in duplicatas)
+        )
+
+
+def upgrade() -> None:
+    for _, tabela, colunas in INDICES_UNICOS:
+        _verificar_duplicatas(tabela, colunas)
+
+    with op.get_context().autocommit_block():
+        for nome, tabela, colunas in INDICES_UNICOS:
+            op.create_index(
+                nome,
+                tabela,
+                colunas,
+                unique=True,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        op.drop_index(
+            "ix_fazenda_nomefazenda_idprodutor",
+            table_name="fazenda",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_fazenda_nomefazenda_idprodutor",
+            "fazenda",
+            ["nomefazenda", "idprodutor"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            "uq_fazenda_idprodutor_nomefazenda",
+            table_name="fazenda",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    # produtor_cpf_key pode ser a constraint da 0001: permanece
@@ -0,0 +1,152 @@
+"""CPF numérico: produtor.cpf_numerico (BIGINT) com índice único
+
+Coluna gerada pelo banco a partir de produtor.cpf (só os dígitos, como inteiro),
+então continua coerente com inserções e atualizações sem depender da aplicação.
+O índice único uq_produtor_cpf_numerico passa a ser a chave natural do produtor
+(alvo dos ON CONFLICT) e substitui produtor_cpf_key, sobre o texto formatado.
+
+CPFs sem 11 dígitos ou que só diferem na máscara impedem a migração: ela os
+lista e para, para que sejam corrigidos manualmente. Depois, a CHECK
+ck_produtor_cpf_digitos recusa no banco CPFs sem 11 dígitos, inclusive os
+gravados fora da aplicação; sem ela um CPF sem dígitos teria cpf_numerico NULL,
+escapando do índice único.
+
+Adicionar a coluna gerada (persisted) reescreve a tabela produtor sob bloqueio
+ACCESS EXCLUSIVE: leituras e escritas em produtor esperam até o fim da
+reescrita, que é proporcional ao tamanho da tabela. Em bases grandes, rode a
+migração numa janela de manutenção. O lock_timeout faz a migração falhar (para
+ser repetida) em vez de ficar na fila atrás de transações longas, bloqueando
+todas as requisições que chegarem depois dela. CPFs cujos dígitos
+verificadores não conferem não impedem a migração (a aplicação só os confere com
+CPF_VALIDAR_DIGITOS), mas são relatados num aviso, para que sejam corrigidos
+antes de ligar a conferência.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:04
+
+"""
+
+import logging
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+CPF_NUMERICO = "regexp_replace(cpf, '[^0-9]', '', 'g')"
+# NULLIF: sem a CHECK (validada só no fim da migração) um CPF sem dígitos não
+# pode derrubar o cast, nem agora nem em escritas concorrentes
+CPF_NUMERICO_BIGINT = f"NULLIF({CPF_NUMERICO}, '')::bigint"
+LOCK_TIMEOUT = "10s"
+
+# Dígito verificador calculado sobre os primeiros n dígitos de "digitos" (pesos n+1 .. 2)
+DV = (
+    "(SELECT sum(substr(digitos, i, 1)::int * ({n} + 2 - i)) "
+    "FROM generate_series(1, {n}) AS i) * 10 % 11 % 10"
+)
+DIGITOS_NAO_CONFEREM = f"""
+    SELECT id, cpf, count(*) OVER () AS total
+    FROM (SELECT id, cpf, {CPF_NUMERICO} AS digitos FROM produtor) AS p
+    WHERE digitos ~ '^(\\d)\\1{{10}}$'
+       OR substr(digitos, 10, 1)::int <> {DV.format(n=9)}
+       OR substr(digitos, 11, 1)::int <> {DV.format(n=10)}
+    ORDER BY id
+    LIMIT 20
+"""
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+def _verificar_cpfs() -> None:
+    # Em modo offline (--sql) não há conexão para consultar
+    if op.get_context().as_sql:
+        return
+    conexao = op.get_bind()
+    invalidos = conexao.execute(
+        sa.text(
+            f"SELECT id, cpf FROM produtor WHERE length({CPF_NUMERICO}) <> 11 LIMIT 20"
+        )
+    ).all()
+    if invalidos:
+        raise RuntimeError(
+            "CPFs sem 11 dígitos impedem a coluna cpf_numerico: "
+            + "; ".join(str(tuple(linha)) for linha in invalidos)
+        )
+    duplicatas = conexao.execute(
+        sa.text(
+            f"SELECT {CPF_NUMERICO}, array_agg(id) FROM produtor "
+            f"GROUP BY 1 HAVING count(*) > 1 LIMIT 20"
+        )
+    ).all()
+    if duplicatas:
+        raise RuntimeError(
+            "CPFs repetidos (com máscaras diferentes) impedem o índice único de cpf_numerico: "
+            + "; ".join(str(tuple(linha)) for linha in duplicatas)
+        )
+    nao_conferem = conexao.execute(sa.text(DIGITOS_NAO_CONFEREM)).all()
+    if nao_conferem:
+        logger.warning(
+            f"{nao_conferem[0].total} CPFs com dígitos verificadores que não conferem; "
+            "corrija-os antes de ligar CPF_VALIDAR_DIGITOS: "
+            + "; ".join(str((linha.id, linha.cpf)) for linha in nao_conferem)
+        )
+
+
+def upgrade() -> None:
+    _verificar_cpfs()
+    # Reescrita da tabela sob ACCESS EXCLUSIVE (ver docstring)
+    op.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+    op.add_column(
+        "produtor",
+        sa.Column(
+            "cpf_numerico",
+            sa.BigInteger(),
+            sa.Computed(CPF_NUMERICO_BIGINT, persisted=True),
+        ),
+    )
+
+    with op.get_context().autocommit_block():
+        # NOT VALID e VALIDATE em transações separadas: a varredura do VALIDATE
+        # só pede SHARE UPDATE EXCLUSIVE, que não bloqueia leituras nem escritas
+        op.execute(
+            f"ALTER TABLE produtor ADD CONSTRAINT ck_produtor_cpf_digitos "
+            f"CHECK (length({CPF_NUMERICO}) = 11) NOT VALID"
+        )
+        op.execute("ALTER TABLE produtor VALIDATE CONSTRAINT ck_produtor_cpf_digitos")
+        op.create_index(
+            "uq_produtor_cpf_numerico",
+            "produtor",
+            ["cpf_numerico"],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        # produtor_cpf_key é constraint nos bancos criados pela 0001 e índice nos demais
+        op.execute("ALTER TABLE produtor DROP CONSTRAINT IF EXISTS produtor_cpf_key")
+        op.drop_index(
+            "produtor_cpf_key",
+            table_name="produtor",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "produtor_cpf_key",
+            "produtor",
+            ["cpf"],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+    op.drop_index("uq_produtor_cpf_numerico", table_name="produtor", if_exists=True)
+    op.execute("ALTER TABLE produtor DROP CONSTRAINT IF EXISTS ck_produtor_cpf_digitos")
+    op.drop_column("produtor", "cpf_numerico")
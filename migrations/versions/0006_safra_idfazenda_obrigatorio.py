@@ -0,0 +1,81 @@
+"""safra.idfazenda obrigatório e remoção dos índices redundantes das chaves primárias
+
+O model Safra sempre exigiu idfazenda, mas a 0001 (e o antigo setup_db.py)
+criavam a coluna aceitando NULL. O NOT NULL é aplicado sem varrer a tabela sob
+bloqueio exclusivo: uma CHECK NOT VALID é validada antes, em transação própria
+(só SHARE UPDATE EXCLUSIVE), e o SET NOT NULL aproveita a validação.
+
+Índices ix_<tabela>_id, criados por bancos gerados com SQLModel.metadata.create_all,
+duplicam o índice da chave primária e são removidos; os models não os declaram mais.
+
+Safras sem fazenda impedem a migração: ela as lista e para, para que sejam
+corrigidas manualmente.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:05
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDICES_REDUNDANTES = [
+    ("ix_produtor_id", "produtor"),
+    ("ix_fazenda_id", "fazenda"),
+    ("ix_safra_id", "safra"),
+]
+
+
+def _verificar_safras_sem_fazenda() -> None:
+    # Em modo offline (--sql) não há conexão para consultar
+    if op.get_context().as_sql:
+        return
+    sem_fazenda = (
+        op.get_bind()
+        .execute(sa.text("SELECT id FROM safra WHERE idfazenda IS NULL LIMIT 20"))
+        .scalars()
+        .all()
+    )
+    if sem_fazenda:
+        raise RuntimeError(
+            "Safras sem fazenda impedem o NOT NULL de safra.idfazenda: "
+            + ", ".join(str(safra_id) for safra_id in sem_fazenda)
+        )
+
+
+def upgrade() -> None:
+    _verificar_safras_sem_fazenda()
+
+    # Cada passo em sua própria transação: o bloqueio exclusivo do ADD CONSTRAINT
+    # não pode ficar retido durante a varredura do VALIDATE
+    with op.get_context().autocommit_block():
+        op.execute(
+            "ALTER TABLE safra ADD CONSTRAINT ck_safra_idfazenda_not_null "
+            "CHECK (idfazenda IS NOT NULL) NOT VALID"
+        )
+        op.execute("ALTER TABLE safra VALIDATE CONSTRAINT ck_safra_idfazenda_not_null")
+        op.alter_column(
+            "safra", "idfazenda", existing_type=sa.Integer(), nullable=False
+        )
+        op.drop_constraint("ck_safra_idfazenda_not_null", "safra", type_="check")
+
+        for nome, tabela in INDICES_REDUNDANTES:
+            op.drop_index(
+                nome,
+                table_name=tabela,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+
+
+def downgrade() -> None:
+    op.alter_column("safra", "idfazenda", existing_type=sa.Integer(), nullable=True)
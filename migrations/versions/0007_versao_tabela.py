@@ -0,0 +1,84 @@
+"""Versões das tabelas no banco (ETags): versao_tabela
+
+Cada linha guarda a versão de uma tabela (produtor, fazenda, safra), usada nas
+ETags dos GETs condicionais. Triggers trocam a versão no commit de toda
+transação que altera a tabela, inclusive escritas fora da aplicação (COPY,
+psql). Assim todos os workers enxergam a mesma versão, sem depender do cache.
+
+Os triggers por linha são CONSTRAINT TRIGGER DEFERRABLE INITIALLY DEFERRED:
+rodam no commit, e só o primeiro de cada tabela na transação atualiza a linha
+de versao_tabela. O bloqueio dessa linha dura só o commit, e não a requisição
+inteira, então escritas concorrentes na mesma tabela quase não esperam umas
+pelas outras. As versões vêm de uma sequência e nunca se repetem.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 00:00:06
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABELAS = ["produtor", "fazenda", "safra"]
+
+# A configuração local (set_config(..., true)) marca a tabela já trocada na
+# transação; ela volta ao valor anterior no fim da transação
+FUNCAO = """
+CREATE OR REPLACE FUNCTION trocar_versao_tabela() RETURNS trigger AS $$
+BEGIN
+    IF current_setting('versao_tabela.' || TG_TABLE_NAME, true) = 'trocada' THEN
+        RETURN NULL;
+    END IF;
+    PERFORM set_config('versao_tabela.' || TG_TABLE_NAME, 'trocada', true);
+    INSERT INTO versao_tabela AS v (tabela, versao)
+    VALUES (TG_TABLE_NAME, nextval('versao_tabela_seq'))
+    ON CONFLICT (tabela) DO UPDATE SET versao = excluded.versao;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    op.execute("CREATE SEQUENCE versao_tabela_seq")
+    op.create_table(
+        "versao_tabela",
+        sa.Column("tabela", sa.String(length=63), primary_key=True),
+        sa.Column("versao", sa.BigInteger(), nullable=False),
+    )
+    op.execute(FUNCAO)
+
+    for tabela in TABELAS:
+        op.execute(
+            f"INSERT INTO versao_tabela (tabela, versao) "
+            f"VALUES ('{tabela}', nextval('versao_tabela_seq'))"
+        )
+        op.execute(
+            f"CREATE CONSTRAINT TRIGGER trg_{tabela}_versao "
+            f"AFTER INSERT OR UPDATE OR DELETE ON {tabela} "
+            f"DEFERRABLE INITIALLY DEFERRED "
+            f"FOR EACH ROW EXECUTE FUNCTION trocar_versao_tabela()"
+        )
+        # TRUNCATE não dispara triggers por linha
+        op.execute(
+            f"CREATE TRIGGER trg_{tabela}_versao_truncate AFTER TRUNCATE ON {tabela} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION trocar_versao_tabela()"
+        )
+
+
+def downgrade() -> None:
+    for tabela in TABELAS:
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{tabela}_versao_truncate ON {tabela}")
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{tabela}_versao ON {tabela}")
+    op.execute("DROP FUNCTION IF EXISTS trocar_versao_tabela()")
+    op.drop_table("versao_tabela")
+    op.execute("DROP SEQUENCE IF EXISTS versao_tabela_seq")
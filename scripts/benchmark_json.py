@@ -0,0 +1,101 @@
+"""
+Benchmark da serialização das listagens (GET /fazendas) com 10k linhas.
+
+Compara o caminho antigo (entidades ORM -> from_orm -> revalidação do response_model
+pelo FastAPI -> JSONResponse) com o caminho rápido (linhas de colunas -> TypeAdapter
+validando uma única vez -> dump_json direto para bytes).
+
+Uso: python -m scripts.benchmark_json [--linhas 10000] [--repeticoes 5]
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import create_engine
+from sqlmodel import Session, SQLModel, select
+
+from app.brain_agriculture.models.brain_agriculture import Fazenda as FazendaModel
+from app.brain_agriculture.schemas.brain_agriculture import Fazenda, ListaFazendas
+
+logger = logging.getLogger(__name__)
+
+
+def _popular(engine, linhas: int) -> None:
+    """
+    Cria a tabela de fazendas num SQLite em memória e insere as fazendas. A de produtores
+    fica de fora (cpf_numerico é gerado com regexp_replace, do PostgreSQL) e o SQLite não
+    exige a chave estrangeira
+    """
+    SQLModel.metadata.create_all(engine, tables=[FazendaModel.__table__])
+    with Session(engine) as session:
+        session.add_all(
+            FazendaModel(
+                nomefazenda=f"Fazenda {i}",
+                cidade="Recife",
+                estado="PE",
+                areatotalfazenda=100.0 + i,
+                areaagricutavel=80.0 + i,
+                idprodutor=1,
+            )
+            for i in range(linhas)
+        )
+        session.commit()
+
+
+async def _caminho_antigo(engine) -> bytes:
+    with Session(engine) as session:
+        fazendas = session.exec(select(FazendaModel)).all()
+        itens = [Fazenda.from_orm(fazenda) for fazenda in fazendas]
+    campo = create_response_field(name="Response_get_all_fazendas", type_=List[Fazenda])
+    conteudo = await serialize_response(field=campo, response_content=itens)
+    return JSONResponse(conteudo).body
+
+
+async def _caminho_rapido(engine) -> bytes:
+    with Session(engine) as session:
+        linhas = session.exec(select(*FazendaModel.__table__.columns)).all()
+    itens = ListaFazendas.validate_python(linhas, from_attributes=True)
+    return ListaFazendas.dump_json(itens)
+
+
+async def _medir(funcao, engine, repeticoes: int) -> float:
+    """Melhor tempo (s) entre as repetições, após um aquecimento"""
+    await funcao(engine)
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        await funcao(engine)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+async def main(linhas: int, repeticoes: int) -> None:
+    engine = create_engine("sqlite://")
+    _popular(engine, linhas)
+
+    antigo = await _medir(_caminho_antigo, engine, repeticoes)
+    rapido = await _medir(_caminho_rapido, engine, repeticoes)
+
+    logger.info(f"{linhas} linhas, melhor de {repeticoes} execuções")
+    logger.info(
+        f"Caminho antigo (ORM + revalidação + json.dumps): {antigo * 1000:.1f} ms"
+    )
+    logger.info(
+        f"Caminho rápido (linhas + TypeAdapter.dump_json): {rapido * 1000:.1f} ms"
+    )
+    logger.info(f"Speed-up: {antigo / rapido:.1f}x")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--linhas", type=int, default=10_000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.linhas, args.repeticoes))
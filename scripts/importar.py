@@ -0,0 +1,74 @@
+"""
+Importa fazendas ou safras de um arquivo CSV/NDJSON direto no banco (COPY em blocos).
+
+O arquivo é lido em pedaços, validado com as mesmas regras da API (FazendaCreate/SafraCreate)
+e as linhas rejeitadas são relatadas sem interromper a carga.
+
+Uso: python -m scripts.importar {fazendas,safras} ARQUIVO [--formato csv|ndjson]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+from app.core.container import Container
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_LEITURA = 64 * 1024
+
+
+async def ler_em_blocos(caminho: str, tamanho: int = TAMANHO_LEITURA):
+    """Lê o arquivo em pedaços sem bloquear o event loop"""
+    with open(caminho, "rb") as arquivo:
+        while bloco := await asyncio.to_thread(arquivo.read, tamanho):
+            yield bloco
+
+
+async def main(entidade: str, caminho: str, formato: str) -> bool:
+    container = Container()
+    await container.init_resources()
+    try:
+        service = await container.brain_agriculture_service()
+        importar = (
+            service.importar_fazendas
+            if entidade == "fazendas"
+            else service.importar_safras
+        )
+        resultado = await importar(ler_em_blocos(caminho), formato)
+    finally:
+        await container.shutdown_resources()
+
+    logger.info(resultado.message)
+    logger.info(
+        f"Lidas: {resultado.total} | gravadas: {resultado.inseridos} | rejeitadas: {resultado.rejeitados}"
+    )
+    for erro in resultado.erros:
+        logger.warning(f"Linha {erro.linha}: {erro.motivo}")
+    if resultado.rejeitados > len(resultado.erros):
+        logger.warning(
+            f"... e mais {resultado.rejeitados - len(resultado.erros)} linhas rejeitadas"
+        )
+    return resultado.success
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("entidade", choices=["fazendas", "safras"])
+    parser.add_argument("arquivo")
+    parser.add_argument(
+        "--formato",
+        choices=["csv", "ndjson"],
+        help="Padrão: deduzido da extensão do arquivo",
+    )
+    args = parser.parse_args()
+
+    formato = args.formato or (
+        "ndjson"
+        if os.path.splitext(args.arquivo)[1].lower() in (".ndjson", ".jsonl")
+        else "csv"
+    )
+    sys.exit(0 if asyncio.run(main(args.entidade, args.arquivo, formato)) else 1)
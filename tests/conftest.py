@@ -6,8 +6,9 @@ from sqlalchemy.pool import StaticPool
 
 from app.core.container import Container
 from app.brain_agriculture.models.brain_agriculture import Produtor, Fazenda, Safra
-from app.brain_agriculture.repositories.brain_agriculture import Brain_AgricultureRepository
+from app.brain_agriculture.repositories.brain_agriculture import AsyncBrain_AgricultureRepository
 from app.brain_agriculture.services.brain_agriculture import Brain_AgricultureService
+from app.shared.helpers.cpf import normalizar_cpfs
 
 
 @pytest.fixture(scope="session")
@@ -36,8 +37,8 @@ def mock_db():
 
 @pytest.fixture
 def brain_agriculture_repository(mock_db):
-    """Repositório com banco mockado"""
-    return Brain_AgricultureRepository(mock_db)
+    """Repositório assíncrono com banco mockado"""
+    return AsyncBrain_AgricultureRepository(mock_db)
 
 
 @pytest.fixture
@@ -109,36 +110,70 @@ def sample_safra(sample_safra_data) -> Safra:
 @pytest.fixture
 def mock_repository_methods(brain_agriculture_repository):
     """Mock dos métodos do repositório"""
-    brain_agriculture_repository.get_all_produtores = Mock(return_value=[])
-    brain_agriculture_repository.get_produtor_by_id = Mock(return_value=None)
-    brain_agriculture_repository.get_produtor_by_cpf = Mock(return_value=None)
-    brain_agriculture_repository.create_produtor = Mock()
-    brain_agriculture_repository.update_produtor = Mock()
-    brain_agriculture_repository.delete_produtor = Mock(return_value=True)
+    brain_agriculture_repository.get_all_produtores = AsyncMock(return_value=[])
+    brain_agriculture_repository.get_produtores_by_ids = AsyncMock(return_value=[])
+    brain_agriculture_repository.get_produtor_by_id = AsyncMock(return_value=None)
+    brain_agriculture_repository.get_produtor_by_cpf = AsyncMock(return_value=None)
+    brain_agriculture_repository.get_produtor_completo = AsyncMock(return_value=None)
+    brain_agriculture_repository.get_produtores_resumidos = AsyncMock(return_value=[])
+    brain_agriculture_repository.create_produtor = AsyncMock()
+    brain_agriculture_repository.upsert_produtores = AsyncMock(side_effect=lambda linhas, atualizar=False: [
+        Mock(id=registro_id, cpf_numerico=normalizar_cpfs([linha["cpf"]])[0], criado=True)
+        for registro_id, linha in enumerate(linhas, start=1)
+    ])
+    brain_agriculture_repository.update_produtor = AsyncMock(return_value=None)
+    brain_agriculture_repository.delete_produtor = AsyncMock(return_value=True)
+    brain_agriculture_repository.delete_produtor_cascade = AsyncMock(return_value={"fazendas_excluidas": 0, "safras_excluidas": 0})
     
-    brain_agriculture_repository.get_all_fazendas = Mock(return_value=[])
-    brain_agriculture_repository.get_fazenda_by_id = Mock(return_value=None)
-    brain_agriculture_repository.get_fazendas_by_produtor = Mock(return_value=[])
-    brain_agriculture_repository.create_fazenda = Mock()
-    brain_agriculture_repository.update_fazenda = Mock()
-    brain_agriculture_repository.delete_fazenda = Mock(return_value=True)
+    brain_agriculture_repository.get_all_fazendas = AsyncMock(return_value=[])
+    brain_agriculture_repository.get_fazendas_by_ids = AsyncMock(return_value=[])
+    brain_agriculture_repository.get_fazenda_by_id = AsyncMock(return_value=None)
+    brain_agriculture_repository.get_fazendas_by_produtor = AsyncMock(return_value=[])
+    brain_agriculture_repository.get_fazenda_completa = AsyncMock(return_value=None)
+    brain_agriculture_repository.get_fazendas_resumidas = AsyncMock(return_value=[])
+    brain_agriculture_repository.create_fazenda = AsyncMock()
+    brain_agriculture_repository.get_fazendas_ids_existentes = AsyncMock(return_value=set())
+    brain_agriculture_repository.create_fazendas_lote = AsyncMock(side_effect=lambda linhas: list(range(1, len(linhas) + 1)))
+    brain_agriculture_repository.update_fazenda = AsyncMock(return_value=None)
+    brain_agriculture_repository.vincular_fazenda_produtor = AsyncMock(return_value=None)
+    brain_agriculture_repository.delete_fazenda = AsyncMock(return_value=True)
+    brain_agriculture_repository.delete_fazenda_cascade = AsyncMock(return_value={"safras_excluidas": 0})
     
-    brain_agriculture_repository.get_all_safras = Mock(return_value=[])
-    brain_agriculture_repository.get_safra_by_id = Mock(return_value=None)
-    brain_agriculture_repository.get_safras_by_fazenda = Mock(return_value=[])
-    brain_agriculture_repository.get_safras_by_ano = Mock(return_value=[])
-    brain_agriculture_repository.create_safra = Mock()
-    brain_agriculture_repository.update_safra = Mock()
-    brain_agriculture_repository.delete_safra = Mock(return_value=True)
+    brain_agriculture_repository.get_all_safras = AsyncMock(return_value=[])
+    brain_agriculture_repository.get_safras_by_ids = AsyncMock(return_value=[])
+    brain_agriculture_repository.get_safra_by_id = AsyncMock(return_value=None)
+    brain_agriculture_repository.get_safras_by_fazenda = AsyncMock(return_value=[])
+    brain_agriculture_repository.get_safras_by_ano = AsyncMock(return_value=[])
+    brain_agriculture_repository.create_safra = AsyncMock()
+    brain_agriculture_repository.create_safras_lote = AsyncMock(side_effect=lambda linhas: list(range(1, len(linhas) + 1)))
+    brain_agriculture_repository.update_safra = AsyncMock(return_value=None)
+    brain_agriculture_repository.delete_safra = AsyncMock(return_value=True)
     
-    brain_agriculture_repository.get_total_fazendas = Mock(return_value=0)
-    brain_agriculture_repository.get_fazendas_por_estado = Mock(return_value=[])
-    brain_agriculture_repository.get_estatisticas_areas = Mock(return_value={
+    brain_agriculture_repository.create_dados_completos = AsyncMock(return_value={
+        "produtor_id": 1,
+        "fazendas_ids_por_nome": {},
+        "safras_ids": []
+    })
+    
+    brain_agriculture_repository.get_total_fazendas = AsyncMock(return_value=0)
+    brain_agriculture_repository.get_fazendas_por_estado = AsyncMock(return_value=[])
+    brain_agriculture_repository.get_estatisticas_areas = AsyncMock(return_value={
         "area_total": 0.0,
         "area_agricultavel": 0.0,
         "area_vegetacao": 0.0
     })
-    brain_agriculture_repository.get_total_culturas = Mock(return_value=0)
-    brain_agriculture_repository.get_culturas_agrupadas = Mock(return_value=[])
+    brain_agriculture_repository.get_total_culturas = AsyncMock(return_value=0)
+    brain_agriculture_repository.get_culturas_agrupadas = AsyncMock(return_value=[])
+    brain_agriculture_repository.get_dashboard = AsyncMock(return_value={
+        "total_fazendas": 0,
+        "area_total": 0.0,
+        "area_agricultavel": 0.0,
+        "area_vegetacao": 0.0,
+        "fazendas_por_estado": [],
+        "total_culturas": 0,
+        "culturas": [],
+        "safras_por_ano": []
+    })
+    brain_agriculture_repository.get_cubo_safras = AsyncMock(return_value=[])
     
     return brain_agriculture_repository 
\ No newline at end of file
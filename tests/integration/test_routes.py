@@ -5,24 +5,54 @@ from unittest.mock import Mock, AsyncMock
 from app.main import app
 from app.core.container import Container
 from app.brain_agriculture.models.brain_agriculture import Produtor, Fazenda, Safra
-from app.brain_agriculture.schemas.brain_agriculture import ReturnSucess, EstatisticasFazendas, FazendaPorEstado, EstatisticasCulturas, CulturaQuantidade, EstatisticasAreas, ResumoFazendas, FazendaResumida, ProdutorResumido, ProdutorCompleto, FazendaComSafras, FazendaCompleta, VincularFazendaProdutor, VincularProdutorFazenda, DadosCompletosResponse
+from app.brain_agriculture.schemas.brain_agriculture import ReturnSucess, EstatisticasFazendas, FazendaPorEstado, EstatisticasCulturas, CulturaQuantidade, EstatisticasAreas, ResumoFazendas, FazendaResumida, ProdutorResumido, Dashboard, EstatisticasSafrasPorAno, SafraPorAno, ProdutorCompleto, FazendaComSafras, FazendaCompleta, VincularFazendaProdutor, VincularProdutorFazenda, DadosCompletosResponse, CuboSafras, CelulaCubo, EstatisticasCacheEntidades, ListaFazendas, ListaSafras, ItemLote, ResultadoLote, ResultadoImportacao
 import app.brain_agriculture.api.v1.routes as routes_module
+from app.core.cache import TableVersions
+from app.core.config import config
+from app.shared.constants import MAX_PAGE_SIZE
+
+class VersoesEmMemoria(TableVersions):
+    """Versões das tabelas sem banco, trocadas pelo teste como fariam os triggers"""
+
+    def __init__(self):
+        super().__init__(db=None)
+        self.versoes = {}
+
+    async def get(self, *tabelas):
+        return [str(self.versoes.get(tabela, 0)) for tabela in tabelas]
+
+    def trocar(self, tabela):
+        self.versoes[tabela] = self.versoes.get(tabela, 0) + 1
+
+
+@pytest.fixture(autouse=True)
+def versoes_tabelas():
+    versoes = VersoesEmMemoria()
+    with Container.table_versions.override(versoes):
+        yield versoes
+
 
 @pytest.fixture
 def mock_service():
     mock_service = Mock()
     mock_service.get_all_produtores = AsyncMock()
+    mock_service.get_produtores_by_ids = AsyncMock()
     mock_service.get_produtor_by_id = AsyncMock()
     mock_service.create_produtor = AsyncMock()
     mock_service.update_produtor = AsyncMock()
     mock_service.delete_produtor = AsyncMock()
     mock_service.get_all_fazendas = AsyncMock()
+    mock_service.get_fazendas_by_ids = AsyncMock()
     mock_service.get_fazenda_by_id = AsyncMock()
+    mock_service.get_fazendas_by_produtor = AsyncMock()
     mock_service.create_fazenda = AsyncMock()
     mock_service.update_fazenda = AsyncMock()
     mock_service.delete_fazenda = AsyncMock()
     mock_service.get_all_safras = AsyncMock()
+    mock_service.get_safras_by_ids = AsyncMock()
     mock_service.get_safra_by_id = AsyncMock()
+    mock_service.get_safras_by_fazenda = AsyncMock()
+    mock_service.get_safras_by_ano = AsyncMock()
     mock_service.create_safra = AsyncMock()
     mock_service.update_safra = AsyncMock()
     mock_service.delete_safra = AsyncMock()
@@ -30,6 +60,8 @@ def mock_service():
     mock_service.get_estatisticas_culturas = AsyncMock()
     mock_service.get_estatisticas_areas = AsyncMock()
     mock_service.get_resumo_fazendas = AsyncMock()
+    mock_service.get_dashboard = AsyncMock()
+    mock_service.get_cubo_safras = AsyncMock()
     mock_service.get_fazendas_resumidas = AsyncMock()
     mock_service.get_produtores_resumidos = AsyncMock()
     mock_service.get_teste = AsyncMock()
@@ -58,6 +90,150 @@ class TestBrainAgricultureRoutes:
                 assert data[0]["id"] == 1
                 assert data[0]["nomeprodutor"] == "João Silva"
 
+    def test_get_all_fazendas_paginacao(self, mock_service):
+        with TestClient(app) as client:
+            container = app.container
+            with container.brain_agriculture_service.override(mock_service):
+                mock_service.get_all_fazendas.return_value = [
+                    Fazenda(id=3, nomefazenda="Fazenda A", cidade="Recife", estado="PE", areatotalfazenda=10.0, areaagricutavel=8.0),
+                    Fazenda(id=7, nomefazenda="Fazenda B", cidade="Recife", estado="PE", areatotalfazenda=20.0, areaagricutavel=15.0),
+                ]
+                response = client.get("/api/v1/fazendas?limit=2&after=1&estado=PE")
+                assert response.status_code == 200
+                assert len(response.json()) == 2
+                assert response.headers["X-Next-Cursor"] == "7"
+                assert "after=7" in response.headers["Link"]
+                mock_service.get_all_fazendas.assert_awaited_once_with(
+                    limit=2, after=1, order="asc", estado="PE", cidade=None, idprodutor=None
+                )
+
+    def test_get_all_fazendas_json_direto(self, mock_service):
+        with TestClient(app) as client:
+            container = app.container
+            with container.brain_agriculture_service.override(mock_service):
+                fazendas = ListaFazendas.validate_python([
+                    {"id": 1, "nomefazenda": "Fazenda Ção", "cidade": "Recife", "estado": "PE", "areatotalfazenda": 10.0, "areaagricutavel": 8.0},
+                ])
+                mock_service.get_all_fazendas.return_value = fazendas
+                response = client.get("/api/v1/fazendas?limit=1")
+                assert response.status_code == 200
+                assert response.headers["content-type"] == "application/json"
+                assert response.content == ListaFazendas.dump_json(fazendas)
+                assert response.headers["X-Next-Cursor"] == "1"
+                assert "ETag" in response.headers
+
+    def test_get_fazendas_por_ids(self, mock_service):
+        with TestClient(app) as client:
+            container = app.container
+            with container.brain_agriculture_service.override(mock_service):
+                fazendas = ListaFazendas.validate_python([
+                    {"id": 7, "nomefazenda": "Fazenda B", "cidade": "Recife", "estado": "PE", "areatotalfazenda": 20.0, "areaagricutavel": 15.0},
+                    {"id": 3, "nomefazenda": "Fazenda A", "cidade": "Recife", "estado": "PE", "areatotalfazenda": 10.0, "areaagricutavel": 8.0},
+                ])
+                mock_service.get_fazendas_by_ids.return_value = fazendas
+                response = client.get("/api/v1/fazendas?ids=7,3,7&limit=1")
+                assert response.status_code == 200
+                assert [fazenda["id"] for fazenda in response.json()] == [7, 3]
+                assert "X-Next-Cursor" not in response.headers
+                assert "ETag" in response.headers
+                mock_service.get_fazendas_by_ids.assert_awaited_once_with([7, 3])
+                mock_service.get_all_fazendas.assert_not_awaited()
+
+    def test_listas_aninhadas_json_direto(self, mock_service):
+        with TestClient(app) as client:
+            container = app.container
+            with container.brain_agriculture_service.override(mock_service):
+                fazendas = ListaFazendas.validate_python([
+                    {"id": 1, "nomefazenda": "Fazenda Ção", "cidade": "Recife", "estado": "PE", "areatotalfazenda": 10.0, "areaagricutavel": 8.0, "idprodutor": 1},
+                ])
+                safras = ListaSafras.validate_python([{"id": 1, "ano": 2024, "cultura": "Soja", "idfazenda": 1}])
+                mock_service.get_fazendas_by_produtor.return_value = fazendas
+                mock_service.get_safras_by_fazenda.return_value = safras
+                mock_service.get_safras_by_ano.return_value = safras
+                
+                response = client.get("/api/v1/produtores/1/fazendas")
+                assert response.status_code == 200
+                assert response.content == ListaFazendas.dump_json(fazendas)
+                assert "ETag" in response.headers
+                for url in ("/api/v1/fazendas/1/safras", "/api/v1/safras/ano/2024"):
+                    response = client.get(url)
+                    assert response.status_code == 200
+                    assert response.headers["content-type"] == "application/json"
+                    assert response.content == ListaSafras.dump_json(safras)
+                    assert "ETag" in response.headers
+
+    def test_get_produtores_por_ids_invalidos(self, mock_service):
+        with TestClient(app) as client:
+            container = app.container
+            with container.brain_agriculture_service.override(mock_service):
+                assert client.get("/api/v1/produtores?ids=1,a").status_code == 422
+                ids = ",".join(str(registro_id) for registro_id in range(1, MAX_PAGE_SIZE + 2))
+                response = client.get(f"/api/v1/produtores?ids={ids}")
+                assert response.status_code == 400
+                mock_service.get_produtores_by_ids.assert_not_awaited()
+
+    def test_get_all_safras_limite_maximo(self, mock_service):
+        with TestClient(app) as client:
+            container = app.container
+            with container.brain_agriculture_service.override(mock_service):
+                response = client.get("/api/v1/safras?limit=100000")
+                assert response.status_code == 422
+                mock_service.get_all_safras.assert_not_awaited()
+
+    def test_exportar_safras_csv(self, mock_service):
+        with TestClient(app) as client:
+            container = app.container
+            with container.brain_agriculture_service.override(mock_service):
+                async def conteudo():
+                    yield "id,ano,cultura,idfazenda\r\n"
+                    yield "1,2024,Soja,1\r\n"
+
+                mock_service.exportar_safras = Mock(return_value=conteudo())
+                response = client.get("/api/v1/export/safras?formato=csv")
+                assert response.status_code == 200
+                assert response.headers["content-type"].startswith("text/csv")
+                assert 'filename="safras.csv"' in response.headers["content-disposition"]
+                assert response.text.splitlines() == ["id,ano,cultura,idfazenda", "1,2024,Soja,1"]
+                mock_service.exportar_safras.assert_called_once_with("csv")
+
+    def test_importar_safras_csv(self, mock_service):
+        with TestClient(app) as client:
+            container = app.container
+            with container.brain_agriculture_service.override(mock_service):
+                recebido = []
+
+                async def importar(chunks, formato):
+                    recebido.append(b"".join([chunk async for chunk in chunks]))
+                    return ResultadoImportacao(success=True, message="1 de 1 linhas importadas", total=1, inseridos=1, rejeitados=0)
+
+                mock_service.importar_safras = AsyncMock(side_effect=importar)
+                conteudo = b"ano,cultura,idfazenda\n2024,Soja,1\n"
+                response = client.post("/api/v1/import/safras?formato=csv", content=conteudo, headers={"Content-Type": "text/csv"})
+                assert response.status_code == 200
+                assert response.json()["inseridos"] == 1
+                assert recebido == [conteudo]
+
+    def test_importar_fazendas_interrompida_devolve_relatorio(self, mock_service):
+        with TestClient(app) as client:
+            container = app.container
+            with container.brain_agriculture_service.override(mock_service):
+                parcial = ResultadoImportacao(
+                    success=False, message="Erro ao ler o arquivo na linha 5001", total=5000, inseridos=5000, rejeitados=0
+                )
+                vazio = ResultadoImportacao(
+                    success=False, message="Erro ao ler o arquivo na linha 1", total=0, inseridos=0, rejeitados=0
+                )
+                mock_service.importar_fazendas = AsyncMock(side_effect=[parcial, vazio])
+
+                response = client.post("/api/v1/import/fazendas?formato=ndjson", content=b"{}")
+                assert response.status_code == 207
+                assert response.json()["inseridos"] == 5000
+                assert response.json()["success"] is False
+
+                response = client.post("/api/v1/import/fazendas?formato=ndjson", content=b"{}")
+                assert response.status_code == 422
+                assert response.json()["message"] == "Erro ao ler o arquivo na linha 1"
+
     def test_get_produtor_by_id_success(self, mock_service):
         with TestClient(app) as client:
             container = app.container
@@ -119,6 +295,40 @@ class TestBrainAgricultureRoutes:
                 assert response.status_code == 400
                 assert "Já existe um produtor cadastrado com este CPF" in response.json()["detail"]
 
+    def test_create_safras_lote(self, mock_service):
+        with TestClient(app) as client:
+            container = app.container
+            with container.brain_agriculture_service.override(mock_service):
+                mock_service.create_safras_lote = AsyncMock(return_value=ResultadoLote(
+                    success=True,
+                    message="1 de 2 registros inseridos",
+                    inseridos=1,
+                    rejeitados=1,
+                    itens=[
+                        ItemLote(indice=0, success=True, id=10, message="Safra criada com sucesso"),
+                        ItemLote(indice=1, success=False, message="Fazenda não encontrada"),
+                    ],
+                ))
+                safras = [
+                    {"ano": 2024, "cultura": "Soja", "idfazenda": 1},
+                    {"ano": 2024, "cultura": "Milho", "idfazenda": 99},
+                ]
+                response = client.post("/api/v1/safras/bulk", json=safras)
+                assert response.status_code == 200
+                data = response.json()
+                assert data["inseridos"] == 1
+                assert data["itens"][1]["message"] == "Fazenda não encontrada"
+                assert len(mock_service.create_safras_lote.await_args.args[0]) == 2
+
+    def test_create_produtores_lote_vazio(self, mock_service):
+        with TestClient(app) as client:
+            container = app.container
+            with container.brain_agriculture_service.override(mock_service):
+                mock_service.create_produtores_lote = AsyncMock()
+                response = client.post("/api/v1/produtores/bulk", json=[])
+                assert response.status_code == 422
+                mock_service.create_produtores_lote.assert_not_awaited()
+
     def test_get_estatisticas_fazendas_success(self, mock_service):
         with TestClient(app) as client:
             container = app.container
@@ -183,6 +393,154 @@ class TestBrainAgricultureRoutes:
                 assert data["total_fazendas"] == 10
                 assert data["total_area"] == 1000.0
 
+    def test_get_dashboard_success(self, mock_service):
+        with TestClient(app) as client:
+            container = app.container
+            with container.brain_agriculture_service.override(mock_service):
+                mock_service.get_dashboard.return_value = Dashboard(
+                    resumo=ResumoFazendas(total_fazendas=10, total_area=1000.0),
+                    estatisticas_fazendas=EstatisticasFazendas(
+                        total_fazendas=10,
+                        fazendas_por_estado=[FazendaPorEstado(estado="SP", quantidade=10)]
+                    ),
+                    estatisticas_areas=EstatisticasAreas(area_total=1000.0, area_agricultavel=800.0, area_vegetacao=200.0),
+                    estatisticas_culturas=EstatisticasCulturas(
+                        total_culturas=3,
+                        culturas=[CulturaQuantidade(cultura="Soja", quantidade=3)]
+                    ),
+                    estatisticas_safras_por_ano=EstatisticasSafrasPorAno(
+                        safras_por_ano=[SafraPorAno(ano=2024, quantidade=3)]
+                    )
+                )
+                response = client.get("/api/v1/dashboard")
+                assert response.status_code == 200
+                data = response.json()
+                assert data["resumo"]["total_fazendas"] == 10
+                assert data["estatisticas_fazendas"]["fazendas_por_estado"][0]["estado"] == "SP"
+                assert data["estatisticas_areas"]["area_vegetacao"] == 200.0
+                assert data["estatisticas_culturas"]["culturas"][0]["cultura"] == "Soja"
+                assert data["estatisticas_safras_por_ano"]["safras_por_ano"][0]["ano"] == 2024
+
+    def test_get_cubo_safras_success(self, mock_service):
+        with TestClient(app) as client:
+            container = app.container
+            with container.brain_agriculture_service.override(mock_service):
+                mock_service.get_cubo_safras.return_value = CuboSafras(
+                    dimensoes=["estado", "cultura"],
+                    celulas=[
+                        CelulaCubo(estado="SP", cultura="Soja", dimensoes=["estado", "cultura"], quantidade=2, area_plantada=300.0),
+                        CelulaCubo(dimensoes=[], quantidade=2, area_plantada=300.0)
+                    ]
+                )
+                response = client.get("/api/v1/safras/cubo?dimensoes=estado&dimensoes=cultura&ano=2024")
+                assert response.status_code == 200
+                data = response.json()
+                assert data["dimensoes"] == ["estado", "cultura"]
+                assert data["celulas"][0]["cultura"] == "Soja"
+                assert data["celulas"][1]["estado"] is None
+                mock_service.get_cubo_safras.assert_awaited_once_with(
+                    ["estado", "cultura"], estado=None, cidade=None, cultura=None, ano=2024
+                )
+
+    def test_get_cubo_safras_dimensao_invalida(self, mock_service):
+        with TestClient(app) as client:
+            container = app.container
+            with container.brain_agriculture_service.override(mock_service):
+                response = client.get("/api/v1/safras/cubo?dimensoes=produtor")
+                assert response.status_code == 422
+
+    def test_get_cubo_safras_acima_do_limite(self, mock_service):
+        with TestClient(app) as client:
+            container = app.container
+            with container.brain_agriculture_service.override(mock_service):
+                mock_service.get_cubo_safras.side_effect = ValueError("O cubo passa de 10000 células")
+                response = client.get("/api/v1/safras/cubo?dimensoes=cidade&dimensoes=ano")
+                assert response.status_code == 400
+                assert "células" in response.json()["detail"]
+
+    @staticmethod
+    async def _backends_dos_caches(container):
+        caches = [
+            await container.stats_cache(),
+            await container.cubo_cache(),
+            await container.entity_cache(),
+        ]
+        return [cache.backend for cache in caches]
+
+    def test_caches_com_backends_proprios(self):
+        """No modo LRU cada cache tem o próprio backend, com o próprio limite de itens"""
+        with TestClient(app) as client:
+            backends = client.portal.call(self._backends_dos_caches, app.container)
+            assert len({id(backend) for backend in backends}) == 3
+            assert [backend.max_itens for backend in backends] == [
+                config.STATS_CACHE_MAX_ITEMS,
+                config.CUBO_CACHE_MAX_ITEMS,
+                config.ENTITY_CACHE_MAX_ITEMS,
+            ]
+
+    def test_get_sem_versoes_responde_sem_etag(self, mock_service, sample_fazenda):
+        """Sem as versões do banco a rota responde normalmente, sem ETag nem 304"""
+        with Container.table_versions.override(TableVersions(None)):
+            with TestClient(app) as client:
+                with app.container.brain_agriculture_service.override(mock_service):
+                    mock_service.get_all_fazendas.return_value = [sample_fazenda]
+                    response = client.get("/api/v1/fazendas", headers={"If-None-Match": "*"})
+                    assert response.status_code == 200
+                    assert "ETag" not in response.headers
+
+    def test_get_condicional_etag(self, mock_service, sample_fazenda, versoes_tabelas):
+        with TestClient(app) as client:
+            container = app.container
+            with container.brain_agriculture_service.override(mock_service):
+                mock_service.get_all_fazendas.return_value = [sample_fazenda]
+                response = client.get("/api/v1/fazendas")
+                assert response.status_code == 200
+                etag = response.headers["ETag"]
+                
+                response = client.get("/api/v1/fazendas", headers={"If-None-Match": etag})
+                assert response.status_code == 304
+                assert response.headers["ETag"] == etag
+                assert response.content == b""
+                mock_service.get_all_fazendas.assert_awaited_once()
+                
+                # Escrita em outra tabela não muda a ETag; na própria tabela, sim
+                versoes_tabelas.trocar("produtor")
+                response = client.get("/api/v1/fazendas", headers={"If-None-Match": etag})
+                assert response.status_code == 304
+                versoes_tabelas.trocar("fazenda")
+                response = client.get("/api/v1/fazendas", headers={"If-None-Match": etag})
+                assert response.status_code == 200
+                assert response.headers["ETag"] != etag
+
+    def test_etag_nova_nao_serve_corpo_do_cache_antigo(self, brain_agriculture_service, mock_repository_methods, versoes_tabelas):
+        """Escrita em outro worker troca a versão sem limpar este cache: a ETag nova vem com corpo recalculado"""
+        mock_repository_methods.get_fazendas_por_estado.return_value = [{"estado": "SP", "quantidade": 1}]
+        mock_repository_methods.get_total_fazendas.return_value = 1
+        with TestClient(app) as client:
+            with app.container.brain_agriculture_service.override(brain_agriculture_service):
+                response = client.get("/api/v1/fazendas/estatisticas")
+                etag = response.headers["ETag"]
+                assert response.json()["total_fazendas"] == 1
+                
+                mock_repository_methods.get_fazendas_por_estado.return_value = [{"estado": "SP", "quantidade": 2}]
+                mock_repository_methods.get_total_fazendas.return_value = 2
+                versoes_tabelas.trocar("fazenda")
+                response = client.get("/api/v1/fazendas/estatisticas", headers={"If-None-Match": etag})
+                assert response.status_code == 200
+                assert response.headers["ETag"] != etag
+                assert response.json()["total_fazendas"] == 2
+
+    def test_get_estatisticas_cache_entidades(self, mock_service):
+        with TestClient(app) as client:
+            container = app.container
+            with container.brain_agriculture_service.override(mock_service):
+                mock_service.get_estatisticas_cache_entidades.return_value = EstatisticasCacheEntidades(
+                    hits=3, misses=1, taxa_acerto=0.75
+                )
+                response = client.get("/api/v1/cache/entidades")
+                assert response.status_code == 200
+                assert response.json() == {"hits": 3, "misses": 1, "taxa_acerto": 0.75}
+
     def test_get_lista_fazendas_success(self, mock_service):
         with TestClient(app) as client:
             container = app.container
@@ -214,6 +572,18 @@ class TestBrainAgricultureRoutes:
                 assert data[0]["cpf"] == "123.456.789-00"
                 assert data[0]["nomeprodutor"] == "João Silva"
 
+    def test_get_lista_fazendas_com_prefixo_e_limite(self, mock_service):
+        with TestClient(app) as client:
+            container = app.container
+            with container.brain_agriculture_service.override(mock_service):
+                mock_service.get_fazendas_resumidas.return_value = [
+                    FazendaResumida(id=2, nomefazenda="Fazenda São João")
+                ]
+                response = client.get("/api/v1/fazendas/lista?prefixo=Fazenda%20S&limit=10")
+                assert response.status_code == 200
+                assert len(response.json()) == 1
+                mock_service.get_fazendas_resumidas.assert_awaited_once_with(prefixo="Fazenda S", limit=10)
+
     def test_internal_server_error(self, mock_service):
         with TestClient(app) as client:
             container = app.container
@@ -0,0 +1,512 @@
+import asyncio
+import contextvars
+import socket
+import threading
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from fakeredis import TcpFakeServer
+
+from app.core.cache import (
+    EntityCache,
+    LRUCacheBackend,
+    RedisCacheBackend,
+    SingleFlight,
+    TableVersions,
+    TTLCache,
+    get_cache_backend,
+    get_redis_backend,
+)
+
+
+def relogio(instante):
+    """Fixa o relógio do módulo de cache (time.time e time.monotonic) no instante dado"""
+    return patch(
+        "app.core.cache.time",
+        **{"time.return_value": instante, "monotonic.return_value": instante},
+    )
+
+
+@pytest.fixture
+def redis_url():
+    """Servidor falso que fala o protocolo do Redis numa porta local"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        porta = sock.getsockname()[1]
+    servidor = TcpFakeServer(("127.0.0.1", porta), server_type="redis")
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield f"redis://127.0.0.1:{porta}/0"
+    servidor.shutdown()
+    servidor.server_close()
+
+
+class TestTTLCache:
+    """Testes unitários para TTLCache"""
+
+    @pytest.mark.asyncio
+    async def test_get_set(self):
+        """Testa armazenamento e leitura dentro do TTL"""
+        cache = TTLCache(ttl=60)
+        await cache.set("chave", {"total": 1})
+
+        assert await cache.get("chave") == {"total": 1}
+        assert await cache.get("outra") is None
+
+    @pytest.mark.asyncio
+    async def test_expira_apos_ttl(self):
+        """Testa que a entrada expira após o TTL"""
+        cache = TTLCache(ttl=10)
+        with relogio(100.0):
+            await cache.set("chave", 1)
+        with relogio(109.0):
+            assert await cache.get("chave") == 1
+        with relogio(110.0):
+            assert await cache.get("chave") is None
+        assert len(cache.backend) == 0
+
+    @pytest.mark.asyncio
+    async def test_ttl_zero_desativa(self):
+        """Testa que ttl <= 0 desativa o cache"""
+        cache = TTLCache(ttl=0)
+        await cache.set("chave", 1)
+
+        assert await cache.get("chave") is None
+
+    @pytest.mark.asyncio
+    async def test_lookup_valor_vencido(self):
+        """Testa que, com stale_ttl, o valor vencido continua disponível marcado como não fresco"""
+        cache = TTLCache(ttl=10, stale_ttl=20)
+        with relogio(100.0):
+            await cache.set("chave", 1)
+        with relogio(105.0):
+            assert await cache.lookup("chave") == (1, True)
+        with relogio(115.0):
+            assert await cache.lookup("chave") == (1, False)
+            assert await cache.get("chave") is None
+        with relogio(130.0):
+            assert await cache.lookup("chave") == (None, False)
+
+    @pytest.mark.asyncio
+    async def test_set_descarta_valor_de_geracao_anterior(self):
+        """Testa que um valor calculado antes de uma invalidação não é armazenado"""
+        cache = TTLCache(ttl=60)
+        geracao = cache.geracao
+
+        await cache.invalidate()
+        await cache.set("chave", 1, geracao=geracao)
+
+        assert await cache.get("chave") is None
+        await cache.set("chave", 2, geracao=cache.geracao)
+        assert await cache.get("chave") == 2
+
+    @pytest.mark.asyncio
+    async def test_invalidate(self):
+        """Testa a invalidação de todas as entradas do namespace"""
+        backend = LRUCacheBackend()
+        cache = TTLCache(ttl=60, backend=backend)
+        outro = TTLCache(ttl=60, backend=backend, namespace="entidades")
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        await outro.set("a", 3)
+
+        await cache.invalidate()
+
+        assert await cache.get("a") is None
+        assert await cache.get("b") is None
+        assert await outro.get("a") == 3
+
+
+class TestEntityCache:
+    """Testes unitários para EntityCache"""
+
+    @pytest.mark.asyncio
+    async def test_read_through_com_contadores(self):
+        """Testa carga na primeira busca, acerto na segunda e contadores"""
+        cache = EntityCache(ttl=60)
+        cargas = []
+
+        async def carregar():
+            cargas.append(1)
+            return {"id": 1}
+
+        assert await cache.get_or_load("produtor", 1, carregar) == {"id": 1}
+        assert await cache.get_or_load("produtor", 1, carregar) == {"id": 1}
+
+        assert len(cargas) == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert cache.taxa_acerto == 0.5
+
+    @pytest.mark.asyncio
+    async def test_entrada_por_versoes(self):
+        """Testa que versões diferentes das tabelas não compartilham a entrada"""
+        cache = EntityCache(ttl=60)
+        cargas = []
+
+        async def carregar():
+            cargas.append(1)
+            return {"id": 1, "carga": len(cargas)}
+
+        v1 = (("produtor", "1"),)
+        v2 = (("produtor", "2"),)
+        assert (await cache.get_or_load("produtor", 1, carregar, v1))["carga"] == 1
+        assert (await cache.get_or_load("produtor", 1, carregar, v2))["carga"] == 2
+        assert (await cache.get_or_load("produtor", 1, carregar, v1))["carga"] == 1
+
+    @pytest.mark.asyncio
+    async def test_ausencia_nao_armazenada(self):
+        """Testa que um id inexistente não fica em cache"""
+        cache = EntityCache(ttl=60)
+
+        async def carregar():
+            return None
+
+        await cache.get_or_load("fazenda", 1, carregar)
+        await cache.get_or_load("fazenda", 1, carregar)
+
+        assert cache.misses == 2
+
+    @pytest.mark.asyncio
+    async def test_invalidate_por_id_e_por_tipo(self):
+        """Testa invalidação de uma entidade e de todas as entidades de um tipo"""
+        backend = LRUCacheBackend()
+        cache = EntityCache(ttl=60, backend=backend)
+        for entidade, entidade_id in (("safra", 1), ("safra", 2), ("fazenda", 1)):
+            await backend.set(cache._chave(entidade, entidade_id), entidade_id, ttl=60)
+
+        await cache.invalidate("fazenda", 1)
+        assert len(backend) == 2
+        await cache.invalidate("safra")
+        assert len(backend) == 0
+
+    @pytest.mark.asyncio
+    async def test_invalidacao_durante_carga(self):
+        """Testa que um valor lido antes de uma invalidação não é armazenado"""
+        cache = EntityCache(ttl=60)
+
+        async def carregar():
+            await cache.invalidate("produtor", 1)
+            return {"id": 1, "nome": "antigo"}
+
+        await cache.get_or_load("produtor", 1, carregar)
+
+        assert len(cache.backend) == 0
+
+
+def banco_com_versoes(versoes):
+    """Engine falso cuja conexão devolve as linhas de versao_tabela do dicionário"""
+    conexao = AsyncMock()
+    conexao.execute.side_effect = lambda statement: Mock(
+        all=Mock(return_value=list(versoes.items()))
+    )
+    db = Mock()
+    db.connect.return_value.__aenter__ = AsyncMock(return_value=conexao)
+    db.connect.return_value.__aexit__ = AsyncMock(return_value=False)
+    return db, conexao
+
+
+class TestTableVersions:
+    """Testes unitários para TableVersions"""
+
+    @pytest.mark.asyncio
+    async def test_etag_muda_com_a_versao(self):
+        """Testa que a ETag é estável até a versão da tabela de que depende mudar no banco"""
+        linhas = {"fazenda": 7, "safra": 3}
+        db, conexao = banco_com_versoes(linhas)
+        versoes = TableVersions(db)
+        etag = await versoes.etag("/api/v1/fazendas?", "fazenda")
+
+        assert etag.startswith('"') and etag.endswith('"')
+        assert await versoes.etag("/api/v1/fazendas?", "fazenda") == etag
+        assert await versoes.etag("/api/v1/fazendas?limit=1", "fazenda") != etag
+
+        linhas["safra"] = 4
+        assert await versoes.etag("/api/v1/fazendas?", "fazenda") == etag
+        linhas["fazenda"] = 8
+        assert await versoes.etag("/api/v1/fazendas?", "fazenda") != etag
+
+        statement = conexao.execute.call_args.args[0]
+        sql = str(statement.compile(compile_kwargs={"literal_binds": True}))
+        assert "FROM versao_tabela" in sql
+        assert "versao_tabela.tabela IN ('fazenda')" in sql
+
+    @pytest.mark.asyncio
+    async def test_sem_banco_nao_ha_etag(self):
+        """Testa que, sem banco ou com falha na leitura, não há versão nem ETag"""
+        assert await TableVersions(None).etag("/api/v1/safras?", "safra") is None
+
+        db, conexao = banco_com_versoes({})
+        conexao.execute.side_effect = ConnectionError("banco fora do ar")
+        assert await TableVersions(db).etag("/api/v1/safras?", "safra") is None
+
+
+class TestLRUCacheBackend:
+    """Testes unitários para LRUCacheBackend"""
+
+    @pytest.mark.asyncio
+    async def test_descarta_menos_usado(self):
+        """Testa que, cheio, o backend descarta a entrada usada há mais tempo"""
+        backend = LRUCacheBackend(max_itens=2)
+        await backend.set("a", 1, ttl=60)
+        await backend.set("b", 2, ttl=60)
+        await backend.get("a")
+        await backend.set("c", 3, ttl=60)
+
+        assert await backend.get("a") == 1
+        assert await backend.get("b") is None
+        assert await backend.get("c") == 3
+        assert len(backend) == 2
+
+    @pytest.mark.asyncio
+    async def test_delete(self):
+        """Testa remoção por chave e por prefixo"""
+        backend = LRUCacheBackend()
+        await backend.set("estatisticas:a", 1, ttl=60)
+        await backend.set("estatisticas:b", 2, ttl=60)
+        await backend.set("entidades:a", 3, ttl=60)
+
+        await backend.delete("entidades:a")
+        await backend.delete_prefix("estatisticas:")
+
+        assert len(backend) == 0
+
+
+class TestRedisCacheBackend:
+    """Testes do backend Redis contra um servidor falso local"""
+
+    @pytest.mark.asyncio
+    async def test_compartilhado_entre_workers(self, redis_url):
+        """Testa que workers diferentes enxergam os mesmos valores"""
+        worker_a = RedisCacheBackend(redis_url)
+        worker_b = RedisCacheBackend(redis_url)
+        await worker_a.start()
+        await worker_b.start()
+        try:
+            cache_a = TTLCache(ttl=60, backend=worker_a)
+            cache_b = TTLCache(ttl=60, backend=worker_b)
+
+            await cache_a.set(("cubo", ("estado",)), {"total": 1})
+
+            assert await cache_b.get(("cubo", ("estado",))) == {"total": 1}
+        finally:
+            await worker_a.close()
+            await worker_b.close()
+
+    @pytest.mark.asyncio
+    async def test_invalidacao_publicada_para_outros_workers(self, redis_url):
+        """Testa que a invalidação remove as chaves e avisa os outros workers pelo pub/sub"""
+        worker_a = RedisCacheBackend(redis_url)
+        worker_b = RedisCacheBackend(redis_url)
+        await worker_a.start()
+        await worker_b.start()
+        try:
+            cache_a = TTLCache(ttl=60, backend=worker_a)
+            cache_b = TTLCache(ttl=60, backend=worker_b)
+            avisos_a, avisos_b = [], []
+            worker_a.on_invalidate(avisos_a.append)
+            worker_b.on_invalidate(avisos_b.append)
+            await cache_a.set("[total]*", 1)
+            geracao_b = cache_b.geracao
+
+            await cache_a.invalidate()
+            await asyncio.sleep(0.1)
+
+            assert await cache_b.get("[total]*") is None
+            assert avisos_b == ["estatisticas:"]
+            assert avisos_a == []
+            assert cache_b.geracao == geracao_b + 1
+        finally:
+            await worker_a.close()
+            await worker_b.close()
+
+    @pytest.mark.asyncio
+    async def test_servidor_indisponivel(self):
+        """Testa que falhas de conexão são tratadas como ausência no cache"""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            porta = sock.getsockname()[1]
+        backend = RedisCacheBackend(f"redis://127.0.0.1:{porta}/0")
+        try:
+            await backend.set("chave", 1, ttl=60)
+            assert await backend.get("chave") is None
+        finally:
+            await backend.close()
+
+    @pytest.mark.asyncio
+    async def test_get_redis_backend(self, redis_url):
+        """Testa a criação do backend Redis configurado em CACHE_BACKEND"""
+        config = Mock(CACHE_BACKEND="redis", REDIS_URL=redis_url)
+        recurso = get_redis_backend(config)
+
+        backend = await recurso.__anext__()
+
+        assert isinstance(backend, RedisCacheBackend)
+        assert get_cache_backend(backend, max_itens=10) is backend
+        # Encerramento como no shutdown_resources do container
+        with pytest.raises(StopAsyncIteration):
+            await recurso.__anext__()
+
+    @pytest.mark.asyncio
+    async def test_get_redis_backend_sem_redis_usa_lru(self):
+        """Testa que, sem conexão com o Redis, cada cache cai para um LRU próprio do processo"""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            porta = sock.getsockname()[1]
+        config = Mock(CACHE_BACKEND="redis", REDIS_URL=f"redis://127.0.0.1:{porta}/0")
+        recurso = get_redis_backend(config)
+
+        compartilhado = await recurso.__anext__()
+        estatisticas = get_cache_backend(compartilhado, max_itens=10)
+        entidades = get_cache_backend(compartilhado, max_itens=20)
+
+        assert compartilhado is None
+        assert isinstance(estatisticas, LRUCacheBackend)
+        assert estatisticas is not entidades
+        assert (estatisticas.max_itens, entidades.max_itens) == (10, 20)
+        # Encerramento como no shutdown_resources do container
+        with pytest.raises(StopAsyncIteration):
+            await recurso.__anext__()
+
+
+class TestSingleFlight:
+    """Testes unitários para SingleFlight"""
+
+    @pytest.mark.asyncio
+    async def test_chamadas_concorrentes_compartilham_execucao(self):
+        """Testa que chamadas concorrentes com a mesma chave executam uma única vez"""
+        single_flight = SingleFlight()
+        execucoes = []
+
+        async def consulta():
+            execucoes.append(1)
+            await asyncio.sleep(0.01)
+            return {"total": 1}
+
+        resultados = await asyncio.gather(
+            *[single_flight.do("chave", consulta) for _ in range(5)]
+        )
+
+        assert len(execucoes) == 1
+        assert all(resultado == {"total": 1} for resultado in resultados)
+        assert len(single_flight) == 0
+
+    @pytest.mark.asyncio
+    async def test_chaves_diferentes_executam_separadamente(self):
+        """Testa que chaves diferentes não são agrupadas"""
+        single_flight = SingleFlight()
+
+        async def consulta(valor):
+            await asyncio.sleep(0)
+            return valor
+
+        resultados = await asyncio.gather(
+            single_flight.do("a", lambda: consulta(1)),
+            single_flight.do("b", lambda: consulta(2)),
+        )
+
+        assert resultados == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_erro_propagado_para_todos(self):
+        """Testa que o erro da execução compartilhada chega a todas as chamadas"""
+        single_flight = SingleFlight()
+
+        async def consulta():
+            await asyncio.sleep(0.01)
+            raise ValueError("falha")
+
+        resultados = await asyncio.gather(
+            *[single_flight.do("chave", consulta) for _ in range(3)],
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(resultado, ValueError) for resultado in resultados)
+        assert len(single_flight) == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelamento_do_executor(self):
+        """Testa que cancelar quem disparou a execução não a interrompe para os demais"""
+        single_flight = SingleFlight()
+        execucoes = []
+
+        async def consulta():
+            execucoes.append(1)
+            await asyncio.sleep(0.01)
+            return len(execucoes)
+
+        executor = asyncio.create_task(single_flight.do("chave", consulta))
+        await asyncio.sleep(0)
+        seguidor = asyncio.create_task(single_flight.do("chave", consulta))
+        await asyncio.sleep(0)
+        executor.cancel()
+
+        assert await seguidor == 1
+        assert executor.cancelled()
+        assert len(execucoes) == 1
+
+    @pytest.mark.asyncio
+    async def test_forget(self):
+        """Testa que após forget uma nova chamada não se junta à execução em andamento"""
+        single_flight = SingleFlight()
+        execucoes = []
+
+        async def consulta():
+            execucoes.append(1)
+            numero = len(execucoes)
+            await asyncio.sleep(0.01)
+            return numero
+
+        primeira = asyncio.create_task(single_flight.do("chave", consulta))
+        await asyncio.sleep(0)
+        single_flight.forget()
+        segunda = await single_flight.do("chave", consulta)
+
+        assert await primeira == 1
+        assert segunda == 2
+
+    @pytest.mark.asyncio
+    async def test_do_background_uma_execucao(self):
+        """Testa que execuções em segundo plano da mesma chave não se acumulam"""
+        single_flight = SingleFlight()
+        execucoes = []
+
+        async def consulta():
+            execucoes.append(1)
+            await asyncio.sleep(0.01)
+
+        single_flight.do_background("chave", consulta)
+        await asyncio.sleep(0)
+        single_flight.do_background("chave", consulta)
+        await asyncio.sleep(0.02)
+
+        assert len(execucoes) == 1
+        assert "chave" not in single_flight
+
+    @pytest.mark.asyncio
+    async def test_do_background_fora_do_contexto(self):
+        """Testa que a execução em segundo plano não herda o contexto da requisição"""
+        single_flight = SingleFlight()
+        variavel = contextvars.ContextVar("variavel", default=None)
+        vistos = []
+
+        async def consulta():
+            vistos.append(variavel.get())
+
+        variavel.set("requisicao")
+        single_flight.do_background("chave", consulta)
+        await asyncio.sleep(0.01)
+
+        assert vistos == [None]
+
+    @pytest.mark.asyncio
+    async def test_do_fora_do_contexto(self):
+        """Testa que a execução compartilhada não roda no contexto de quem a disparou"""
+        single_flight = SingleFlight()
+        variavel = contextvars.ContextVar("variavel", default=None)
+
+        async def consulta():
+            return variavel.get()
+
+        variavel.set("requisicao")
+
+        assert await single_flight.do("chave", consulta) is None
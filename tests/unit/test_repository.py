@@ -1,198 +1,501 @@
 import pytest
-from unittest.mock import Mock, patch
-from sqlmodel import Session
+from decimal import Decimal
+from unittest.mock import AsyncMock, Mock, patch
+from sqlalchemy.dialects import postgresql
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.brain_agriculture.repositories.brain_agriculture import Brain_AgricultureRepository
-from app.brain_agriculture.models.brain_agriculture import Produtor, Fazenda, Safra
+from app.core.database import UnitOfWork, get_current_unit_of_work
+from app.brain_agriculture.repositories.brain_agriculture import AsyncBrain_AgricultureRepository
+from app.brain_agriculture.models.brain_agriculture import Safra
 
 
-class TestBrainAgricultureRepository:
-    """Testes unitários para Brain_AgricultureRepository"""
+class TestAsyncBrainAgricultureRepository:
+    """Testes unitários para AsyncBrain_AgricultureRepository"""
 
     @pytest.fixture
     def repository(self, mock_db):
-        return Brain_AgricultureRepository(mock_db)
-
-    def test_get_all_produtores_success(self, repository, sample_produtor):
-        """Testa busca de todos os produtores com sucesso"""
-        mock_session = Mock()
-        mock_session.exec.return_value.all.return_value = [sample_produtor]
-        
-        with patch.object(Session, '__enter__', return_value=mock_session):
-            repository.db = Mock()
-            
-            result = repository.get_all_produtores()
-            
+        return AsyncBrain_AgricultureRepository(mock_db)
+
+    @pytest.fixture
+    def mock_session(self):
+        mock_session = AsyncMock()
+        mock_session.add = Mock()
+        return mock_session
+
+    @pytest.mark.asyncio
+    async def test_get_all_produtores_success(self, repository, mock_session, sample_produtor):
+        """Testa busca assíncrona de todos os produtores com sucesso"""
+        mock_session.exec.return_value.all = Mock(return_value=[sample_produtor])
+
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            result = await repository.get_all_produtores()
+
             assert result == [sample_produtor]
-            mock_session.exec.assert_called_once()
+            mock_session.exec.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_get_all_safras_seleciona_colunas(self, repository, mock_session):
+        """Testa que a listagem projeta as colunas da tabela em vez de hidratar entidades ORM"""
+        mock_session.exec.return_value.all = Mock(return_value=[])
+
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            await repository.get_all_safras(limit=10)
 
-    def test_get_all_produtores_no_db(self, repository):
-        """Testa busca de produtores quando banco não está disponível"""
+        statement = mock_session.exec.await_args.args[0]
+        assert [coluna["name"] for coluna in statement.column_descriptions] == ["id", "ano", "cultura", "idfazenda"]
+
+    @pytest.mark.asyncio
+    async def test_get_safras_by_ids_ordem_informada(self, repository, mock_session):
+        """Testa a busca em lote: uma query com id = ANY e as linhas na ordem dos IDs informados"""
+        linhas = [Mock(id=1), Mock(id=5), Mock(id=9)]
+        mock_session.exec.return_value.all = Mock(return_value=linhas)
+
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            result = await repository.get_safras_by_ids([9, 4, 1, 5])
+
+        assert result == [linhas[2], linhas[0], linhas[1]]
+        mock_session.exec.assert_awaited_once()
+        compilado = mock_session.exec.await_args.args[0].compile(dialect=postgresql.dialect())
+        assert "WHERE safra.id = ANY (%(ids)s::INTEGER[])" in str(compilado)
+        assert compilado.params["ids"] == [9, 4, 1, 5]
+
+    @pytest.mark.asyncio
+    async def test_get_all_produtores_no_db(self, repository):
+        """Testa busca assíncrona de produtores quando banco não está disponível"""
         repository.db = None
-        
-        result = repository.get_all_produtores()
-        
+
+        result = await repository.get_all_produtores()
+
         assert result == []
 
-    def test_get_produtor_by_id_success(self, repository, sample_produtor):
-        """Testa busca de produtor por ID com sucesso"""
-        mock_session = Mock()
-        mock_session.exec.return_value.first.return_value = sample_produtor
-        
-        with patch.object(Session, '__enter__', return_value=mock_session):
-            repository.db = Mock()
-            
-            result = repository.get_produtor_by_id(1)
-            
+    def test_paginar_keyset(self, repository):
+        """Testa a paginação por keyset no id"""
+        statement = repository._paginar(select(Safra), Safra.id, limit=10, after=5)
+        sql = str(statement.compile(compile_kwargs={"literal_binds": True}))
+
+        assert "safra.id > 5" in sql
+        assert "ORDER BY safra.id" in sql
+        assert "LIMIT 10" in sql
+
+    def test_paginar_keyset_desc(self, repository):
+        """Testa a paginação por keyset no id em ordem decrescente"""
+        statement = repository._paginar(select(Safra), Safra.id, limit=10, after=5, order="desc")
+        sql = str(statement.compile(compile_kwargs={"literal_binds": True}))
+
+        assert "safra.id < 5" in sql
+        assert "ORDER BY safra.id DESC" in sql
+
+    @pytest.mark.asyncio
+    async def test_get_produtor_by_id_success(self, repository, mock_session, sample_produtor):
+        """Testa busca assíncrona de produtor por ID com sucesso"""
+        mock_session.exec.return_value.first = Mock(return_value=sample_produtor)
+
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            result = await repository.get_produtor_by_id(1)
+
             assert result == sample_produtor
-            mock_session.exec.assert_called_once()
-
-    def test_get_produtor_by_id_not_found(self, repository):
-        """Testa busca de produtor por ID quando não encontrado"""
-        mock_session = Mock()
-        mock_session.exec.return_value.first.return_value = None
-        
-        with patch.object(Session, '__enter__', return_value=mock_session):
-            repository.db = Mock()
-            
-            result = repository.get_produtor_by_id(999)
-            
-            assert result is None
 
-    def test_get_produtor_by_cpf_success(self, repository, sample_produtor):
-        """Testa busca de produtor por CPF com sucesso"""
-        mock_session = Mock()
-        mock_session.exec.return_value.first.return_value = sample_produtor
-        
-        with patch.object(Session, '__enter__', return_value=mock_session):
-            repository.db = Mock()
-            
-            result = repository.get_produtor_by_cpf("123.456.789-00")
-            
+    @pytest.mark.asyncio
+    async def test_get_produtor_by_cpf_numerico(self, repository, mock_session, sample_produtor):
+        """Testa que a busca por CPF compara o inteiro de cpf_numerico (índice único)"""
+        mock_session.exec.return_value.first = Mock(return_value=sample_produtor)
+
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            result = await repository.get_produtor_by_cpf(12345678909)
+
             assert result == sample_produtor
+            statement = mock_session.exec.await_args.args[0]
+            assert "produtor.cpf_numerico = %(cpf_numerico_1)s" in str(statement.compile(dialect=postgresql.dialect()))
+            assert statement.compile().params["cpf_numerico_1"] == 12345678909
+
+    @pytest.mark.asyncio
+    async def test_get_produtor_completo_carrega_arvore(self, repository, mock_session, sample_produtor):
+        """Testa que o produtor completo é buscado com fazendas (JOIN) e safras (selectinload) numa única chamada"""
+        mock_session.exec.return_value.unique = Mock(return_value=Mock(first=Mock(return_value=sample_produtor)))
+
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            result = await repository.get_produtor_completo(1)
 
-    def test_create_produtor_success(self, repository, sample_produtor):
-        """Testa criação de produtor com sucesso"""
-        mock_session = Mock()
-        
-        with patch.object(Session, '__enter__', return_value=mock_session):
-            repository.db = Mock()
-            
-            result = repository.create_produtor(sample_produtor)
-            
             assert result == sample_produtor
-            mock_session.add.assert_called_once_with(sample_produtor)
-            mock_session.commit.assert_called_once()
-            mock_session.refresh.assert_called_once_with(sample_produtor)
+            mock_session.exec.assert_awaited_once()
+            statement = mock_session.exec.await_args.args[0]
+            sql = str(statement.compile(compile_kwargs={"literal_binds": True}))
+            assert "LEFT OUTER JOIN fazenda" in sql
+            assert "produtor.id = 1" in sql
+
+    @pytest.mark.asyncio
+    async def test_get_fazendas_resumidas_projecao(self, repository, mock_session):
+        """Testa que a lista resumida seleciona só id e nome, com prefixo e limite"""
+        mock_session.exec.return_value.all = Mock(return_value=[(1, "Fazenda Nova")])
+
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            result = await repository.get_fazendas_resumidas(prefixo="Faz_", limit=20)
+
+            assert result == [(1, "Fazenda Nova")]
+            statement = mock_session.exec.await_args.args[0]
+            sql = str(statement.compile(compile_kwargs={"literal_binds": True}))
+            assert sql.startswith("SELECT fazenda.id, fazenda.nomefazenda \nFROM fazenda")
+            assert "cidade" not in sql
+            assert "LIKE lower('Faz/_') || '%' ESCAPE '/'" in sql
+            assert "LIMIT 20" in sql
+
+    @pytest.mark.asyncio
+    async def test_update_fazenda_update_returning(self, repository, mock_session, sample_fazenda):
+        """Testa que a atualização é um único UPDATE ... RETURNING com a checagem do produtor no WHERE"""
+        mock_session.exec.return_value.first = Mock(return_value=(sample_fazenda,))
 
-    def test_create_produtor_no_db(self, repository, sample_produtor):
-        """Testa criação de produtor quando banco não está disponível"""
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            result = await repository.update_fazenda(1, {"cidade": "Recife", "idprodutor": 2, "inexistente": 1})
+
+            assert result == sample_fazenda
+            mock_session.exec.assert_awaited_once()
+            mock_session.commit.assert_awaited_once()
+            mock_session.refresh.assert_not_awaited()
+            statement = mock_session.exec.await_args.args[0]
+            sql = str(statement.compile(compile_kwargs={"literal_binds": True}))
+            assert sql.startswith("UPDATE fazenda SET cidade='Recife', idprodutor=2")
+            assert "WHERE fazenda.id = 1 AND (EXISTS (SELECT *" in sql
+            assert "RETURNING fazenda.id" in sql
+
+    @pytest.mark.asyncio
+    async def test_update_safra_not_found(self, repository, mock_session):
+        """Testa que nenhuma linha afetada resulta em None sem commit"""
+        mock_session.exec.return_value.first = Mock(return_value=None)
+
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            result = await repository.update_safra(999, {"cultura": "Soja"})
+
+            assert result is None
+            mock_session.commit.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_get_dashboard_query_unica(self, repository, mock_session):
+        """Testa que o dashboard é lido numa única query sobre as tabelas de agregados"""
+        linhas = [
+            Mock(dimensao="estado", chave="MG", ano=None, quantidade=1, area_total=Decimal("100"), area_agricultavel=Decimal("50")),
+            Mock(dimensao="estado", chave="SP", ano=None, quantidade=2, area_total=Decimal("200"), area_agricultavel=Decimal("150")),
+            Mock(dimensao="cultura", chave="Milho", ano=None, quantidade=1, area_total=None, area_agricultavel=None),
+            Mock(dimensao="cultura", chave="Soja", ano=None, quantidade=3, area_total=None, area_agricultavel=None),
+            Mock(dimensao="ano", chave=None, ano=2023, quantidade=1, area_total=None, area_agricultavel=None),
+            Mock(dimensao="ano", chave=None, ano=2024, quantidade=3, area_total=None, area_agricultavel=None),
+        ]
+        mock_session.exec.return_value.all = Mock(return_value=linhas)
+
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            result = await repository.get_dashboard()
+
+            mock_session.exec.assert_awaited_once()
+            sql = str(mock_session.exec.await_args.args[0])
+            assert "FROM estatistica_estado" in sql
+            assert "FROM estatistica_cultura" in sql
+            assert "FROM estatistica_ano" in sql
+            assert "FROM fazenda" not in sql
+            assert "FROM safra" not in sql
+
+            assert result["total_fazendas"] == 3
+            assert result["area_total"] == 300.0
+            assert result["area_vegetacao"] == 100.0
+            assert result["fazendas_por_estado"] == [{"estado": "SP", "quantidade": 2}, {"estado": "MG", "quantidade": 1}]
+            assert result["total_culturas"] == 4
+            assert result["culturas"][0] == {"cultura": "Soja", "quantidade": 3}
+            assert result["safras_por_ano"] == [{"ano": 2024, "quantidade": 3}, {"ano": 2023, "quantidade": 1}]
+
+    @pytest.mark.asyncio
+    async def test_get_cubo_safras_group_by_cube(self, repository, mock_session):
+        """Testa que o cubo é calculado numa única query com GROUP BY CUBE e filtros"""
+        linhas = [
+            Mock(estado="SP", cultura="Soja", grouping_estado=0, grouping_cultura=0, quantidade=2, area_plantada=Decimal("300")),
+            Mock(estado="SP", cultura=None, grouping_estado=0, grouping_cultura=1, quantidade=3, area_plantada=Decimal("450")),
+            Mock(estado=None, cultura=None, grouping_estado=1, grouping_cultura=1, quantidade=3, area_plantada=Decimal("450")),
+        ]
+        mock_session.exec.return_value.all = Mock(return_value=linhas)
+
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            result = await repository.get_cubo_safras(["estado", "cultura"], ano=2024, limite=11)
+
+            mock_session.exec.assert_awaited_once()
+            statement = mock_session.exec.await_args.args[0]
+            sql = str(statement.compile(compile_kwargs={"literal_binds": True}))
+            assert "GROUP BY CUBE(fazenda.estado, safra.cultura)" in sql
+            assert "LIMIT 11" in sql
+            assert "JOIN fazenda ON safra.idfazenda = fazenda.id" in sql
+            assert "safra.ano = 2024" in sql
+
+            assert result[0] == {
+                "estado": "SP", "cidade": None, "cultura": "Soja", "ano": None,
+                "dimensoes": ["estado", "cultura"], "quantidade": 2, "area_plantada": 300.0
+            }
+            assert result[1]["dimensoes"] == ["estado"]
+            assert result[1]["cultura"] is None
+            assert result[2]["dimensoes"] == []
+            assert result[2]["area_plantada"] == 450.0
+
+    @pytest.mark.asyncio
+    async def test_get_fazendas_por_estado_le_agregados(self, repository, mock_session):
+        """Testa que a contagem por estado vem da tabela de agregados, sem varrer fazenda"""
+        mock_session.exec.return_value.all = Mock(return_value=[Mock(estado="SP", quantidade=2)])
+
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            result = await repository.get_fazendas_por_estado()
+
+            assert result == [{"estado": "SP", "quantidade": 2}]
+            sql = str(mock_session.exec.await_args.args[0])
+            assert "FROM estatistica_estado" in sql
+            assert "GROUP BY" not in sql
+
+    @pytest.mark.asyncio
+    async def test_get_fazenda_completa_no_db(self, repository):
+        """Testa busca de fazenda completa quando banco não está disponível"""
         repository.db = None
-        
-        with pytest.raises(Exception, match="Banco de dados não disponível"):
-            repository.create_produtor(sample_produtor)
-
-    def test_update_produtor_success(self, repository, sample_produtor):
-        """Testa atualização de produtor com sucesso"""
-        mock_session = Mock()
-        mock_session.exec.return_value.first.return_value = sample_produtor
-        
-        with patch.object(Session, '__enter__', return_value=mock_session):
-            repository.db = Mock()
-            
-            update_data = {"nomeprodutor": "João Silva Atualizado"}
-            result = repository.update_produtor(1, update_data)
-            
+
+        result = await repository.get_fazenda_completa(1)
+
+        assert result is None
+
+    @pytest.mark.asyncio
+    async def test_create_produtor_success(self, repository, mock_session, sample_produtor):
+        """Testa criação assíncrona de produtor com INSERT ... ON CONFLICT (cpf_numerico) DO NOTHING"""
+        mock_session.exec.return_value.first = Mock(return_value=(sample_produtor,))
+
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            result = await repository.create_produtor(sample_produtor)
+
             assert result == sample_produtor
-            assert sample_produtor.nomeprodutor == "João Silva Atualizado"
-
-    def test_update_produtor_not_found(self, repository):
-        """Testa atualização de produtor quando não encontrado"""
-        mock_session = Mock()
-        mock_session.exec.return_value.first.return_value = None
-        
-        with patch.object(Session, '__enter__', return_value=mock_session):
-            repository.db = Mock()
-            
-            result = repository.update_produtor(999, {"nomeprodutor": "Teste"})
-            
+            sql = str(mock_session.exec.await_args.args[0].compile(dialect=postgresql.dialect()))
+            assert "ON CONFLICT (cpf_numerico) DO NOTHING RETURNING" in sql
+            mock_session.add.assert_not_called()
+            mock_session.commit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_create_produtor_cpf_existente(self, repository, mock_session, sample_produtor):
+        """Testa que o conflito no CPF retorna None sem SELECT prévio e sem commit"""
+        mock_session.exec.return_value.first = Mock(return_value=None)
+
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            result = await repository.create_produtor(sample_produtor)
+
             assert result is None
+            mock_session.exec.assert_awaited_once()
+            mock_session.commit.assert_not_awaited()
 
-    def test_delete_produtor_success(self, repository, sample_produtor):
-        """Testa exclusão de produtor com sucesso"""
-        mock_session = Mock()
-        mock_session.exec.return_value.first.return_value = sample_produtor
-        
-        with patch.object(Session, '__enter__', return_value=mock_session):
-            repository.db = Mock()
-            
-            result = repository.delete_produtor(1)
-            
-            assert result is True
-            mock_session.delete.assert_called_once_with(sample_produtor)
-            mock_session.commit.assert_called_once()
-
-    def test_delete_produtor_not_found(self, repository):
-        """Testa exclusão de produtor quando não encontrado"""
-        mock_session = Mock()
-        mock_session.exec.return_value.first.return_value = None
-        
-        with patch.object(Session, '__enter__', return_value=mock_session):
-            repository.db = Mock()
-            
-            result = repository.delete_produtor(999)
-            
-            assert result is False
-
-    def test_get_total_fazendas_success(self, repository):
-        """Testa busca do total de fazendas com sucesso"""
-        mock_session = Mock()
-        mock_session.exec.return_value.first.return_value = 10
-        
-        with patch.object(Session, '__enter__', return_value=mock_session):
-            repository.db = Mock()
-            
-            result = repository.get_total_fazendas()
-            
-            assert result == 10
-
-    def test_get_total_fazendas_no_db(self, repository):
-        """Testa busca do total de fazendas quando banco não está disponível"""
+    @pytest.mark.asyncio
+    async def test_upsert_produtores_atualiza_nome(self, repository, mock_session):
+        """Testa o upsert em lote pelo CPF: DO UPDATE do nome e indicador de linha criada"""
+        linhas = [{"cpf": "123.456.789-00", "nomeprodutor": "João"}]
+        mock_session.exec.return_value.all = Mock(return_value=[Mock(id=1, cpf_numerico=12345678900, criado=False)])
+
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            result = await repository.upsert_produtores(linhas, atualizar=True)
+
+        assert result[0].criado is False
+        statement = mock_session.exec.await_args.args[0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (cpf_numerico) DO UPDATE SET nomeprodutor = excluded.nomeprodutor" in sql
+        assert "RETURNING produtor.id, produtor.cpf_numerico" in sql
+        assert "xmax = 0 AS criado" in sql
+        assert mock_session.exec.await_args.kwargs["params"] == linhas
+
+    @pytest.mark.asyncio
+    async def test_create_produtor_no_db(self, repository, sample_produtor):
+        """Testa criação assíncrona de produtor quando banco não está disponível"""
         repository.db = None
-        
-        result = repository.get_total_fazendas()
-        
-        assert result == 0
-
-    def test_get_estatisticas_areas_success(self, repository):
-        """Testa busca de estatísticas de áreas com sucesso"""
-        mock_session = Mock()
+
+        with pytest.raises(Exception, match="Banco de dados não disponível"):
+            await repository.create_produtor(sample_produtor)
+
+    @pytest.mark.asyncio
+    async def test_create_safras_lote_insert_multilinha(self, repository, mock_session):
+        """Testa que o lote vira um único INSERT ... RETURNING id com as linhas como parâmetros"""
+        linhas = [{"ano": 2024, "cultura": "Soja", "idfazenda": 1}, {"ano": 2025, "cultura": "Milho", "idfazenda": 1}]
+        mock_session.exec.return_value = [Mock(id=10), Mock(id=11)]
+
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            result = await repository.create_safras_lote(linhas)
+
+        assert result == [10, 11]
+        mock_session.exec.assert_awaited_once()
+        statement = mock_session.exec.await_args.args[0]
+        assert statement.is_insert and statement.table.name == "safra"
+        assert mock_session.exec.await_args.kwargs["params"] == linhas
+        mock_session.commit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_importar_safras_copy_via_staging(self, repository):
+        """Testa a carga via COPY numa tabela temporária e o INSERT ... SELECT filtrando a FK"""
+        conexao = AsyncMock()
+        conexao.execute.return_value = Mock(scalars=Mock(return_value=[3]))
+        driver = conexao.get_raw_connection.return_value.driver_connection
+        repository.db.begin = Mock(return_value=AsyncMock(__aenter__=AsyncMock(return_value=conexao)))
+        linhas = [(2, 2024, "Soja", 1), (3, 2024, "Milho", 99)]
+
+        result = await repository.importar_safras(["ano", "cultura", "idfazenda"], linhas)
+
+        assert result == [3]
+        driver.copy_records_to_table.assert_awaited_once_with(
+            "importacao_safra", records=linhas, columns=["linha", "ano", "cultura", "idfazenda"]
+        )
+        descartadas, insercao = (str(chamada.args[0]) for chamada in conexao.execute.await_args_list)
+        assert "NOT (EXISTS" in descartadas
+        assert insercao.startswith("INSERT INTO safra (ano, cultura, idfazenda) SELECT")
+        assert "FROM importacao_safra" in insercao
+
+    @pytest.mark.asyncio
+    async def test_get_fazendas_ids_existentes(self, repository, mock_session):
+        """Testa a verificação das chaves estrangeiras do lote numa única query IN"""
+        mock_session.exec.return_value.scalars = Mock(return_value=Mock(all=Mock(return_value=[1, 3])))
+
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            result = await repository.get_fazendas_ids_existentes([1, 2, 3, 3])
+
+        assert result == {1, 3}
+        sql = str(mock_session.exec.await_args.args[0])
+        assert "IN (__[POSTCOMPILE_id_1])" in sql
+
+    @pytest.mark.asyncio
+    async def test_delete_produtor_success(self, repository, mock_session, sample_produtor):
+        """Testa exclusão assíncrona de produtor com sucesso"""
+        mock_session.exec.return_value.first = Mock(return_value=sample_produtor)
+
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            result = await repository.delete_produtor(1)
+
+            assert result is True
+            mock_session.delete.assert_awaited_once_with(sample_produtor)
+            mock_session.commit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_delete_produtor_cascade_success(self, repository, mock_session):
+        """Testa exclusão em cascata do produtor com DELETEs em lote e um único commit"""
+        mock_session.exec.side_effect = [Mock(rowcount=40), Mock(rowcount=2), Mock(rowcount=1)]
+
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            result = await repository.delete_produtor_cascade(1)
+
+            assert result == {"fazendas_excluidas": 2, "safras_excluidas": 40}
+            assert mock_session.exec.await_count == 3
+            mock_session.commit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_delete_fazenda_cascade_not_found(self, repository, mock_session):
+        """Testa exclusão em cascata de fazenda inexistente"""
+        mock_session.exec.side_effect = [Mock(rowcount=0), Mock(rowcount=0)]
+
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            result = await repository.delete_fazenda_cascade(999)
+
+            assert result is None
+            mock_session.commit.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_create_dados_completos_rollback_on_error(self, repository, mock_session, sample_produtor, sample_fazenda_data):
+        """Testa ROLLBACK da transação quando a inserção das fazendas falha"""
+        mock_session.exec.side_effect = Exception("erro de banco de dados")
+
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            with pytest.raises(Exception, match="erro de banco de dados"):
+                await repository.create_dados_completos(sample_produtor, [sample_fazenda_data], [])
+
+            mock_session.rollback.assert_awaited_once()
+            mock_session.commit.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_create_dados_completos_cpf_existente(self, repository, mock_session, sample_produtor, sample_fazenda_data):
+        """Testa que o conflito no CPF do produtor interrompe a gravação sem inserir fazendas"""
+        mock_session.exec.return_value.scalar = Mock(return_value=None)
+
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            result = await repository.create_dados_completos(sample_produtor, [sample_fazenda_data], [])
+
+            assert result is None
+            mock_session.exec.assert_awaited_once()
+            mock_session.commit.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_get_estatisticas_areas_success(self, repository, mock_session):
+        """Testa busca assíncrona de estatísticas de áreas com sucesso"""
         mock_result = Mock()
         mock_result.area_total = 1000.0
         mock_result.area_agricultavel = 800.0
-        mock_session.exec.return_value.first.return_value = mock_result
-        
-        with patch.object(Session, '__enter__', return_value=mock_session):
-            repository.db = Mock()
-            
-            result = repository.get_estatisticas_areas()
-            
-            expected = {
+        mock_session.exec.return_value.first = Mock(return_value=mock_result)
+
+        with patch.object(AsyncSession, '__aenter__', return_value=mock_session):
+            result = await repository.get_estatisticas_areas()
+
+            assert result == {
                 "area_total": 1000.0,
                 "area_agricultavel": 800.0,
                 "area_vegetacao": 200.0
             }
-            assert result == expected
 
-    def test_get_estatisticas_areas_no_db(self, repository):
-        """Testa busca de estatísticas de áreas quando banco não está disponível"""
-        repository.db = None
-        
-        result = repository.get_estatisticas_areas()
-        
-        expected = {
-            "area_total": 0,
-            "area_agricultavel": 0,
-            "area_vegetacao": 0
-        }
-        assert result == expected 
\ No newline at end of file
+
+class TestUnitOfWork:
+    """Testes unitários da unidade de trabalho com escopo de requisição"""
+
+    @pytest.fixture
+    def mock_session(self):
+        mock_session = AsyncMock()
+        mock_session.add = Mock()
+        mock_session.in_transaction = Mock(return_value=True)
+        return mock_session
+
+    @pytest.fixture
+    def unit_of_work(self, mock_db, mock_session):
+        unit_of_work = UnitOfWork(mock_db)
+        unit_of_work._session = mock_session
+        return unit_of_work
+
+    @pytest.mark.asyncio
+    async def test_repository_shares_unit_of_work_session(self, mock_db, unit_of_work, mock_session, sample_produtor, sample_fazenda):
+        """Testa que os repositórios usam a sessão da unidade de trabalho e apenas fazem flush"""
+        repository = AsyncBrain_AgricultureRepository(mock_db)
+        mock_session.exec.return_value.first = Mock(side_effect=[sample_fazenda, (sample_produtor,)])
+
+        async with unit_of_work:
+            await repository.get_fazenda_by_id(1)
+            await repository.create_produtor(sample_produtor)
+
+            mock_session.flush.assert_awaited_once()
+            mock_session.commit.assert_not_awaited()
+
+        mock_session.commit.assert_awaited_once()
+        mock_session.close.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_unit_of_work_rollback_on_error(self, unit_of_work, mock_session):
+        """Testa rollback da unidade de trabalho quando ocorre erro"""
+        with pytest.raises(ValueError):
+            async with unit_of_work:
+                raise ValueError("erro")
+
+        mock_session.rollback.assert_awaited_once()
+        mock_session.commit.assert_not_awaited()
+        assert get_current_unit_of_work() is None
+
+    @pytest.mark.asyncio
+    async def test_unit_of_work_rollback_only(self, unit_of_work, mock_session):
+        """Testa rollback da unidade de trabalho marcada como rollback-only"""
+        async with unit_of_work:
+            unit_of_work.mark_rollback_only()
+
+        mock_session.rollback.assert_awaited_once()
+        mock_session.commit.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_unit_of_work_after_commit(self, unit_of_work, mock_session):
+        """Testa que callbacks agendados rodam só depois do commit e são descartados no rollback"""
+        callback = Mock(side_effect=lambda: mock_session.commit.assert_awaited_once())
+
+        async with unit_of_work:
+            unit_of_work.after_commit(callback)
+            callback.assert_not_called()
+
+        callback.assert_called_once()
+
+        descartado = Mock()
+        with pytest.raises(ValueError):
+            async with unit_of_work:
+                unit_of_work.after_commit(descartado)
+                raise ValueError("erro")
+
+        descartado.assert_not_called()
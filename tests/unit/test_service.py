@@ -1,7 +1,12 @@
+import asyncio
+from collections import namedtuple
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
+from sqlalchemy.exc import IntegrityError
 from app.brain_agriculture.services.brain_agriculture import Brain_AgricultureService
-from app.brain_agriculture.schemas.brain_agriculture import Produtor, Fazenda, Safra, ReturnSucess, ProdutorCreate, FazendaCreate, DadosCompletosCreate, VincularFazendaProdutor, VincularProdutorFazenda, SafraCreateComFazenda
+from app.core.cache import TTLCache
+from app.shared.constants import CUBO_MAX_CELULAS
+from app.brain_agriculture.schemas.brain_agriculture import Produtor, Fazenda, Safra, ReturnSucess, ProdutorCreate, FazendaCreate, DadosCompletosCreate, VincularFazendaProdutor, VincularProdutorFazenda, SafraCreateComFazenda, SafraCreate
 
 
 class TestBrainAgricultureService:
@@ -22,6 +27,21 @@ class TestBrainAgricultureService:
         assert result[0].id == sample_produtor.id
         assert result[0].nomeprodutor == sample_produtor.nomeprodutor
 
+    @pytest.mark.asyncio
+    async def test_get_all_fazendas_linhas(self, service, mock_repository_methods):
+        """Testa que as linhas de colunas do repositório são validadas numa única passada"""
+        Linha = namedtuple("Linha", "id nomefazenda cidade estado areatotalfazenda areaagricutavel idprodutor")
+        mock_repository_methods.get_all_fazendas.return_value = [
+            Linha(1, "Fazenda A", "Recife", "PE", 10.0, 8.0, None),
+            Linha(2, "Fazenda B", "Olinda", "PE", 20.0, 15.0, 1),
+        ]
+        
+        result = await service.get_all_fazendas(limit=2)
+        
+        assert all(isinstance(fazenda, Fazenda) for fazenda in result)
+        assert [fazenda.id for fazenda in result] == [1, 2]
+        assert result[1].idprodutor == 1
+
     @pytest.mark.asyncio
     async def test_get_produtor_by_id_success(self, service, mock_repository_methods, sample_produtor):
         """Testa busca de produtor por ID com sucesso"""
@@ -33,6 +53,63 @@ class TestBrainAgricultureService:
         assert result.id == sample_produtor.id
         assert result.nomeprodutor == sample_produtor.nomeprodutor
 
+    @pytest.mark.asyncio
+    async def test_get_produtor_by_id_cache_entidades(self, service, mock_repository_methods, sample_produtor):
+        """Testa que buscas repetidas por id são atendidas pelo cache, com contadores"""
+        mock_repository_methods.get_produtor_by_id.return_value = sample_produtor
+        
+        primeiro = await service.get_produtor_by_id(1)
+        segundo = await service.get_produtor_by_id(1)
+        
+        assert segundo == primeiro
+        mock_repository_methods.get_produtor_by_id.assert_awaited_once()
+        estatisticas = service.get_estatisticas_cache_entidades()
+        assert estatisticas.hits == 1
+        assert estatisticas.misses == 1
+        assert estatisticas.taxa_acerto == 0.5
+
+    @pytest.mark.asyncio
+    async def test_update_produtor_invalida_cache_entidades(self, service, mock_repository_methods, sample_produtor):
+        """Testa que a atualização descarta o produtor do cache de entidades"""
+        mock_repository_methods.get_produtor_by_id.return_value = sample_produtor
+        mock_repository_methods.update_produtor.return_value = sample_produtor
+        
+        await service.get_produtor_by_id(1)
+        await service.update_produtor(1, {"nomeprodutor": "João Silva Atualizado"})
+        await service.get_produtor_by_id(1)
+        
+        assert mock_repository_methods.get_produtor_by_id.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_delete_fazenda_invalida_safras_em_cache(self, service, mock_repository_methods, sample_fazenda, sample_safra):
+        """Testa que a exclusão em cascata descarta do cache a fazenda e as safras"""
+        mock_repository_methods.get_fazenda_by_id.return_value = sample_fazenda
+        mock_repository_methods.get_safra_by_id.return_value = sample_safra
+        mock_repository_methods.delete_fazenda_cascade.return_value = {"safras_excluidas": 1}
+        
+        await service.get_safra_by_id(1)
+        result = await service.delete_fazenda(1)
+        await service.get_safra_by_id(1)
+        await service.get_fazenda_by_id(1)
+        
+        assert result.success is True
+        assert mock_repository_methods.get_safra_by_id.await_count == 2
+        assert mock_repository_methods.get_fazenda_by_id.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_create_safra_verifica_fazenda_no_banco(self, service, mock_repository_methods, sample_fazenda):
+        """Testa que a verificação antes da escrita ignora a fazenda em cache e consulta o banco"""
+        mock_repository_methods.get_fazenda_by_id.return_value = sample_fazenda
+        await service.get_fazenda_by_id(1)
+        # Excluída por outro worker: o cache local ainda tem a fazenda
+        mock_repository_methods.get_fazenda_by_id.return_value = None
+        
+        result = await service.create_safra(SafraCreate(ano=2024, cultura="Soja", idfazenda=1))
+        
+        assert result.success is False
+        assert result.message == "Fazenda não encontrada"
+        mock_repository_methods.create_safra.assert_not_awaited()
+
     @pytest.mark.asyncio
     async def test_get_produtor_by_id_not_found(self, service, mock_repository_methods):
         """Testa busca de produtor por ID quando não encontrado"""
@@ -42,6 +119,21 @@ class TestBrainAgricultureService:
         
         assert result is None
 
+    @pytest.mark.asyncio
+    async def test_get_produtores_by_ids(self, service, mock_repository_methods):
+        """Testa a busca em lote por IDs repassando a ordem do repositório"""
+        Linha = namedtuple("Linha", "id cpf cpf_numerico nomeprodutor")
+        mock_repository_methods.get_produtores_by_ids.return_value = [
+            Linha(3, "529.982.247-25", 52998224725, "Ana Lima"),
+            Linha(1, "111.444.777-35", 11144477735, "Maria Souza"),
+        ]
+        
+        result = await service.get_produtores_by_ids([3, 2, 1])
+        
+        assert [produtor.id for produtor in result] == [3, 1]
+        assert result[0].nomeprodutor == "Ana Lima"
+        mock_repository_methods.get_produtores_by_ids.assert_awaited_once_with([3, 2, 1])
+
     @pytest.mark.asyncio
     async def test_create_produtor_success(self, service, mock_repository_methods, sample_produtor):
         """Testa criação de produtor com sucesso"""
@@ -61,8 +153,8 @@ class TestBrainAgricultureService:
 
     @pytest.mark.asyncio
     async def test_create_produtor_duplicate_cpf(self, service, mock_repository_methods, sample_produtor):
-        """Testa criação de produtor com CPF duplicado"""
-        mock_repository_methods.get_produtor_by_cpf.return_value = sample_produtor
+        """Testa criação de produtor com CPF duplicado (conflito detectado pelo INSERT ... ON CONFLICT)"""
+        mock_repository_methods.create_produtor.return_value = None
         
         produtor_data = ProdutorCreate(
             cpf="123.456.789-00",
@@ -74,6 +166,142 @@ class TestBrainAgricultureService:
         assert result.success is False
         assert "Já existe um produtor cadastrado com este CPF" in result.message
 
+    @pytest.mark.asyncio
+    async def test_create_produtores_lote(self, service, mock_repository_methods):
+        """Testa criação em lote: CPFs existentes (ignorados pelo ON CONFLICT) e repetidos são rejeitados por item"""
+        mock_repository_methods.upsert_produtores.side_effect = lambda linhas, atualizar=False: [
+            Mock(id=1, cpf_numerico=12345678900, criado=True),
+            Mock(id=2, cpf_numerico=52998224725, criado=True),
+        ]
+        
+        produtores = [
+            ProdutorCreate(cpf="123.456.789-00", nomeprodutor="João Silva"),
+            ProdutorCreate(cpf="111.444.777-35", nomeprodutor="Maria Souza"),
+            ProdutorCreate(cpf="12345678900", nomeprodutor="João Silva de Novo"),
+            ProdutorCreate(cpf="529.982.247-25", nomeprodutor="Ana Lima"),
+        ]
+        
+        result = await service.create_produtores_lote(produtores)
+        
+        assert result.success is True
+        assert (result.inseridos, result.rejeitados) == (2, 2)
+        assert [item.success for item in result.itens] == [True, False, False, True]
+        assert [item.id for item in result.itens] == [1, None, None, 2]
+        assert "Já existe um produtor" in result.itens[1].message
+        assert "repetido" in result.itens[2].message
+        mock_repository_methods.upsert_produtores.assert_awaited_once_with([
+            {"cpf": "123.456.789-00", "nomeprodutor": "João Silva"},
+            {"cpf": "111.444.777-35", "nomeprodutor": "Maria Souza"},
+            {"cpf": "529.982.247-25", "nomeprodutor": "Ana Lima"},
+        ], atualizar=False)
+        mock_repository_methods.get_produtor_by_cpf.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_create_produtor_digitos_verificadores_invalidos(self, brain_agriculture_repository, mock_repository_methods):
+        """Testa que, com CPF_VALIDAR_DIGITOS, o CPF com dígitos verificadores errados é rejeitado antes do banco"""
+        service = Brain_AgricultureService(brain_agriculture_repository, validar_digitos_cpf=True)
+        result = await service.create_produtor(ProdutorCreate(cpf="123.456.789-00", nomeprodutor="João Silva"))
+        
+        assert result.success is False
+        assert result.message == "CPF inválido: Dígitos verificadores do CPF não conferem"
+        mock_repository_methods.create_produtor.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_create_produtores_lote_cpf_invalido(self, brain_agriculture_repository, mock_repository_methods):
+        """Testa que, com CPF_VALIDAR_DIGITOS, o lote confere os CPFs de uma vez e rejeita só os itens inválidos"""
+        service = Brain_AgricultureService(brain_agriculture_repository, validar_digitos_cpf=True)
+        produtores = [
+            ProdutorCreate(cpf="111.111.111-11", nomeprodutor="Sequência"),
+            ProdutorCreate(cpf="52998224725", nomeprodutor="Ana Lima"),
+            ProdutorCreate(cpf="123.456.789-00", nomeprodutor="João Silva"),
+        ]
+        
+        result = await service.create_produtores_lote(produtores)
+        
+        assert [item.success for item in result.itens] == [False, True, False]
+        assert result.itens[0].message == "CPF inválido: Dígitos verificadores do CPF não conferem"
+        mock_repository_methods.upsert_produtores.assert_awaited_once_with(
+            [{"cpf": "529.982.247-25", "nomeprodutor": "Ana Lima"}], atualizar=False
+        )
+
+    @pytest.mark.asyncio
+    async def test_create_produtores_lote_sem_conferir_digitos(self, service, mock_repository_methods):
+        """Testa que, por padrão, o lote só exige 11 dígitos (dígitos verificadores não são conferidos)"""
+        produtores = [
+            ProdutorCreate(cpf="111.111.111-11", nomeprodutor="Sequência"),
+            ProdutorCreate(cpf="12345678900", nomeprodutor="João Silva"),
+        ]
+        
+        result = await service.create_produtores_lote(produtores)
+        
+        assert [item.success for item in result.itens] == [True, True]
+        mock_repository_methods.upsert_produtores.assert_awaited_once_with([
+            {"cpf": "111.111.111-11", "nomeprodutor": "Sequência"},
+            {"cpf": "123.456.789-00", "nomeprodutor": "João Silva"},
+        ], atualizar=False)
+
+    @pytest.mark.asyncio
+    async def test_create_produtores_lote_upsert(self, service, mock_repository_methods, sample_produtor):
+        """Testa o upsert em lote: CPF existente tem o nome atualizado e o cache de produtores é descartado"""
+        mock_repository_methods.get_produtor_by_id.return_value = sample_produtor
+        await service.get_produtor_by_id(1)
+        mock_repository_methods.upsert_produtores.side_effect = lambda linhas, atualizar=False: [
+            Mock(id=1, cpf_numerico=12345678900, criado=False),
+        ]
+        
+        result = await service.create_produtores_lote(
+            [ProdutorCreate(cpf="123.456.789-00", nomeprodutor="João Silva Atualizado")], upsert=True
+        )
+        
+        assert result.itens[0].success is True
+        assert result.itens[0].message == "Produtor atualizado com sucesso"
+        assert mock_repository_methods.upsert_produtores.await_args.kwargs["atualizar"] is True
+        await service.get_produtor_by_id(1)
+        assert mock_repository_methods.get_produtor_by_id.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_update_produtor_cpf_duplicado(self, service, mock_repository_methods):
+        """Testa que a violação do índice único de CPF vira mensagem de negócio"""
+        mock_repository_methods.update_produtor.side_effect = IntegrityError("UPDATE produtor", {}, Exception("produtor_cpf_key"))
+        
+        result = await service.update_produtor(1, {"cpf": "529.982.247-25"})
+        
+        assert result.success is False
+        assert result.message == "Já existe outro produtor cadastrado com este CPF"
+        mock_repository_methods.get_produtor_by_cpf.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_create_safras_lote_fazenda_inexistente(self, service, mock_repository_methods):
+        """Testa que as fazendas do lote são verificadas numa única consulta e safras órfãs rejeitadas"""
+        mock_repository_methods.get_fazendas_ids_existentes.return_value = {1}
+        
+        safras = [
+            SafraCreate(ano=2024, cultura="Soja", idfazenda=1),
+            SafraCreate(ano=2024, cultura="Milho", idfazenda=99),
+            SafraCreate(ano=2025, cultura="Café", idfazenda=1),
+        ]
+        
+        result = await service.create_safras_lote(safras)
+        
+        assert (result.inseridos, result.rejeitados) == (2, 1)
+        assert result.itens[1].message == "Fazenda não encontrada"
+        mock_repository_methods.get_fazendas_ids_existentes.assert_awaited_once()
+        assert sorted(mock_repository_methods.get_fazendas_ids_existentes.await_args.args[0]) == [1, 99]
+        mock_repository_methods.get_fazenda_by_id.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_create_fazendas_lote_erro_banco(self, service, mock_repository_methods):
+        """Testa que uma falha no INSERT do lote é reportada sem gravar nada"""
+        mock_repository_methods.create_fazendas_lote.side_effect = Exception("conexão perdida")
+        
+        fazendas = [FazendaCreate(nomefazenda="Fazenda A", cidade="Recife", estado="PE", areatotalfazenda=10.0, areaagricutavel=8.0)]
+        
+        result = await service.create_fazendas_lote(fazendas)
+        
+        assert result.success is False
+        assert result.inseridos == 0
+        assert "conexão perdida" in result.message
+
     @pytest.mark.asyncio
     async def test_update_produtor_success(self, service, mock_repository_methods, sample_produtor):
         """Testa atualização de produtor com sucesso"""
@@ -86,6 +314,7 @@ class TestBrainAgricultureService:
         
         assert result.success is True
         assert "Produtor atualizado com sucesso" in result.message
+        mock_repository_methods.get_produtor_by_id.assert_not_awaited()
 
     @pytest.mark.asyncio
     async def test_update_produtor_not_found(self, service, mock_repository_methods):
@@ -99,6 +328,19 @@ class TestBrainAgricultureService:
         assert result.success is False
         assert "Produtor não encontrado" in result.message
 
+    @pytest.mark.asyncio
+    async def test_update_fazenda_produtor_inexistente(self, service, mock_repository_methods, sample_fazenda):
+        """Testa que o UPDATE sem linhas afetadas é atribuído ao produtor quando a fazenda existe"""
+        mock_repository_methods.update_fazenda.return_value = None
+        mock_repository_methods.get_fazenda_by_id.return_value = sample_fazenda
+        
+        result = await service.update_fazenda(1, {"idprodutor": 999})
+        
+        assert result.success is False
+        assert result.message == "Produtor não encontrado"
+        mock_repository_methods.update_fazenda.assert_awaited_once_with(1, {"idprodutor": 999})
+        mock_repository_methods.get_produtor_by_id.assert_not_awaited()
+
     @pytest.mark.asyncio
     async def test_delete_produtor_success(self, service, mock_repository_methods, sample_produtor):
         """Testa exclusão de produtor com sucesso"""
@@ -110,6 +352,32 @@ class TestBrainAgricultureService:
         assert result.success is True
         assert "Produtor excluído com sucesso" in result.message
 
+    @pytest.mark.asyncio
+    async def test_delete_produtor_cascade_counts(self, service, mock_repository_methods, sample_produtor):
+        """Testa exclusão em cascata do produtor reportando as quantidades excluídas"""
+        mock_repository_methods.get_produtor_by_id.return_value = sample_produtor
+        mock_repository_methods.delete_produtor_cascade.return_value = {"fazendas_excluidas": 50, "safras_excluidas": 1000}
+        
+        result = await service.delete_produtor(1)
+        
+        assert result.success is True
+        assert result.data == {"id": 1, "fazendas_excluidas": 50, "safras_excluidas": 1000}
+        mock_repository_methods.delete_produtor_cascade.assert_awaited_once_with(1)
+        mock_repository_methods.delete_safra.assert_not_awaited()
+        mock_repository_methods.delete_fazenda.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_delete_fazenda_cascade_counts(self, service, mock_repository_methods, sample_fazenda):
+        """Testa exclusão em cascata da fazenda reportando as safras excluídas"""
+        mock_repository_methods.get_fazenda_by_id.return_value = sample_fazenda
+        mock_repository_methods.delete_fazenda_cascade.return_value = {"safras_excluidas": 20}
+        
+        result = await service.delete_fazenda(1)
+        
+        assert result.success is True
+        assert result.data == {"id": 1, "safras_excluidas": 20}
+        mock_repository_methods.delete_safra.assert_not_awaited()
+
     @pytest.mark.asyncio
     async def test_delete_produtor_not_found(self, service, mock_repository_methods):
         """Testa exclusão de produtor quando não encontrado"""
@@ -182,10 +450,155 @@ class TestBrainAgricultureService:
         assert result.total_fazendas == 10
         assert result.total_area == 1000.0
 
+    @pytest.mark.asyncio
+    async def test_estatisticas_servidas_do_cache(self, service, mock_repository_methods):
+        """Testa que cargas repetidas do dashboard não consultam o banco entre escritas"""
+        mock_repository_methods.get_estatisticas_areas.return_value = {
+            "area_total": 1000.0,
+            "area_agricultavel": 800.0,
+            "area_vegetacao": 200.0
+        }
+        
+        primeiro = await service.get_estatisticas_areas()
+        segundo = await service.get_estatisticas_areas()
+        
+        assert segundo == primeiro
+        mock_repository_methods.get_estatisticas_areas.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_estatisticas_concorrentes_uma_consulta(self, service, mock_repository_methods):
+        """Testa que leituras concorrentes das estatísticas compartilham uma única consulta"""
+        async def consulta():
+            await asyncio.sleep(0.01)
+            return [{"cultura": "Soja", "quantidade": 2}]
+        
+        mock_repository_methods.get_total_culturas.return_value = 2
+        mock_repository_methods.get_culturas_agrupadas.side_effect = consulta
+        
+        resultados = await asyncio.gather(*[service.get_estatisticas_culturas() for _ in range(5)])
+        
+        assert all(resultado == resultados[0] for resultado in resultados)
+        mock_repository_methods.get_culturas_agrupadas.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_estatisticas_stale_while_revalidate(self, service, mock_repository_methods):
+        """Testa que um valor vencido é servido na hora e recalculado uma vez em segundo plano"""
+        service.stats_cache = TTLCache(ttl=0.05, stale_ttl=60)
+        mock_repository_methods.get_total_fazendas.return_value = 1
+        mock_repository_methods.get_fazendas_por_estado.return_value = []
+        
+        await service.get_estatisticas_fazendas()
+        await asyncio.sleep(0.06)
+        
+        mock_repository_methods.get_total_fazendas.return_value = 2
+        vencido = await service.get_estatisticas_fazendas()
+        await service.get_estatisticas_fazendas()
+        await asyncio.sleep(0.01)
+        atualizado = await service.get_estatisticas_fazendas()
+        
+        assert vencido.total_fazendas == 1
+        assert atualizado.total_fazendas == 2
+        assert mock_repository_methods.get_total_fazendas.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_get_produtor_completo_concorrente(self, service, mock_repository_methods, sample_produtor):
+        """Testa que buscas concorrentes do mesmo produtor completo fazem uma única consulta"""
+        async def consulta(produtor_id):
+            await asyncio.sleep(0.01)
+            return None
+        
+        mock_repository_methods.get_produtor_completo.side_effect = consulta
+        
+        await asyncio.gather(
+            service.get_produtor_completo(1),
+            service.get_produtor_completo(1),
+            service.get_produtor_completo(2)
+        )
+        
+        assert mock_repository_methods.get_produtor_completo.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_get_dashboard_success(self, service, mock_repository_methods):
+        """Testa montagem do dashboard a partir da query única do repositório"""
+        mock_repository_methods.get_dashboard.return_value = {
+            "total_fazendas": 2,
+            "area_total": 300.0,
+            "area_agricultavel": 200.0,
+            "area_vegetacao": 100.0,
+            "fazendas_por_estado": [{"estado": "SP", "quantidade": 2}],
+            "total_culturas": 3,
+            "culturas": [{"cultura": "Soja", "quantidade": 2}, {"cultura": "Milho", "quantidade": 1}],
+            "safras_por_ano": [{"ano": 2024, "quantidade": 3}]
+        }
+        
+        result = await service.get_dashboard()
+        await service.get_dashboard()
+        
+        assert result.resumo.total_fazendas == 2
+        assert result.resumo.total_area == 300.0
+        assert result.estatisticas_fazendas.fazendas_por_estado[0].estado == "SP"
+        assert result.estatisticas_areas.area_vegetacao == 100.0
+        assert result.estatisticas_culturas.total_culturas == 3
+        assert len(result.estatisticas_culturas.culturas) == 2
+        assert result.estatisticas_safras_por_ano.safras_por_ano[0].ano == 2024
+        mock_repository_methods.get_dashboard.assert_awaited_once()
+        mock_repository_methods.get_total_fazendas.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_get_cubo_safras_cache_por_combinacao(self, service, mock_repository_methods):
+        """Testa que o cubo normaliza as dimensões e guarda uma entrada de cache por combinação"""
+        mock_repository_methods.get_cubo_safras.return_value = [
+            {"estado": "SP", "cidade": None, "cultura": None, "ano": 2024,
+             "dimensoes": ["estado", "ano"], "quantidade": 2, "area_plantada": 300.0}
+        ]
+        
+        result = await service.get_cubo_safras(["ano", "estado", "ano"])
+        await service.get_cubo_safras(["estado", "ano"])
+        await service.get_cubo_safras(["estado"])
+        
+        assert result.dimensoes == ["estado", "ano"]
+        assert result.celulas[0].estado == "SP"
+        assert result.celulas[0].area_plantada == 300.0
+        assert mock_repository_methods.get_cubo_safras.await_count == 2
+        mock_repository_methods.get_cubo_safras.assert_any_await(
+            ["estado", "ano"], estado=None, cidade=None, cultura=None, ano=None,
+            limite=CUBO_MAX_CELULAS + 1
+        )
+        assert len(service.cubo_cache.backend) == 2
+        assert len(service.stats_cache.backend) == 0
+
+    @pytest.mark.asyncio
+    async def test_get_cubo_safras_acima_do_limite(self, service, mock_repository_methods):
+        """Testa que um cubo com mais de CUBO_MAX_CELULAS células é recusado e não vai para o cache"""
+        celula = {"estado": None, "cidade": None, "cultura": None, "ano": None,
+                  "dimensoes": [], "quantidade": 1, "area_plantada": 1.0}
+        mock_repository_methods.get_cubo_safras.return_value = [celula] * (CUBO_MAX_CELULAS + 1)
+        
+        with pytest.raises(ValueError, match="células"):
+            await service.get_cubo_safras(["estado", "cidade", "cultura", "ano"])
+        assert len(service.cubo_cache.backend) == 0
+
+    @pytest.mark.asyncio
+    async def test_escrita_invalida_cache_estatisticas(self, service, mock_repository_methods, sample_safra):
+        """Testa que uma escrita no service invalida as estatísticas em cache"""
+        mock_repository_methods.get_total_culturas.return_value = 1
+        mock_repository_methods.get_culturas_agrupadas.return_value = [{"cultura": "Soja", "quantidade": 1}]
+        await service.get_estatisticas_culturas()
+        
+        mock_repository_methods.get_safra_by_id.return_value = sample_safra
+        await service.delete_safra(1)
+        
+        mock_repository_methods.get_total_culturas.return_value = 0
+        mock_repository_methods.get_culturas_agrupadas.return_value = []
+        result = await service.get_estatisticas_culturas()
+        
+        assert result.total_culturas == 0
+        assert mock_repository_methods.get_culturas_agrupadas.await_count == 2
+
     @pytest.mark.asyncio
     async def test_get_fazendas_resumidas_success(self, service, mock_repository_methods, sample_fazenda):
         """Testa busca de fazendas resumidas com sucesso"""
-        mock_repository_methods.get_all_fazendas.return_value = [sample_fazenda]
+        mock_repository_methods.get_fazendas_resumidas.return_value = [(sample_fazenda.id, sample_fazenda.nomefazenda)]
         
         result = await service.get_fazendas_resumidas()
         
@@ -196,7 +609,9 @@ class TestBrainAgricultureService:
     @pytest.mark.asyncio
     async def test_get_produtores_resumidos_success(self, service, mock_repository_methods, sample_produtor):
         """Testa busca de produtores resumidos com sucesso"""
-        mock_repository_methods.get_all_produtores.return_value = [sample_produtor]
+        mock_repository_methods.get_produtores_resumidos.return_value = [
+            (sample_produtor.id, sample_produtor.cpf, sample_produtor.nomeprodutor)
+        ]
         
         result = await service.get_produtores_resumidos()
         
@@ -206,16 +621,110 @@ class TestBrainAgricultureService:
         assert result[0].nomeprodutor == sample_produtor.nomeprodutor
 
     @pytest.mark.asyncio
-    async def test_get_produtor_completo_success(self, service, mock_repository_methods, sample_produtor, sample_fazenda, sample_safra):
-        """Testa busca de produtor completo com fazendas e safras"""
-        # Mock do produtor
-        mock_repository_methods.get_produtor_by_id.return_value = sample_produtor
+    async def test_get_fazendas_resumidas_com_prefixo(self, service, mock_repository_methods):
+        """Testa que o prefixo e o limite são repassados à consulta projetada"""
+        mock_repository_methods.get_fazendas_resumidas.return_value = [(3, "Fazenda Boa Vista")]
         
-        # Mock das fazendas do produtor
-        mock_repository_methods.get_fazendas_by_produtor.return_value = [sample_fazenda]
+        result = await service.get_fazendas_resumidas(prefixo="Fazenda B", limit=5)
         
-        # Mock das safras da fazenda
-        mock_repository_methods.get_safras_by_fazenda.return_value = [sample_safra]
+        assert result[0].id == 3
+        mock_repository_methods.get_fazendas_resumidas.assert_awaited_once_with(prefixo="Fazenda B", limit=5)
+        mock_repository_methods.get_all_fazendas.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_exportar_safras_ndjson(self, service, mock_repository_methods):
+        """Testa exportação de safras em NDJSON, um pedaço por lote"""
+        async def lotes():
+            yield [{"id": 1, "ano": 2024, "cultura": "Soja", "idfazenda": 1}]
+            yield [{"id": 2, "ano": 2025, "cultura": "Café", "idfazenda": 1}]
+
+        mock_repository_methods.stream_safras = Mock(return_value=lotes())
+
+        chunks = [chunk async for chunk in service.exportar_safras("ndjson")]
+
+        assert chunks == [
+            '{"id": 1, "ano": 2024, "cultura": "Soja", "idfazenda": 1}\n',
+            '{"id": 2, "ano": 2025, "cultura": "Café", "idfazenda": 1}\n',
+        ]
+
+    @pytest.mark.asyncio
+    async def test_importar_safras_csv(self, service, mock_repository_methods):
+        """Testa importação em streaming: linhas inválidas e descartadas pela FK são relatadas, o resto vai por COPY"""
+        mock_repository_methods.importar_safras = AsyncMock(return_value=[4])
+        conteudo = "ano,cultura,idfazenda\r\n2024,Soja,1\r\nabc,Milho,1\r\n2025,Café,99\r\n2026,\"Feijão\nCarioca\",2\r\n".encode()
+
+        async def chunks():
+            for inicio in range(0, len(conteudo), 7):
+                yield conteudo[inicio:inicio + 7]
+
+        result = await service.importar_safras(chunks(), "csv")
+
+        assert result.success is True
+        assert (result.total, result.inseridos, result.rejeitados) == (4, 2, 2)
+        assert [erro.linha for erro in result.erros] == [3, 4]
+        assert result.erros[0].motivo.startswith("ano:")
+        assert result.erros[1].motivo == "Fazenda não encontrada"
+        colunas, linhas = mock_repository_methods.importar_safras.await_args.args
+        assert colunas == ["ano", "cultura", "idfazenda"]
+        assert linhas == [(2, 2024, "Soja", 1), (4, 2025, "Café", 99), (5, 2026, "Feijão\nCarioca", 2)]
+
+    @pytest.mark.asyncio
+    async def test_importar_fazendas_ndjson_blocos(self, service, mock_repository_methods):
+        """Testa que a carga segue em blocos mesmo quando um deles falha no banco"""
+        mock_repository_methods.importar_fazendas = AsyncMock(side_effect=[Exception("deadlock"), []])
+        fazenda = '{"nomefazenda": "F", "cidade": "Recife", "estado": "PE", "areatotalfazenda": 10, "areaagricutavel": 8}\n'
+
+        async def chunks():
+            yield (fazenda * 3).encode()
+            yield b"nao-e-json\n"
+
+        with patch("app.brain_agriculture.services.brain_agriculture.IMPORT_CHUNK_SIZE", 2):
+            result = await service.importar_fazendas(chunks(), "ndjson")
+
+        assert (result.total, result.inseridos, result.rejeitados) == (4, 1, 3)
+        assert [erro.linha for erro in result.erros] == [1, 2, 4]
+        assert "deadlock" in result.erros[0].motivo
+        assert mock_repository_methods.importar_fazendas.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_importar_fazendas_leitura_interrompida(self, service, mock_repository_methods):
+        """Testa que a falha na leitura do arquivo relata os blocos que já ficaram gravados"""
+        mock_repository_methods.importar_fazendas = AsyncMock(return_value=[])
+        fazenda = '{"nomefazenda": "F", "cidade": "Recife", "estado": "PE", "areatotalfazenda": 10, "areaagricutavel": 8}\n'
+
+        async def chunks():
+            yield (fazenda * 2).encode()
+            raise ConnectionError("cliente desconectou")
+
+        with patch("app.brain_agriculture.services.brain_agriculture.IMPORT_CHUNK_SIZE", 2):
+            result = await service.importar_fazendas(chunks(), "ndjson")
+
+        assert result.success is False
+        assert (result.total, result.inseridos, result.rejeitados) == (2, 2, 0)
+        assert "cliente desconectou" in result.message
+        assert "2 linhas lidas antes do erro permanecem importadas" in result.message
+
+    @pytest.mark.asyncio
+    async def test_exportar_fazendas_csv(self, service, mock_repository_methods, sample_fazenda_data):
+        """Testa exportação de fazendas em CSV com cabeçalho"""
+        async def lotes():
+            yield [sample_fazenda_data]
+
+        mock_repository_methods.stream_fazendas = Mock(return_value=lotes())
+
+        conteudo = "".join([chunk async for chunk in service.exportar_fazendas("csv")])
+
+        linhas = conteudo.splitlines()
+        assert linhas[0] == "id,nomefazenda,cidade,estado,areatotalfazenda,areaagricutavel,idprodutor"
+        assert linhas[1] == "1,Fazenda Nova,São Paulo,SP,100.0,80.0,1"
+
+    @pytest.mark.asyncio
+    async def test_get_produtor_completo_success(self, service, mock_repository_methods, sample_produtor, sample_fazenda, sample_safra):
+        """Testa busca de produtor completo com fazendas e safras"""
+        # Produtor com fazendas e safras já carregadas pelo repositório
+        sample_fazenda.safras = [sample_safra]
+        sample_produtor.fazendas = [sample_fazenda]
+        mock_repository_methods.get_produtor_completo.return_value = sample_produtor
         
         result = await service.get_produtor_completo(1)
         
@@ -230,7 +739,7 @@ class TestBrainAgricultureService:
     @pytest.mark.asyncio
     async def test_get_produtor_completo_not_found(self, service, mock_repository_methods):
         """Testa busca de produtor completo quando não encontrado"""
-        mock_repository_methods.get_produtor_by_id.return_value = None
+        mock_repository_methods.get_produtor_completo.return_value = None
         
         result = await service.get_produtor_completo(999)
         
@@ -239,11 +748,9 @@ class TestBrainAgricultureService:
     @pytest.mark.asyncio
     async def test_get_fazenda_completa_success(self, service, mock_repository_methods, sample_fazenda, sample_safra):
         """Testa busca de fazenda completa com safras"""
-        # Mock da fazenda
-        mock_repository_methods.get_fazenda_by_id.return_value = sample_fazenda
-        
-        # Mock das safras da fazenda
-        mock_repository_methods.get_safras_by_fazenda.return_value = [sample_safra]
+        # Fazenda com safras já carregadas pelo repositório
+        sample_fazenda.safras = [sample_safra]
+        mock_repository_methods.get_fazenda_completa.return_value = sample_fazenda
         
         result = await service.get_fazenda_completa(1)
         
@@ -256,7 +763,7 @@ class TestBrainAgricultureService:
     @pytest.mark.asyncio
     async def test_get_fazenda_completa_not_found(self, service, mock_repository_methods):
         """Testa busca de fazenda completa quando não encontrada"""
-        mock_repository_methods.get_fazenda_by_id.return_value = None
+        mock_repository_methods.get_fazenda_completa.return_value = None
         
         result = await service.get_fazenda_completa(999)
         
@@ -321,25 +828,82 @@ class TestBrainAgricultureService:
         mock_repository_methods.create_produtor.return_value = sample_produtor
         with patch.object(mock_repository_methods, "get_fazenda_by_nome_and_produtor", return_value=None):
             mock_repository_methods.create_fazenda.side_effect = Exception("Erro ao criar fazenda")
+            mock_repository_methods.create_dados_completos.side_effect = Exception("Erro ao criar fazenda")
             result = await service.processar_dados_completos(dados)
             assert result.success is False
             assert "erro" in result.message.lower()
 
     @pytest.mark.asyncio
-    async def test_vincular_fazenda_produtor_success(self, service, mock_repository_methods, sample_fazenda, sample_produtor):
-        """Testa vinculação de fazenda a produtor com sucesso"""
-        # Mock da fazenda
-        mock_repository_methods.get_fazenda_by_id.return_value = sample_fazenda
+    async def test_processar_dados_completos_transacao_unica(self, service, mock_repository_methods):
+        """Testa que produtor, fazendas e safras são gravados em uma única chamada transacional"""
+        mock_repository_methods.get_produtor_by_cpf.return_value = None
+        mock_repository_methods.create_dados_completos.return_value = {
+            "produtor_id": 1,
+            "fazendas_ids_por_nome": {"Fazenda A": 10, "Fazenda B": 11},
+            "safras_ids": [20, 21]
+        }
+        dados = DadosCompletosCreate(
+            produtor=ProdutorCreate(cpf="12345678900", nomeprodutor="João Silva"),
+            fazendas=[
+                FazendaCreate(nomefazenda="Fazenda A", cidade="São Paulo", estado="SP", areatotalfazenda=100.0, areaagricutavel=80.0),
+                FazendaCreate(nomefazenda="Fazenda B", cidade="Recife", estado="PE", areatotalfazenda=50.0, areaagricutavel=40.0),
+            ],
+            safras=[
+                SafraCreateComFazenda(ano=2025, cultura="Soja", nomefazenda="Fazenda A"),
+                SafraCreateComFazenda(ano=2025, cultura="Milho", nomefazenda="Fazenda B"),
+            ]
+        )
         
-        # Mock do produtor
-        mock_repository_methods.get_produtor_by_id.return_value = sample_produtor
+        result = await service.processar_dados_completos(dados)
+        
+        assert result.success is True
+        assert result.data == {"produtor_id": 1, "fazendas_ids": [10, 11], "safras_ids": [20, 21]}
+        produtor, fazendas, safras = mock_repository_methods.create_dados_completos.await_args.args
+        assert produtor.cpf == "123.456.789-00"
+        assert [fazenda["nomefazenda"] for fazenda in fazendas] == ["Fazenda A", "Fazenda B"]
+        assert [safra["nomefazenda"] for safra in safras] == ["Fazenda A", "Fazenda B"]
+        mock_repository_methods.create_fazenda.assert_not_awaited()
+        mock_repository_methods.create_safra.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_processar_dados_completos_cpf_existente(self, service, mock_repository_methods):
+        """Testa que o CPF já cadastrado é detectado pelo ON CONFLICT, sem consulta prévia"""
+        mock_repository_methods.create_dados_completos.return_value = None
+        dados = DadosCompletosCreate(produtor=ProdutorCreate(cpf="12345678900", nomeprodutor="João Silva"))
+        
+        result = await service.processar_dados_completos(dados)
+        
+        assert result.success is False
+        assert result.message == "Já existe um produtor cadastrado com este CPF"
+        mock_repository_methods.get_produtor_by_cpf.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_processar_dados_completos_safra_sem_fazenda(self, service, mock_repository_methods):
+        """Testa que safra com fazenda inexistente é rejeitada antes de gravar qualquer dado"""
+        mock_repository_methods.get_produtor_by_cpf.return_value = None
+        dados = DadosCompletosCreate(
+            produtor=ProdutorCreate(cpf="12345678900", nomeprodutor="João Silva"),
+            fazendas=[
+                FazendaCreate(nomefazenda="Fazenda A", cidade="São Paulo", estado="SP", areatotalfazenda=100.0, areaagricutavel=80.0),
+            ],
+            safras=[SafraCreateComFazenda(ano=2025, cultura="Soja", nomefazenda="Fazenda Inexistente")]
+        )
+        
+        result = await service.processar_dados_completos(dados)
         
-        # Mock da atualização da fazenda
+        assert result.success is False
+        assert "Fazenda 'Fazenda Inexistente' não encontrada" in result.message
+        mock_repository_methods.create_dados_completos.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_vincular_fazenda_produtor_success(self, service, mock_repository_methods, sample_fazenda, sample_produtor):
+        """Testa vinculação de fazenda a produtor com sucesso"""
+        # Mock do UPDATE ... RETURNING (fazenda atualizada e nome do produtor)
         updated_fazenda = sample_fazenda
         updated_fazenda.idprodutor = sample_produtor.id
-        mock_repository_methods.update_fazenda.return_value = updated_fazenda
+        mock_repository_methods.vincular_fazenda_produtor.return_value = (updated_fazenda, sample_produtor.nomeprodutor)
         
-        dados = VincularFazendaProdutor(fazenda_id=1, produtor_id=2)
+        dados = VincularFazendaProdutor(fazenda_id=1, produtor_id=sample_produtor.id)
         
         result = await service.vincular_fazenda_produtor(dados)
         
@@ -347,6 +911,8 @@ class TestBrainAgricultureService:
         assert "vinculada com sucesso" in result.message
         assert result.data["fazenda_id"] == sample_fazenda.id
         assert result.data["produtor_id"] == sample_produtor.id
+        mock_repository_methods.get_fazenda_by_id.assert_not_awaited()
+        mock_repository_methods.get_produtor_by_id.assert_not_awaited()
 
     @pytest.mark.asyncio
     async def test_vincular_fazenda_produtor_fazenda_not_found(self, service, mock_repository_methods):
@@ -376,18 +942,12 @@ class TestBrainAgricultureService:
     @pytest.mark.asyncio
     async def test_vincular_produtor_fazenda_success(self, service, mock_repository_methods, sample_produtor, sample_fazenda):
         """Testa vinculação de produtor a fazenda com sucesso"""
-        # Mock do produtor
-        mock_repository_methods.get_produtor_by_id.return_value = sample_produtor
-        
-        # Mock da fazenda
-        mock_repository_methods.get_fazenda_by_id.return_value = sample_fazenda
-        
-        # Mock da atualização da fazenda
+        # Mock do UPDATE ... RETURNING (fazenda atualizada e nome do produtor)
         updated_fazenda = sample_fazenda
         updated_fazenda.idprodutor = sample_produtor.id
-        mock_repository_methods.update_fazenda.return_value = updated_fazenda
+        mock_repository_methods.vincular_fazenda_produtor.return_value = (updated_fazenda, sample_produtor.nomeprodutor)
         
-        dados = VincularProdutorFazenda(produtor_id=2, fazenda_id=1)
+        dados = VincularProdutorFazenda(produtor_id=sample_produtor.id, fazenda_id=1)
         
         result = await service.vincular_produtor_fazenda(dados)
         